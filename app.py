@@ -1,9 +1,13 @@
 # app.py
-from flask import request, Flask, render_template, jsonify, redirect, url_for
-from flask import flash
+from flask import request, Flask, render_template, stream_template, jsonify, redirect, url_for
+from flask import Response, stream_with_context
+from flask import flash, session
 import database.db as db_api
-from datetime import datetime # En tepeye bunu ekle
+from datetime import datetime, timedelta # En tepeye bunu ekle
+import time
 import math # En tepeye eklemeyi unutma (sayfa sayısını yukarı yuvarlamak için)
+import json
+import base64
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
 
@@ -14,6 +18,43 @@ app.secret_key = "345678987654345678"
 login_manager = LoginManager()  # ✅ BU SATIR EKSİK!
 login_manager.init_app(app)
 login_manager.login_view = 'login'
+
+# --- İSTEK BAZLI OKUMA BAĞLAMI ---
+# GET isteklerinde tüm SELECT'ler tek bağlantı + tek READ ONLY snapshot üzerinden çalışır.
+# Çok panelli sayfalar (tüm sorguların tutarlı olması gereken) REPEATABLE READ kullanır.
+SNAPSHOT_ENDPOINTS = {'matches_page', 'players_stats_page'}
+
+@app.before_request
+def _open_read_scope():
+    db_api.begin_request_stats(request.endpoint or request.path)
+    # Okumalar replikalara dağıtılır; yazma isteklerinde ve aynı oturumun yazmadan hemen
+    # sonraki isteklerinde birincil sunucuda kalınır (kullanıcı kendi değişikliğini görsün)
+    recently_wrote = time.time() - session.get('db_write_at', 0) < db_api.STICKY_PRIMARY_SECONDS
+    db_api.set_primary_reads(request.method not in ('GET', 'HEAD') or recently_wrote)
+    if request.method in ('GET', 'HEAD'):
+        isolation = db_api.REPEATABLE_READ if request.endpoint in SNAPSHOT_ENDPOINTS else db_api.READ_COMMITTED
+        db_api.begin_read_scope(isolation)
+
+@app.after_request
+def _remember_write(response):
+    if request.method not in ('GET', 'HEAD', 'OPTIONS') and response.status_code < 400:
+        session['db_write_at'] = time.time()
+    return response
+
+@app.after_request
+def _add_server_timing(response):
+    # İsteğin toplam DB süresi tarayıcı devtools'unda (Network > Timing) görünür
+    stats = db_api.current_request_stats()
+    if stats is not None and stats.count:
+        response.headers.add('Server-Timing', stats.server_timing())
+    return response
+
+@app.teardown_request
+def _close_read_scope(exc):
+    db_api.end_read_scope()
+    db_api.end_request_stats()
+    db_api.set_primary_reads(False)
+
 # Kullanıcı Modeli
 class User(UserMixin):
     def __init__(self, id, username, password_hash):
@@ -95,37 +136,35 @@ def logout():
 def index():
     return render_template('index.html')
 
-# 1. Oyuncular (Çağatay Dişli)
-@app.route('/players')
-def players_page():
-    # --- 1. Parametreleri Al ---
-    search = request.args.get('search', '').strip().lower()
-    sort_by = request.args.get('sort_by', 'default').strip()
+# Bağlantı havuzu istatistikleri (in-use, idle, bekleme süresi histogramı)
+@app.route('/db/pool')
+def db_pool_stats():
+    return jsonify(db_api.pool_stats())
 
-    # Sayfalama Parametreleri
-    try:
-        page = int(request.args.get('page', 1))
-        per_page = int(request.args.get('per_page', 20))
-    except ValueError:
-        page = 1
-        per_page = 20
+# Route + SQL parmak izi bazında sorgu süreleri (?route=matches_page ile filtrelenebilir)
+@app.route('/db/queries')
+def db_query_stats():
+    return jsonify(db_api.query_stats(request.args.get('route')))
 
-    # Filtre Parametreleri
-    selected_teams = request.args.getlist('teams')
-    selected_leagues = request.args.getlist('leagues')
+# Liste sayfalarının COUNT önbelleği: isabet / tahmin sayıları ve eşik
+@app.route('/db/counts')
+def db_count_stats():
+    return jsonify(db_api.count_cache_stats())
 
-    # --- 2. Filtre Listelerini Hazırla (Dropdownlar için) ---
-    try:
-        teams_data = db_api.query("SELECT MIN(team_id), team_name FROM Teams GROUP BY team_name ORDER BY team_name")
-        teams_dropdown = [{'id': r[0], 'name': r[1]} for r in teams_data]
-        
-        all_teams = [r[0] for r in db_api.query("SELECT DISTINCT team_name FROM teams ORDER BY team_name") if r[0]]
-        all_leagues = [r[0] for r in db_api.query("SELECT DISTINCT league FROM players ORDER BY league") if r[0]]
-    except Exception as e:
-        print(f"Liste hatası: {e}")
-        teams_dropdown, all_teams, all_leagues = [], [], []
+# Toplam kayıt sayısı: önbellekte yoksa ve sonuç çok büyükse planlayıcı tahmini döner
+# (approximate=True); ?exact_count=1 kesin sayıyı çalıştırıp önbelleğe yazar
+def list_count(name, from_sql, params, tables):
+    return db_api.filtered_count(name, from_sql, tuple(params), tables,
+                                 exact=request.args.get('exact_count') == '1')
+
+# 1. Oyuncular (Çağatay Dişli)
+# --- OYUNCU FİLTRELERİ (liste sayfası ve dışa aktarma ortak kullanır) ---
+def players_filter(args):
+    search = args.get('search', '').strip().lower()
+    # Sıralı ve tekrarsız: aynı seçim her zaman aynı SQL'i (ve COUNT önbellek anahtarını) üretir
+    selected_teams = sorted(set(args.getlist('teams')))
+    selected_leagues = sorted(set(args.getlist('leagues')))
 
-    # --- 3. SQL SORGU İNŞASI (BASE QUERY) ---
     where_clauses = ["1=1"]
     params = []
 
@@ -143,46 +182,93 @@ def players_page():
         where_clauses.append(f"p.league IN ({placeholders})")
         params.extend(selected_leagues)
 
-    where_sql = " AND ".join(where_clauses)
+    return " AND ".join(where_clauses), params
+
+def players_order(sort_by):
+    # Varsayılan: Takım adı, sonra oyuncu adı
+    order_clause = "t.team_name NULLS LAST, p.player_name"
+
+    if sort_by == 'name_asc':
+        order_clause = "p.player_name ASC"
+    elif sort_by == 'age_asc':
+        # Yaş (Küçük -> Büyük) aslında Doğum Tarihi (Büyük -> Küçük)
+        # birth_date / height_cm: ham metinden üretilen tipli kolonlar (index'li)
+        order_clause = "p.birth_date DESC NULLS LAST"
+    elif sort_by == 'age_desc':
+        # Yaş (Büyük -> Küçük) aslında Doğum Tarihi (Küçük -> Büyük)
+        order_clause = "p.birth_date ASC NULLS LAST"
+    elif sort_by == 'height_desc':
+        order_clause = "p.height_cm DESC NULLS LAST"
+    return order_clause
+
+# Yaş doğrudan tipli kolondan hesaplanır (doğum tarihi yoksa '-')
+PLAYER_AGE_SQL = "COALESCE(EXTRACT(YEAR FROM age(p.birth_date))::int::text, '-')"
+
+@app.route('/players')
+def players_page():
+    # --- 1. Parametreleri Al ---
+    sort_by = request.args.get('sort_by', 'default').strip()
+
+    # Sayfalama Parametreleri
+    try:
+        page = int(request.args.get('page', 1))
+        per_page = int(request.args.get('per_page', 20))
+    except ValueError:
+        page = 1
+        per_page = 20
+
+    # Filtre Parametreleri
+    selected_teams = request.args.getlist('teams')
+    selected_leagues = request.args.getlist('leagues')
+
+    # --- 2. Filtre Listelerini Hazırla (Dropdownlar için) ---
+    # (Sorgular tek round-trip'te çalıştırılır)
+    # (sql, params, sıralama): sıralama batch'te sonuç sütunları üzerinden verilir
+    dropdown_statements = [
+        ("SELECT MIN(team_id), team_name FROM Teams GROUP BY team_name ORDER BY team_name", None, "team_name"),
+        ("SELECT DISTINCT team_name FROM teams ORDER BY team_name", None, "team_name"),
+        ("SELECT DISTINCT league FROM players ORDER BY league", None, "league"),
+    ]
+
+    # --- 3. SQL SORGU İNŞASI (BASE QUERY) ---
+    where_sql, params = players_filter(request.args)
 
-    # --- 4. TOPLAM KAYIT SAYISINI BUL (COUNT QUERY) ---
-    count_sql = f"""
-        SELECT COUNT(*)
+    # --- 4. TOPLAM KAYIT SAYISINI BUL (COUNT önbelleği / tahmin) ---
+    count_from = f"""
         FROM players p
         LEFT JOIN teams t ON p.team_id = t.team_id
         WHERE {where_sql}
     """
+    teams_data, team_rows, league_rows = db_api.query_many(dropdown_statements, return_exceptions=True)
+
     try:
-        total_count = db_api.query(count_sql, tuple(params))[0][0]
+        teams_dropdown = [{'id': r[0], 'name': r[1]} for r in db_api.result_or_raise(teams_data)]
+        all_teams = [r[0] for r in db_api.result_or_raise(team_rows) if r[0]]
+        all_leagues = [r[0] for r in db_api.result_or_raise(league_rows) if r[0]]
+    except Exception as e:
+        print(f"Liste hatası: {e}")
+        teams_dropdown, all_teams, all_leagues = [], [], []
+
+    try:
+        total_count, count_approximate = list_count('players', count_from, params, ('players', 'teams'))
     except:
-        total_count = 0
+        total_count, count_approximate = 0, False
 
     total_pages = math.ceil(total_count / per_page)
     if page < 1: page = 1
-    if page > total_pages and total_pages > 0: page = total_pages
+    # Tahmini sayıyla sayfa kırpılmaz (tahmin gerçek sayıdan küçük olabilir)
+    if page > total_pages and total_pages > 0 and not count_approximate: page = total_pages
     
     offset = (page - 1) * per_page
 
     # --- 5. SIRALAMA MANTIĞI (ORDER BY) ---
-    # Varsayılan: Takım adı, sonra oyuncu adı
-    order_clause = "t.team_name NULLS LAST, p.player_name"
-
-    if sort_by == 'name_asc':
-        order_clause = "p.player_name ASC"
-    elif sort_by == 'age_asc':
-        # Yaş (Küçük -> Büyük) aslında Doğum Tarihi (Büyük -> Küçük)
-        order_clause = "TO_DATE(NULLIF(p.player_birthdate,''), 'DD.MM.YYYY') DESC NULLS LAST"
-    elif sort_by == 'age_desc':
-        # Yaş (Büyük -> Küçük) aslında Doğum Tarihi (Küçük -> Büyük)
-        order_clause = "TO_DATE(NULLIF(p.player_birthdate,''), 'DD.MM.YYYY') ASC NULLS LAST"
-    elif sort_by == 'height_desc':
-        order_clause = "CAST(NULLIF(REGEXP_REPLACE(p.player_height, '[^0-9]', '', 'g'), '') AS INTEGER) DESC NULLS LAST"
+    order_clause = players_order(sort_by)
 
     # --- 6. ASIL VERİ SORGUSU (MAIN QUERY) ---
     sql = f"""
         SELECT p.player_id, p.player_name, p.player_height, p.player_birthdate, 
                p.league, t.team_name, p.team_url, p.team_id,
-               p.player_foot, p.player_bio
+               p.player_foot, p.player_bio, {PLAYER_AGE_SQL} AS age
         FROM players p
         LEFT JOIN teams t ON p.team_id = t.team_id
         WHERE {where_sql}
@@ -193,43 +279,10 @@ def players_page():
     query_params = tuple(params) + (per_page, offset)
 
     try:
-        rows = db_api.query(sql, query_params)
+        players = db_api.query(sql, query_params, row_format='dict')
     except Exception as e:
         print(f"SQL Hatası: {e}")
-        rows = []
-
-    # --- 7. Veriyi Python Listesine Çevir ---
-    players = []
-    today = datetime.now()
-
-    for row in rows:
-        p_id, p_name, p_height, p_birth, p_league, t_name, t_url, t_id, p_foot, p_bio = row
-
-        # Yaş Hesaplama (Görsel İçin)
-        age = "-"
-        if p_birth and isinstance(p_birth, str) and len(p_birth.strip()) >= 8:
-            try:
-                clean_date = p_birth.strip()
-                birth_date_obj = datetime.strptime(clean_date, "%d.%m.%Y")
-                calc_age = today.year - birth_date_obj.year - (
-                            (today.month, today.day) < (birth_date_obj.month, birth_date_obj.day))
-                age = calc_age
-            except:
-                pass
-
-        players.append({
-            "player_id": p_id,
-            "player_name": p_name,
-            "player_height": p_height,
-            "player_birthdate": p_birth,
-            "age": age,
-            "league": p_league,
-            "team_name": t_name,
-            "team_url": t_url,
-            "team_id": t_id,
-            "player_foot": p_foot,
-            "player_bio": p_bio
-        })
+        players = []
 
     return render_template('players_table.html',
                            players=players,
@@ -242,6 +295,7 @@ def players_page():
                            total_pages=total_pages,
                            per_page=per_page,
                            total_count=total_count,
+                           count_approximate=count_approximate,
                            sort_by=sort_by)
 
 
@@ -252,22 +306,25 @@ def players_stats_page():
     # Her oyuncu için, o oyuncunun bulunduğu takımın boy ortalamasını (İç Sorgu) hesapla.
     # Eğer oyuncunun boyu, takım ortalamasından büyükse listele.
     
+    # height_cm: player_height metninden üretilen tipli kolon; takım ortalaması
+    # (team_id, height_cm) index'inden okunur
     query = """
         SELECT 
             p.player_name, 
             p.player_height, 
             t.team_name, 
             (
-                SELECT AVG(CAST(NULLIF(regexp_replace(p2.player_height, '[^0-9]', '', 'g'), '') AS INTEGER)) 
+                SELECT AVG(p2.height_cm) 
                 FROM Players p2 
                 WHERE p2.team_id = p.team_id
-            ) as team_avg_height
+            ) as team_avg_height,
+            p.height_cm
         FROM Players p
         JOIN Teams t ON p.team_id = t.team_id
         WHERE 
-            CAST(NULLIF(regexp_replace(p.player_height, '[^0-9]', '', 'g'), '') AS INTEGER) > 
+            p.height_cm > 
             (
-                SELECT AVG(CAST(NULLIF(regexp_replace(p3.player_height, '[^0-9]', '', 'g'), '') AS INTEGER)) 
+                SELECT AVG(p3.height_cm) 
                 FROM Players p3 
                 WHERE p3.team_id = p.team_id
             )
@@ -275,22 +332,15 @@ def players_stats_page():
     """
     
     try:
-        rows = db_api.query(query)
+        rows = db_api.query(query, prepare=True)
     except Exception as e:
         print(f"Stats Query Error: {e}")
         rows = []
         
     stats = []
     for row in rows:
-        # Clean height for calculation
-        try:
-            # "190 cm" -> 190
-            p_h_clean = int(''.join(filter(str.isdigit, str(row[1]))))
-        except:
-            p_h_clean = 0
-            
         t_avg_clean = float(row[3]) if row[3] else 0
-        diff = int(p_h_clean - t_avg_clean)
+        diff = int(row[4] - t_avg_clean)
 
         stats.append({
             "player_name": row[0],
@@ -358,15 +408,15 @@ def players_stats_page():
     """
 
     try:
-        top_scorer_players = db_api.query(q1)
+        top_scorer_players = db_api.query(q1, prepare=True)
     except: top_scorer_players = []
 
     try:
-        winless_coaches = db_api.query(q2)
+        winless_coaches = db_api.query(q2, prepare=True)
     except: winless_coaches = []
 
     try:
-        inactive_teams = db_api.query(q3)
+        inactive_teams = db_api.query(q3, prepare=True)
     except: inactive_teams = []
 
     return render_template('players_stats.html', 
@@ -477,7 +527,7 @@ def players_menu():
 # 2. Oyuncu Tablosu (Veritabanı sorgusu buraya taşındı)
 @app.route('/players/table')
 def players_table_page():
-    query = """
+    query = f"""
         SELECT 
             p.player_id, 
             p.player_name, 
@@ -485,27 +535,18 @@ def players_table_page():
             p.player_birthdate, 
             p.league, 
             t.team_name,
-            p.team_url
+            p.team_url,
+            {PLAYER_AGE_SQL} AS age
         FROM players p
         LEFT JOIN teams t ON p.team_id = t.team_id
         ORDER BY t.team_name, p.player_name
-        -- Sayfa çok yavaşlamasın diye limit koyabilirsin
     """
-    rows = db_api.query(query)
-    
-    players = []
-    for row in rows:
-        players.append({
-            "player_id": row[0],
-            "player_name": row[1],
-            "player_height": row[2],
-            "player_birthdate": row[3],
-            "league": row[4],
-            "team_name": row[5],
-            "team_url": row[6]
-        })
+    # Tüm tablo tek seferde belleğe alınmaz: sunucu taraflı cursor ile
+    # satırlar parça parça okunup şablona akıtılır (stream_template).
+    players = db_api.stream(query, itersize=500, row_format='dict')
 
-    return render_template('players_table.html', players=players)   
+    return stream_template('players_table.html', players=players,
+                           current_page=1, total_pages=1)
 
 #######################################################################################################################
 
@@ -556,27 +597,12 @@ def teams_table_page():
         query = base_query + " ORDER BY league DESC, team_name ASC"
         params = ()
 
+    # 4. Veriler doğrudan sözlük olarak gelir (HTML'e hazır)
     try:
-        rows = db_api.query(query, params)
+        teams = db_api.query(query, params, row_format='dict')
     except Exception as e:
         print(f"Sorgu Hatası: {e}")
-        rows = []
-
-    # 4. Verileri HTML'e göndermek için sözlüğe çevir
-    teams = []
-    for row in rows:
-        teams.append({
-            "team_id": row[0],
-            "staff_id": row[1],
-            "team_url": row[2],
-            "team_name": row[3],
-            "league": row[4],
-            "team_city": row[5],
-            "team_year": row[6],
-            "saloon_name": row[7],
-            "saloon_capacity": row[8],
-            "saloon_address": row[9]
-        })
+        teams = []
 
     # 5. HTML'e hem takımları, hem sezon listesini, hem de seçili sezonu gönderiyoruz
     return render_template('teams.html', teams=teams, seasons=all_seasons, current_season=selected_season)
@@ -701,103 +727,132 @@ def update_team():
 # - Advanced filtering and pagination
 # =====================================================================
 
-@app.route('/matches')
-def matches_page():
+# ==================== MATCH FILTERS ====================
+# Shared by the /matches list page and the bulk export endpoints
+
+# SQL injection protection - use mapping for complete control
+MATCH_SORT_COLUMNS = {
+    'match_date': 'm.match_date',
+    'match_week': 'm.match_week',
+    'league': 'm.league',
+    'match_city': 'm.match_city',
+    'home_score': 'm.home_score',
+    'away_score': 'm.away_score'
+}
+
+# Keyset pagination: the list is ordered by (sort column, match_hour, match_id), all in
+# the requested direction, and a page starts right after the previous page's last key.
+# Nullable columns are keyed as (col IS NULL, COALESCE(col, constant)) so NULLs keep
+# their place (last for ASC, first for DESC) and the key compares as a row value.
+# Same expressions as the indexes in migration 0008_matches_seek_indexes.sql.
+def _null_safe_key(column, constant):
+    return [f"({column} IS NULL)", f"COALESCE({column}, {constant})"]
+
+# COALESCE constant by column type (text columns: ''); it only stands in for NULL rows
+_SEEK_NULL_CONSTANTS = {'m.match_date': "DATE '1970-01-01'", 'm.home_score': "0", 'm.away_score': "0"}
+MATCH_SEEK_KEYS = {name: _null_safe_key(column, _SEEK_NULL_CONSTANTS.get(column, "''"))
+                   for name, column in MATCH_SORT_COLUMNS.items()}
+MATCH_TIEBREAK_KEYS = _null_safe_key('m.match_hour', "TIME '00:00'") + ['m.match_id']
+
+def match_seek_keys(sort_by):
+    return MATCH_SEEK_KEYS.get(sort_by, MATCH_SEEK_KEYS['match_date']) + MATCH_TIEBREAK_KEYS
+
+def matches_order(args):
+    order = 'DESC' if args.get('order', 'desc').lower() == 'desc' else 'ASC'
+    return ", ".join(f"{key} {order}" for key in match_seek_keys(args.get('sort', 'match_date')))
+
+def encode_cursor(payload):
+    # Opaque for the client: base64 of the sort, direction, page number and boundary key
+    raw = json.dumps(payload, separators=(',', ':'), default=str).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(token, sort_by, order):
+    """Returns the cursor payload, or None if it is malformed or for another sort/order."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        if (payload['s'], payload['o']) != (sort_by, order) or payload['d'] not in ('next', 'prev'):
+            return None
+        if not isinstance(payload['k'], list) or len(payload['k']) != len(match_seek_keys(sort_by)):
+            return None
+        if int(payload['p']) < 1:
+            return None
+        if not all(isinstance(value, str) for value in payload['k']):
+            return None
+        return payload
+    except (ValueError, TypeError, KeyError):
+        return None
+
+def match_seek(sort_by, order, cursor):
     """
-    Main matches listing page with advanced filtering, pagination, and analytics.
-    Demonstrates: Multi-table JOINs, Aggregations, Subqueries
+    Keyset part of the /matches page query for a decoded cursor (None: first page or
+    ?page=N, read with OFFSET). Returns (seek_sql, seek_params, order_sql, seek_key_sql):
+    the predicate for the rows after the cursor's key, the scan order and the page's
+    seek_key column. A 'prev' cursor scans backwards from the key (the rows are
+    reversed back by match_page_cursors).
     """
-    # ==================== FILTER PARAMETERS ====================
-    sort_by = request.args.get('sort', 'match_date')
-    order = request.args.get('order', 'desc')
-    fmt = request.args.get('format', 'html')
-    
-    # Pagination parameters
-    try:
-        page = int(request.args.get('page', 1))
-        per_page = int(request.args.get('per_page', 50))
-    except ValueError:
-        page, per_page = 1, 50
-    
-    # Advanced filter parameters
-    search_team = request.args.get('search_team', '').strip()
-    selected_league = request.args.get('league', '')
-    selected_city = request.args.get('city', '')
-    date_from = request.args.get('date_from', '')
-    date_to = request.args.get('date_to', '')
-    score_filter = request.args.get('score_filter', '')  # home_wins, away_wins, high_scoring
-    min_score_diff = request.args.get('min_score_diff', '')
-    selected_weeks = request.args.getlist('weeks')  # Checkbox multi-select
-
-    # NEW FILTERS
-    home_team_filter = request.args.get('home_team', '')
-    away_team_filter = request.args.get('away_team', '')
-    any_team_filter = request.args.get('any_team', '')
-    match_status = request.args.get('match_status', '')  # played, unplayed
-    selected_saloon = request.args.get('saloon', '')
-    game_closeness = request.args.get('game_closeness', '')  # close, blowout
-    date_preset = request.args.get('date_preset', '')  # today, week, month
-    total_score_min = request.args.get('total_score_min', '')
-    total_score_max = request.args.get('total_score_max', '')
-    
-    # SQL injection protection - use mapping for complete control
-    SORT_COLUMNS = {
-        'match_date': 'm.match_date',
-        'match_week': 'm.match_week',
-        'league': 'm.league',
-        'match_city': 'm.match_city',
-        'home_score': 'm.home_score',
-        'away_score': 'm.away_score'
-    }
-    sort_column = SORT_COLUMNS.get(sort_by, 'm.match_date')
-    order = 'DESC' if order.lower() == 'desc' else 'ASC'
-    
-    # ==================== DROPDOWN DATA ====================
-    # Fetch ALL teams for dropdowns (need all team_ids for edit modal to work correctly)
-    # Teams with same name but different seasons have different IDs
-    teams_query = """
-        SELECT team_id, team_name, league
-        FROM Teams
-        ORDER BY team_name, league DESC
+    seek_keys = match_seek_keys(sort_by)
+    backward = cursor is not None and cursor['d'] == 'prev'
+    scan_order = ('ASC' if order == 'DESC' else 'DESC') if backward else order
+    order_sql = ", ".join(f"{key} {scan_order}" for key in seek_keys)
+    seek_key_sql = f"ARRAY[{', '.join(f'({key})::text' for key in seek_keys)}] AS seek_key"
+    if cursor is None:
+        return "", (), order_sql, seek_key_sql
+    seek_sql = "AND ({}) {} ({})".format(", ".join(seek_keys), '<' if scan_order == 'DESC' else '>',
+                                         ", ".join(['%s'] * len(seek_keys)))
+    return seek_sql, tuple(cursor['k']), order_sql, seek_key_sql
+
+def match_page_cursors(rows, per_page, page, cursor, sort_by, order):
     """
-    teams_rows = db_api.query(teams_query)
-    teams = [{'team_id': row[0], 'team_name': row[1], 'league': row[2]} for row in teams_rows]
-
-    # Fetch unique leagues for filter
-    leagues_query = "SELECT DISTINCT league FROM Matches WHERE league IS NOT NULL ORDER BY league DESC"
-    leagues = [row[0] for row in db_api.query(leagues_query)]
-
-    # Fetch unique cities for filter
-    cities_query = "SELECT DISTINCT match_city FROM Matches WHERE match_city IS NOT NULL ORDER BY match_city"
-    cities = [row[0] for row in db_api.query(cities_query)]
-
-    # Fetch unique weeks for checkbox filter (natural sort: NS 01, NS 02, ... NS 10, NS 11)
-    weeks_query = """
-        SELECT match_week FROM (
-            SELECT DISTINCT match_week FROM Matches WHERE match_week IS NOT NULL
-        ) w
-        ORDER BY 
-            SUBSTRING(match_week FROM '^[A-Za-z]+'),
-            CAST(NULLIF(REGEXP_REPLACE(match_week, '[^0-9]', '', 'g'), '') AS INTEGER) NULLS LAST
+    Trims the per_page + 1 rows read for a page (the extra row only tells whether there
+    is more), puts them in display order and pops their seek keys into the neighbour
+    cursors. Returns (rows, has_prev, prev_cursor, has_next, next_cursor). prev_cursor is
+    None when the previous page is the first one (linked without a cursor, OFFSET 0).
     """
-    all_weeks = [row[0] for row in db_api.query(weeks_query)]
-
-    # NEW: Fetch saloons with their cities for filtering
-    saloons_query = """
-        SELECT DISTINCT match_city, match_saloon 
-        FROM Matches 
-        WHERE match_saloon IS NOT NULL AND match_saloon != '' AND match_city IS NOT NULL
-        ORDER BY match_city, match_saloon
+    backward = cursor is not None and cursor['d'] == 'prev'
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backward:
+        rows.reverse()
+    keys = [row.pop('seek_key') for row in rows]
+
+    has_prev = has_more if backward else page > 1
+    has_next = True if backward else has_more
+    def page_cursor(direction, key, target_page):
+        return encode_cursor({'s': sort_by, 'o': order, 'd': direction, 'p': target_page, 'k': key})
+    next_cursor = page_cursor('next', keys[-1], page + 1) if has_next and keys else None
+    prev_cursor = page_cursor('prev', keys[0], page - 1) if has_prev and keys else None
+    # Önceki sayfa 1. sayfaysa cursor'suz ilk sayfa linki verilir (OFFSET 0)
+    if has_prev and page - 1 == 1:
+        prev_cursor = None
+    return rows, has_prev, prev_cursor, has_next, next_cursor
+
+def matches_filter(args):
     """
-    saloons_with_cities = [{'city': row[0], 'saloon': row[1]} for row in db_api.query(saloons_query)]
-    all_saloons = list(set([s['saloon'] for s in saloons_with_cities]))  # Unique saloons for backward compat
-    
-    # ==================== DYNAMIC WHERE CLAUSE ====================
+    Builds the WHERE clause for matches m JOIN teams t1 (home) JOIN teams t2 (away)
+    from the /matches query string. Returns (where_sql, params).
+    """
+    search_team = args.get('search_team', '').strip()
+    selected_league = args.get('league', '')
+    selected_city = args.get('city', '')
+    date_from = args.get('date_from', '')
+    date_to = args.get('date_to', '')
+    score_filter = args.get('score_filter', '')
+    min_score_diff = args.get('min_score_diff', '')
+    selected_weeks = sorted(set(args.getlist('weeks')))  # canonical order for the count cache key
+    home_team_filter = args.get('home_team', '')
+    away_team_filter = args.get('away_team', '')
+    any_team_filter = args.get('any_team', '')
+    match_status = args.get('match_status', '')
+    selected_saloon = args.get('saloon', '')
+    game_closeness = args.get('game_closeness', '')
+    date_preset = args.get('date_preset', '')
+    total_score_min = args.get('total_score_min', '')
+    total_score_max = args.get('total_score_max', '')
+
     where_clauses = ["1=1"]
     params = []
 
     # Date preset quick filter (MUST BE FIRST - overrides date_from/date_to)
-    from datetime import datetime, timedelta
     if date_preset == 'today':
         today = datetime.now().date()
         where_clauses.append("m.match_date = %s")
@@ -929,162 +984,303 @@ def matches_page():
         where_clauses.append(f"m.match_week IN ({placeholders})")
         params.extend(selected_weeks)
     
-    where_sql = " AND ".join(where_clauses)
-    
-    # ==================== COUNT QUERY FOR PAGINATION ====================
-    count_query = f"""
-        SELECT COUNT(*) FROM matches m
-        JOIN teams t1 ON m.home_team_id = t1.team_id
-        JOIN teams t2 ON m.away_team_id = t2.team_id
-        WHERE {where_sql}
+    return " AND ".join(where_clauses), params
+
+# ==================== TEAM PANELS (team_season_stats) ====================
+# Team performance and home/away panels of /matches. They read the per-team totals of
+# team_season_stats (migration 0007) and give the same rows as the old per-match
+# aggregates: teams grouped by name, same thresholds (3 / 5 scored games), same
+# rounding. tests/test_team_stats_panels.py compares them with the old queries.
+# team_name last in ORDER BY: ties (and the LIMIT cut) are deterministic.
+TEAM_PERFORMANCE_PANEL_SQL = """
+    SELECT 
+        t.team_name,
+        SUM(s.games) AS games_played,
+        SUM(s.wins) AS wins,
+        SUM(s.losses) AS losses,
+        ROUND((SUM(s.wins) * 100.0 / SUM(s.games))::numeric, 1) as win_pct,
+        ROUND(SUM(s.points_for)::numeric / SUM(s.games), 1) as avg_points_scored,
+        ROUND(SUM(s.points_against)::numeric / SUM(s.games), 1) as avg_points_conceded,
+        ROUND(SUM(s.points_for)::numeric / SUM(s.games), 1) - ROUND(SUM(s.points_against)::numeric / SUM(s.games), 1) as point_diff
+    FROM team_season_stats s
+    JOIN Teams t ON t.team_id = s.team_id
+    WHERE s.league = %s
+    GROUP BY t.team_name
+    HAVING SUM(s.games) >= 3
+    ORDER BY win_pct DESC, point_diff DESC, t.team_name
+"""
+
+HOME_AWAY_PANEL_SQL = """
+    SELECT
+        t.team_name,
+        SUM(s.home_games) as home_games,
+        SUM(s.home_wins) as home_wins,
+        COALESCE(ROUND(SUM(s.home_points_for)::numeric / NULLIF(SUM(s.home_games), 0), 1), 0) as avg_home_scored,
+        SUM(s.away_games) as away_games,
+        SUM(s.away_wins) as away_wins,
+        COALESCE(ROUND(SUM(s.away_points_for)::numeric / NULLIF(SUM(s.away_games), 0), 1), 0) as avg_away_scored,
+        CASE WHEN SUM(s.home_games) > 0 THEN ROUND((SUM(s.home_wins) * 100.0 / SUM(s.home_games))::numeric, 1) ELSE 0 END as home_win_pct,
+        CASE WHEN SUM(s.away_games) > 0 THEN ROUND((SUM(s.away_wins) * 100.0 / SUM(s.away_games))::numeric, 1) ELSE 0 END as away_win_pct
+    FROM team_season_stats s
+    JOIN Teams t ON t.team_id = s.team_id
+    WHERE s.league = %s
+    GROUP BY t.team_name
+    HAVING SUM(s.home_games) + SUM(s.away_games) >= 5
+    ORDER BY (SUM(s.home_games) + SUM(s.away_games)) DESC, t.team_name
+    LIMIT 12
+"""
+
+def matches_top_league(where_sql, params, versions):
     """
-    total_count = db_api.query(count_query, tuple(params))[0][0]
-    total_pages = math.ceil(total_count / per_page) if total_count > 0 else 1
+    Most common league of the filtered list, for when the total is only a planner
+    estimate and the fused query (COUNT + mode()) is skipped. Cached with the counts
+    until Matches/Teams change. The unfiltered list reads the per-league totals of
+    team_season_stats (a few rows per league) instead of grouping every match.
+    """
+    key = db_api.count_key('matches_top_league', where_sql, params)
+    league = db_api.count_cache_get(key, versions)
+    if league is None:
+        if where_sql == "1=1":
+            sql = """
+                SELECT league FROM team_season_stats
+                GROUP BY league
+                ORDER BY sum(home_games) DESC, league
+                LIMIT 1
+            """
+        else:
+            # mode() ile aynı sonuç: en sık lig, eşitlikte alfabetik ilk
+            sql = f"""
+                SELECT m.league
+                FROM matches m
+                JOIN teams t1 ON m.home_team_id = t1.team_id
+                JOIN teams t2 ON m.away_team_id = t2.team_id
+                WHERE {where_sql} AND m.league IS NOT NULL
+                GROUP BY m.league
+                ORDER BY count(*) DESC, m.league
+                LIMIT 1
+            """
+        rows = db_api.query(sql, tuple(params) if where_sql != "1=1" else None)
+        league = rows[0][0] if rows else ''
+        db_api.count_cache_put(key, versions, league)
+    return league or None
+
+@app.route('/matches')
+def matches_page():
+    """
+    Main matches listing page with advanced filtering, pagination, and analytics.
+    Demonstrates: Multi-table JOINs, Aggregations, Subqueries
+    """
+    # ==================== FILTER PARAMETERS ====================
+    sort_by = request.args.get('sort', 'match_date')
+    order = request.args.get('order', 'desc')
+    fmt = request.args.get('format', 'html')
     
-    # Ensure valid page number
-    if page < 1: page = 1
-    if page > total_pages: page = total_pages
+    # Pagination parameters
+    try:
+        page = int(request.args.get('page', 1))
+        per_page = int(request.args.get('per_page', 50))
+    except ValueError:
+        page, per_page = 1, 50
     
-    offset = (page - 1) * per_page
+    # Advanced filter parameters
+    search_team = request.args.get('search_team', '').strip()
+    selected_league = request.args.get('league', '')
+    selected_city = request.args.get('city', '')
+    date_from = request.args.get('date_from', '')
+    date_to = request.args.get('date_to', '')
+    score_filter = request.args.get('score_filter', '')  # home_wins, away_wins, high_scoring
+    min_score_diff = request.args.get('min_score_diff', '')
+    selected_weeks = request.args.getlist('weeks')  # Checkbox multi-select
+
+    # NEW FILTERS
+    home_team_filter = request.args.get('home_team', '')
+    away_team_filter = request.args.get('away_team', '')
+    any_team_filter = request.args.get('any_team', '')
+    match_status = request.args.get('match_status', '')  # played, unplayed
+    selected_saloon = request.args.get('saloon', '')
+    game_closeness = request.args.get('game_closeness', '')  # close, blowout
+    date_preset = request.args.get('date_preset', '')  # today, week, month
+    total_score_min = request.args.get('total_score_min', '')
+    total_score_max = request.args.get('total_score_max', '')
     
-    # ==================== MAIN QUERY (2-Table JOIN) ====================
-    main_query = f"""
-        SELECT 
-            m.match_id,
-            m.match_date, 
-            m.match_hour, 
-            t1.team_name AS home_team, 
-            m.home_score, 
-            m.away_score, 
-            t2.team_name AS away_team, 
-            m.match_saloon, 
-            m.league,
-            m.match_week,
-            m.match_city,
-            m.home_team_id,
-            m.away_team_id
-        FROM matches m
-        JOIN teams t1 ON m.home_team_id = t1.team_id
-        JOIN teams t2 ON m.away_team_id = t2.team_id
-        WHERE {where_sql}
-        ORDER BY {sort_column} {order}, m.match_hour ASC
-        LIMIT %s OFFSET %s
+    order = 'DESC' if order.lower() == 'desc' else 'ASC'
+    
+    # ==================== DROPDOWN DATA ====================
+    # Fetch ALL teams for dropdowns (need all team_ids for edit modal to work correctly)
+    # Teams with same name but different seasons have different IDs
+    teams_query = """
+        SELECT team_id, team_name, league
+        FROM Teams
+        ORDER BY team_name, league DESC
     """
-    query_params = tuple(params) + (per_page, offset)
-    rows = db_api.query(main_query, query_params)
+
+    # Fetch unique leagues for filter
+    leagues_query = "SELECT DISTINCT league FROM Matches WHERE league IS NOT NULL ORDER BY league DESC"
+
+    # Fetch unique cities for filter
+    cities_query = "SELECT DISTINCT match_city FROM Matches WHERE match_city IS NOT NULL ORDER BY match_city"
+
+    # Fetch unique weeks for checkbox filter (natural sort: NS 01, NS 02, ... NS 10, NS 11)
+    weeks_query = """
+        SELECT match_week FROM (
+            SELECT DISTINCT match_week FROM Matches WHERE match_week IS NOT NULL
+        ) w
+        ORDER BY 
+            SUBSTRING(match_week FROM '^[A-Za-z]+'),
+            CAST(NULLIF(REGEXP_REPLACE(match_week, '[^0-9]', '', 'g'), '') AS INTEGER) NULLS LAST
+    """
+
+    # NEW: Fetch saloons with their cities for filtering
+    saloons_query = """
+        SELECT DISTINCT match_city, match_saloon 
+        FROM Matches 
+        WHERE match_saloon IS NOT NULL AND match_saloon != '' AND match_city IS NOT NULL
+        ORDER BY match_city, match_saloon
+    """
+
+    # All dropdown lists in one round trip (each with its ORDER BY over the output
+    # columns: a batched statement's own ORDER BY is not kept, see db_api.query_many)
+    weeks_order = """SUBSTRING(match_week FROM '^[A-Za-z]+'),
+            CAST(NULLIF(REGEXP_REPLACE(match_week, '[^0-9]', '', 'g'), '') AS INTEGER) NULLS LAST"""
+    teams_rows, league_rows, city_rows, week_rows, saloon_rows = db_api.query_many([
+        (teams_query, None, "team_name, league DESC"),
+        (leagues_query, None, "league DESC"),
+        (cities_query, None, "match_city"),
+        (weeks_query, None, weeks_order),
+        (saloons_query, None, "match_city, match_saloon"),
+    ])
+    teams = [{'team_id': row[0], 'team_name': row[1], 'league': row[2]} for row in teams_rows]
+    leagues = [row[0] for row in league_rows]
+    cities = [row[0] for row in city_rows]
+    all_weeks = [row[0] for row in week_rows]
+    saloons_with_cities = [{'city': row[0], 'saloon': row[1]} for row in saloon_rows]
+    all_saloons = list(set([s['saloon'] for s in saloons_with_cities]))  # Unique saloons for backward compat
     
-    cols = ['match_id', 'match_date', 'match_hour', 'home_team', 'home_score', 
-            'away_score', 'away_team', 'match_saloon', 'league', 'match_week',
-            'match_city', 'home_team_id', 'away_team_id']
-    matches = [dict(zip(cols, row)) for row in rows]
+    # ==================== DYNAMIC WHERE CLAUSE ====================
+    where_sql, params = matches_filter(request.args)
     
-    # ==================== COMPLEX QUERY 1: Team Performance (GROUP BY + HAVING + Aggregations) ====================
-    # Real-world meaningful stat: Team performance summary with wins, losses, averages
-    # Use the selected league filter, or auto-detect from filtered matches
-    if selected_league:
-        analytics_league = selected_league
-    else:
-        # Auto-detect most common league from current filter results
-        league_detect_query = f"""
-            SELECT m.league, COUNT(*) as cnt
-            FROM matches m
-            JOIN teams t1 ON m.home_team_id = t1.team_id
-            JOIN teams t2 ON m.away_team_id = t2.team_id
-            WHERE {where_sql}
-            GROUP BY m.league
-            ORDER BY cnt DESC
-            LIMIT 1
-        """
-        league_result = db_api.query(league_detect_query, tuple(params))
-        analytics_league = league_result[0][0] if league_result else 'bsl-2024-2025'
-
-    analytics_display_season = analytics_league.replace('bsl-', '').upper() if analytics_league else 'All Seasons'
+    # ==================== MAIN QUERY (2-Table JOIN, keyset paginated) ====================
+    # With a cursor the page is found by seeking to the previous page's boundary key.
+    # Without a cursor (first page, or an old ?page=N link) the page is read with OFFSET.
+    cursor = decode_cursor(request.args.get('cursor', ''), sort_by, order) if request.args.get('cursor') else None
+    seek_sql, seek_params, order_sql, seek_key_sql = match_seek(sort_by, order, cursor)
+    if cursor:
+        page = int(cursor['p'])
+    elif page < 1:
+        page = 1
 
-    analytics_query = """
-        WITH ranked_matches AS (
-            -- FIXED: Deduplicate by team IDs instead of scores to prevent data loss
-            -- Each match appears twice in data with swapped home/away teams
-            -- Keep only the first one based on team_id pair + date
-            SELECT
+    # Page rows, total count and the most common league (analytics default) in one
+    # statement: the filtered join is scanned once into `filtered` and read three
+    # ways, instead of a COUNT(*), a GROUP BY league and the paged SELECT each
+    # scanning it. The summary row is always returned, even for an empty page.
+    # The summary is cached per filter set until Matches/Teams change (db_api count
+    # cache); on a hit, or when the planner expects a huge result, only the page is
+    # read, straight off the seek indexes.
+    top_league_sql = "NULL::text" if selected_league else "mode() WITHIN GROUP (ORDER BY league)"
+    columns_sql = """
                 m.match_id,
-                m.match_date,
-                m.home_score,
-                m.away_score,
+                m.match_date, 
+                m.match_hour, 
+                t1.team_name AS home_team, 
+                m.home_score, 
+                m.away_score, 
+                t2.team_name AS away_team, 
+                m.match_saloon, 
+                m.league,
+                m.match_week,
+                m.match_city,
                 m.home_team_id,
-                m.away_team_id,
-                ROW_NUMBER() OVER (
-                    PARTITION BY m.match_date,
-                                 LEAST(m.home_team_id, m.away_team_id),
-                                 GREATEST(m.home_team_id, m.away_team_id)
-                    ORDER BY m.match_id
-                ) as rn
-            FROM Matches m
-            WHERE m.league = %s AND m.home_score IS NOT NULL AND m.away_score IS NOT NULL
-        ),
-        unique_matches AS (
-            SELECT match_id, match_date, home_score, away_score, home_team_id, away_team_id
-            FROM ranked_matches
-            WHERE rn = 1
+                m.away_team_id"""
+    from_sql = f"""
+            FROM matches m
+            JOIN teams t1 ON m.home_team_id = t1.team_id
+            JOIN teams t2 ON m.away_team_id = t2.team_id
+            WHERE {where_sql}"""
+    main_query = f"""
+        WITH filtered AS MATERIALIZED (
+            SELECT {columns_sql}
+            {from_sql}
         ),
-        match_results AS (
-            -- Home team results
-            SELECT 
-                t.team_name,
-                um.match_id,
-                um.home_score AS scored, 
-                um.away_score AS conceded,
-                CASE WHEN um.home_score > um.away_score THEN 1 ELSE 0 END AS won,
-                CASE WHEN um.home_score < um.away_score THEN 1 ELSE 0 END AS lost
-            FROM unique_matches um
-            JOIN Teams t ON um.home_team_id = t.team_id
-            UNION ALL
-            -- Away team results  
-            SELECT 
-                t.team_name,
-                um.match_id,
-                um.away_score AS scored, 
-                um.home_score AS conceded,
-                CASE WHEN um.away_score > um.home_score THEN 1 ELSE 0 END AS won,
-                CASE WHEN um.away_score < um.home_score THEN 1 ELSE 0 END AS lost
-            FROM unique_matches um
-            JOIN Teams t ON um.away_team_id = t.team_id
+        summary AS (
+            SELECT COUNT(*) AS total_count, {top_league_sql} AS top_league
+            FROM filtered
         ),
-        team_stats AS (
-            SELECT 
-                team_name,
-                COUNT(*) as games_played,
-                SUM(won) as wins,
-                SUM(lost) as losses,
-                ROUND(AVG(scored)::numeric, 1) as avg_points_scored,
-                ROUND(AVG(conceded)::numeric, 1) as avg_points_conceded
-            FROM match_results
-            GROUP BY team_name
-            HAVING COUNT(*) >= 3
+        page AS (
+            SELECT m.*, {seek_key_sql}
+            FROM filtered m
+            WHERE TRUE {seek_sql}
+            ORDER BY {order_sql}
+            LIMIT %s OFFSET %s
         )
-        SELECT 
-            team_name,
-            games_played,
-            wins,
-            losses,
-            ROUND((wins * 100.0 / games_played)::numeric, 1) as win_pct,
-            avg_points_scored,
-            avg_points_conceded,
-            ROUND((avg_points_scored - avg_points_conceded)::numeric, 1) as point_diff
-        FROM team_stats
-        ORDER BY win_pct DESC, point_diff DESC
+        SELECT s.total_count, s.top_league, m.*
+        FROM summary s
+        LEFT JOIN page m ON TRUE
+        ORDER BY {order_sql}
+    """
+    page_query = f"""
+        SELECT {columns_sql},
+               {seek_key_sql}
+        {from_sql} {seek_sql}
+        ORDER BY {order_sql}
+        LIMIT %s OFFSET %s
     """
-    analytics_rows = db_api.query(analytics_query, (analytics_league,))
-    analytics = [{
-        'team_name': row[0],
-        'games_played': row[1],
-        'wins': row[2],
-        'losses': row[3],
-        'win_pct': float(row[4]) if row[4] else 0,
-        'avg_points_scored': float(row[5]) if row[5] else 0,
-        'avg_points_conceded': float(row[6]) if row[6] else 0,
-        'point_diff': float(row[7]) if row[7] else 0
-    } for row in analytics_rows]
+
+    count_key = db_api.count_key('matches', from_sql + top_league_sql, params)
+    count_versions = db_api.table_versions(('matches', 'teams'))
+    summary = db_api.count_cache_get(count_key, count_versions)
+    count_approximate = False
+    if summary is None and request.args.get('exact_count') != '1':
+        estimate = db_api.estimate_rows(from_sql, tuple(params))
+        if estimate >= db_api.COUNT_ESTIMATE_THRESHOLD:
+            # Sayı tahmini; analitik panellerin ligi yine filtrelenmiş listenin en sık ligi
+            top_league = None if selected_league else matches_top_league(where_sql, params, count_versions)
+            summary, count_approximate = (estimate, top_league), True
+
+    def fetch_page(offset):
+        nonlocal summary
+        # Bir fazla satır: sonraki (geri giderken önceki) sayfa var mı
+        query_params = tuple(params) + seek_params + (per_page + 1, offset)
+        if summary is not None:
+            rows = db_api.query(page_query, query_params, row_format='dict')
+            return summary[0], summary[1], rows
+        rows = db_api.query(main_query, query_params, row_format='dict')
+        summary = (rows[0]['total_count'], rows[0]['top_league'])
+        db_api.count_cache_put(count_key, count_versions, summary)
+        return summary[0], summary[1], [
+            {k: v for k, v in row.items() if k not in ('total_count', 'top_league')}
+            for row in rows if row['match_id'] is not None
+        ]
+
+    total_count, top_league, matches = fetch_page(0 if cursor else (page - 1) * per_page)
+    total_pages = math.ceil(total_count / per_page) if total_count > 0 else 1
+    if not cursor and page > total_pages and not count_approximate:
+        # ?page=N son sayfadan büyük: son sayfa gösterilir (seyrek yol, ikinci sorgu)
+        page = total_pages
+        total_count, top_league, matches = fetch_page((page - 1) * per_page)
+    matches, has_prev, prev_cursor, has_next, next_cursor = match_page_cursors(
+        matches, per_page, page, cursor, sort_by, order)
+
+    def page_url(token):
+        link_args = {k: v for k, v in request.args.to_dict(flat=False).items() if k not in ('page', 'cursor', 'exact_count')}
+        if token:
+            link_args['cursor'] = token
+        return url_for('matches_page', **link_args)
+    first_url = page_url(None)
+    prev_url = page_url(prev_cursor) if has_prev else None
+    next_url = page_url(next_cursor) if next_cursor else None
     
+    # ==================== COMPLEX QUERY 1: Team Performance (per-team aggregates) ====================
+    # Real-world meaningful stat: Team performance summary with wins, losses, averages
+    # Use the selected league filter, or the most common league of the filtered list
+    analytics_league = selected_league or top_league or 'bsl-2024-2025'
+
+    analytics_display_season = analytics_league.replace('bsl-', '').upper() if analytics_league else 'All Seasons'
+
+    # Panels read unique_matches: scored games, materialized and indexed per league
+    # (migration 0006), refreshed by match writes and ingests. Per-team totals come
+    # from team_season_stats (0007, kept up to date by triggers on Matches)
+    analytics_query = TEAM_PERFORMANCE_PANEL_SQL
+
     # ==================== COMPLEX QUERY 2: 4+ Table JOIN ====================
     # Joins: Matches + Teams(home) + Teams(away) + Standings(home) + Standings(away)
     # Shows matches with team standings info
@@ -1100,54 +1296,26 @@ def matches_page():
             COALESCE(s1.team_wins, 0) AS home_team_wins,
             COALESCE(s2.team_wins, 0) AS away_team_wins,
             m.league
-        FROM Matches m
+        FROM unique_matches m
         INNER JOIN Teams t1 ON m.home_team_id = t1.team_id
         INNER JOIN Teams t2 ON m.away_team_id = t2.team_id
         LEFT OUTER JOIN Standings s1 ON t1.team_name = s1.team_name AND m.league = s1.league
         LEFT OUTER JOIN Standings s2 ON t2.team_name = s2.team_name AND m.league = s2.league
-        WHERE m.home_score IS NOT NULL 
-          AND m.away_score IS NOT NULL
+        WHERE m.away_score IS NOT NULL
           AND m.league = %s
         ORDER BY m.match_date DESC
         LIMIT 10
     """
-    try:
-        complex_join_rows = db_api.query(complex_join_query, (analytics_league,))
-        complex_join_data = [{
-            'match_id': row[0],
-            'home_team': row[1],
-            'away_team': row[2],
-            'home_score': row[3],
-            'away_score': row[4],
-            'home_rank': row[5],
-            'away_rank': row[6],
-            'home_wins': row[7],
-            'away_wins': row[8],
-            'league': row[9]
-        } for row in complex_join_rows]
-    except Exception as e:
-        print(f"Complex join error: {e}")
-        complex_join_data = []
-    
+
     # ==================== COMPLEX QUERY 3: NESTED SUBQUERY ====================
     # Find matches with above-average home team performance
     nested_subquery = """
-        WITH ranked_matches AS (
-            SELECT m.*,
-                   ROW_NUMBER() OVER (
-                       PARTITION BY m.match_date,
-                                    LEAST(m.home_team_id, m.away_team_id),
-                                    GREATEST(m.home_team_id, m.away_team_id)
-                       ORDER BY m.match_id
-                   ) as rn
-            FROM Matches m
-            WHERE m.league = %s AND m.home_score IS NOT NULL AND m.away_score IS NOT NULL
-        ),
-        unique_matches AS (
-            SELECT * FROM ranked_matches WHERE rn = 1
+        WITH league_matches AS (
+            SELECT m.* FROM unique_matches m
+            WHERE m.league = %s AND m.away_score IS NOT NULL
         ),
         league_avg AS (
-            SELECT AVG(home_score) as avg_score FROM unique_matches
+            SELECT AVG(home_score) as avg_score FROM league_matches
         )
         SELECT
             m.match_id,
@@ -1157,7 +1325,7 @@ def matches_page():
             m.away_score,
             m.match_date,
             la.avg_score
-        FROM unique_matches m
+        FROM league_matches m
         JOIN Teams t1 ON m.home_team_id = t1.team_id
         JOIN Teams t2 ON m.away_team_id = t2.team_id
         CROSS JOIN league_avg la
@@ -1165,42 +1333,19 @@ def matches_page():
         ORDER BY m.home_score DESC
         LIMIT 20
     """
-    try:
-        nested_rows = db_api.query(nested_subquery, (analytics_league,))
-        nested_data = [{
-            'match_id': row[0],
-            'home_team': row[1],
-            'away_team': row[2],
-            'home_score': row[3],
-            'away_score': row[4],
-            'match_date': row[5]
-        } for row in nested_rows]
-    except Exception as e:
-        print(f"Nested subquery error: {e}")
-        nested_data = []
-    
+
     # ==================== COMPLEX QUERY 4: LEFT OUTER JOIN ====================
     # Shows teams participation statistics - demonstrates OUTER JOIN
     # Some teams may have registered but not played all their matches
     outer_join_query = """
-        WITH ranked_matches AS (
-            SELECT m.*,
-                   ROW_NUMBER() OVER (
-                       PARTITION BY m.match_date,
-                                    LEAST(m.home_team_id, m.away_team_id),
-                                    GREATEST(m.home_team_id, m.away_team_id)
-                       ORDER BY m.match_id
-                   ) as rn
-            FROM Matches m
-            WHERE m.league = %s AND m.home_score IS NOT NULL
-        ),
-        unique_matches AS (
-            SELECT * FROM ranked_matches WHERE rn = 1
+        WITH league_matches AS (
+            SELECT m.* FROM unique_matches m
+            WHERE m.league = %s
         ),
         league_teams AS (
-            SELECT DISTINCT home_team_id AS team_id FROM unique_matches
+            SELECT DISTINCT home_team_id AS team_id FROM league_matches
             UNION
-            SELECT DISTINCT away_team_id AS team_id FROM unique_matches
+            SELECT DISTINCT away_team_id AS team_id FROM league_matches
         )
         SELECT 
             t.team_id,
@@ -1212,51 +1357,29 @@ def matches_page():
                               ELSE 0 END), 0) AS wins
         FROM Teams t
         INNER JOIN league_teams lt ON t.team_id = lt.team_id
-        LEFT OUTER JOIN unique_matches m ON (t.team_id = m.home_team_id OR t.team_id = m.away_team_id)
+        LEFT OUTER JOIN league_matches m ON (t.team_id = m.home_team_id OR t.team_id = m.away_team_id)
         GROUP BY t.team_id, t.team_name
         ORDER BY total_matches DESC, wins DESC
         LIMIT 16
     """
-    try:
-        outer_join_rows = db_api.query(outer_join_query, (analytics_league, analytics_league))
-        outer_join_data = [{
-            'team_id': row[0],
-            'team_name': row[1],
-            'league': row[2],
-            'total_matches': row[3],
-            'wins': row[4]
-        } for row in outer_join_rows]
-    except Exception as e:
-        print(f"Outer join error: {e}")
-        outer_join_data = []
-    
+
     # ==================== COMPLEX QUERY 5: SET OPERATIONS (UNION) ====================
     # Teams that won at home UNION Teams that won away
     set_operation_query = """
-        WITH ranked_matches AS (
-            SELECT m.*,
-                   ROW_NUMBER() OVER (
-                       PARTITION BY m.match_date,
-                                    LEAST(m.home_team_id, m.away_team_id),
-                                    GREATEST(m.home_team_id, m.away_team_id)
-                       ORDER BY m.match_id
-                   ) as rn
-            FROM Matches m
-            WHERE m.league = %s AND m.home_score IS NOT NULL AND m.away_score IS NOT NULL
-        ),
-        unique_matches AS (
-            SELECT * FROM ranked_matches WHERE rn = 1
+        WITH league_matches AS (
+            SELECT m.* FROM unique_matches m
+            WHERE m.league = %s AND m.away_score IS NOT NULL
         ),
         home_wins AS (
             SELECT DISTINCT t.team_name, 'Home Win' AS win_type, m.match_date, m.home_score, m.away_score, t2.team_name as opponent
-            FROM unique_matches m
+            FROM league_matches m
             JOIN Teams t ON m.home_team_id = t.team_id
             JOIN Teams t2 ON m.away_team_id = t2.team_id
             WHERE m.home_score > m.away_score
         ),
         away_wins AS (
             SELECT DISTINCT t.team_name, 'Away Win' AS win_type, m.match_date, m.away_score as home_score, m.home_score as away_score, t2.team_name as opponent
-            FROM unique_matches m
+            FROM league_matches m
             JOIN Teams t ON m.away_team_id = t.team_id
             JOIN Teams t2 ON m.home_team_id = t2.team_id
             WHERE m.away_score > m.home_score
@@ -1269,36 +1392,13 @@ def matches_page():
         ORDER BY match_date DESC
         LIMIT 20
     """
-    try:
-        set_op_rows = db_api.query(set_operation_query, (analytics_league,))
-        set_operation_data = [{
-            'team_name': row[0],
-            'win_type': row[1],
-            'match_date': row[2],
-            'team_score': row[3],
-            'opponent_score': row[4],
-            'opponent': row[5]
-        } for row in set_op_rows]
-    except Exception as e:
-        print(f"Set operation error: {e}")
-        set_operation_data = []
-    
+
     # ==================== HEAD-TO-HEAD STATISTICS ====================
     # FIXED: Normalize team pairs to avoid duplicate rivalries
     h2h_query = """
-        WITH ranked_matches AS (
-            SELECT m.*,
-                   ROW_NUMBER() OVER (
-                       PARTITION BY m.match_date,
-                                    LEAST(m.home_team_id, m.away_team_id),
-                                    GREATEST(m.home_team_id, m.away_team_id)
-                       ORDER BY m.match_id
-                   ) as rn
-            FROM Matches m
-            WHERE m.league = %s AND m.home_score IS NOT NULL AND m.away_score IS NOT NULL
-        ),
-        unique_matches AS (
-            SELECT * FROM ranked_matches WHERE rn = 1
+        WITH league_matches AS (
+            SELECT m.* FROM unique_matches m
+            WHERE m.league = %s AND m.away_score IS NOT NULL
         ),
         all_matchups AS (
             SELECT
@@ -1317,7 +1417,7 @@ def matches_page():
                         CASE WHEN m.away_score < m.home_score THEN 1 ELSE 0 END
                 END AS team2_won,
                 CASE WHEN m.home_score = m.away_score THEN 1 ELSE 0 END AS is_draw
-            FROM unique_matches m
+            FROM league_matches m
             JOIN Teams t1 ON m.home_team_id = t1.team_id
             JOIN Teams t2 ON m.away_team_id = t2.team_id
         )
@@ -1334,8 +1434,172 @@ def matches_page():
         ORDER BY total_games DESC, team1_wins DESC
         LIMIT 20
     """
+
+    # ==================== QUICK STATS FOR DASHBOARD ====================
+    quick_stats_query = """
+        WITH league_matches AS (
+            SELECT m.* FROM unique_matches m
+            WHERE m.league = %s AND m.away_score IS NOT NULL
+        )
+        SELECT
+            COUNT(*) AS total_matches,
+            COUNT(CASE WHEN home_score > away_score THEN 1 END) AS home_wins,
+            COUNT(CASE WHEN home_score < away_score THEN 1 END) AS away_wins,
+            COUNT(CASE WHEN home_score = away_score THEN 1 END) AS draws,
+            ROUND(AVG(home_score + away_score)::numeric, 1) AS avg_total_score,
+            MAX(home_score + away_score) AS highest_score,
+            (SELECT COUNT(DISTINCT team_id) FROM (
+                SELECT home_team_id AS team_id FROM league_matches
+                UNION
+                SELECT away_team_id AS team_id FROM league_matches
+            ) t) AS unique_teams
+        FROM league_matches
+    """
+
+    # ==================== NEW: BIGGEST BLOWOUTS ====================
+    blowouts_query = """
+        WITH league_matches AS (
+            SELECT m.* FROM unique_matches m
+            WHERE m.league = %s AND m.away_score IS NOT NULL
+        )
+        SELECT
+            t1.team_name AS winner,
+            t2.team_name AS loser,
+            CASE WHEN m.home_score > m.away_score THEN m.home_score ELSE m.away_score END AS winner_score,
+            CASE WHEN m.home_score > m.away_score THEN m.away_score ELSE m.home_score END AS loser_score,
+            ABS(m.home_score - m.away_score) AS point_diff,
+            m.match_date,
+            CASE WHEN m.home_score > m.away_score THEN 'Home' ELSE 'Away' END AS winner_location
+        FROM league_matches m
+        JOIN Teams t1 ON m.home_team_id = t1.team_id
+        JOIN Teams t2 ON m.away_team_id = t2.team_id
+        WHERE ABS(m.home_score - m.away_score) >= 20
+        ORDER BY point_diff DESC, m.match_date DESC
+        LIMIT 10
+    """
+
+    # ==================== NEW: HOME VS AWAY PERFORMANCE ====================
+    home_away_query = HOME_AWAY_PANEL_SQL
+
+    # ==================== NEW: LEAGUE AVERAGE FOR NESTED QUERY ====================
+    league_avg_query = """
+        WITH league_matches AS (
+            SELECT m.* FROM unique_matches m
+            WHERE m.league = %s
+        )
+        SELECT ROUND(AVG(home_score)::numeric, 1) as avg_home_score
+        FROM league_matches
+    """
+
+    # ==================== RUN ALL ANALYTICS PANELS CONCURRENTLY ====================
+    # Panels are independent of each other: run them in parallel on separate pooled
+    # connections (sharing this request's snapshot), so the page waits for the slowest
+    # panel instead of the sum. A failing or timed-out panel falls back to an empty result
+    # and is listed in failed_panels (shown above the analytics, returned in JSON).
+    panel_statements = {
+        'analytics': (analytics_query, (analytics_league,)),
+        'complex_join': (complex_join_query, (analytics_league,)),
+        'nested': (nested_subquery, (analytics_league,)),
+        'outer_join': (outer_join_query, (analytics_league, analytics_league)),
+        'set_operation': (set_operation_query, (analytics_league,)),
+        'h2h': (h2h_query, (analytics_league,)),
+    }
+    if fmt != 'json':
+        panel_statements.update({
+            'quick_stats': (quick_stats_query, (analytics_league,)),
+            'blowouts': (blowouts_query, (analytics_league,)),
+            'home_away': (home_away_query, (analytics_league,)),
+            'league_avg': (league_avg_query, (analytics_league,)),
+        })
+    panel_results = dict(zip(
+        panel_statements,
+        db_api.query_parallel(list(panel_statements.values()), timeout=db_api.PANEL_TIMEOUT, prepare=True)
+    ))
+    # Hata veren / zaman aşımına uğrayan paneller boş gösterilir, sayfada da belirtilir
+    failed_panels = [name for name, result in panel_results.items() if isinstance(result, Exception)]
+
+    try:
+        analytics_rows = db_api.result_or_raise(panel_results['analytics'])
+        analytics = [{
+            'team_name': row[0],
+            'games_played': row[1],
+            'wins': row[2],
+            'losses': row[3],
+            'win_pct': float(row[4]) if row[4] else 0,
+            'avg_points_scored': float(row[5]) if row[5] else 0,
+            'avg_points_conceded': float(row[6]) if row[6] else 0,
+            'point_diff': float(row[7]) if row[7] else 0
+        } for row in analytics_rows]
+    except Exception as e:
+        print(f"Team performance error: {e}")
+        analytics = []
+    
+    # ==================== COMPLEX QUERY 2: 4+ Table JOIN ====================
+    try:
+        complex_join_rows = db_api.result_or_raise(panel_results['complex_join'])
+        complex_join_data = [{
+            'match_id': row[0],
+            'home_team': row[1],
+            'away_team': row[2],
+            'home_score': row[3],
+            'away_score': row[4],
+            'home_rank': row[5],
+            'away_rank': row[6],
+            'home_wins': row[7],
+            'away_wins': row[8],
+            'league': row[9]
+        } for row in complex_join_rows]
+    except Exception as e:
+        print(f"Complex join error: {e}")
+        complex_join_data = []
+    
+    # ==================== COMPLEX QUERY 3: NESTED SUBQUERY ====================
+    try:
+        nested_rows = db_api.result_or_raise(panel_results['nested'])
+        nested_data = [{
+            'match_id': row[0],
+            'home_team': row[1],
+            'away_team': row[2],
+            'home_score': row[3],
+            'away_score': row[4],
+            'match_date': row[5]
+        } for row in nested_rows]
+    except Exception as e:
+        print(f"Nested subquery error: {e}")
+        nested_data = []
+    
+    # ==================== COMPLEX QUERY 4: LEFT OUTER JOIN ====================
+    try:
+        outer_join_rows = db_api.result_or_raise(panel_results['outer_join'])
+        outer_join_data = [{
+            'team_id': row[0],
+            'team_name': row[1],
+            'league': row[2],
+            'total_matches': row[3],
+            'wins': row[4]
+        } for row in outer_join_rows]
+    except Exception as e:
+        print(f"Outer join error: {e}")
+        outer_join_data = []
+    
+    # ==================== COMPLEX QUERY 5: SET OPERATIONS (UNION) ====================
+    try:
+        set_op_rows = db_api.result_or_raise(panel_results['set_operation'])
+        set_operation_data = [{
+            'team_name': row[0],
+            'win_type': row[1],
+            'match_date': row[2],
+            'team_score': row[3],
+            'opponent_score': row[4],
+            'opponent': row[5]
+        } for row in set_op_rows]
+    except Exception as e:
+        print(f"Set operation error: {e}")
+        set_operation_data = []
+    
+    # ==================== HEAD-TO-HEAD STATISTICS ====================
     try:
-        h2h_rows = db_api.query(h2h_query, (analytics_league,))
+        h2h_rows = db_api.result_or_raise(panel_results['h2h'])
         h2h_data = [{
             'team1': row[0],
             'team2': row[1],
@@ -1351,42 +1615,20 @@ def matches_page():
     if fmt == 'json':
         return jsonify({
             'matches': matches,
-            'pagination': {'page': page, 'per_page': per_page, 'total': total_count, 'pages': total_pages},
-            'analytics': analytics
+            # Sonraki/önceki sayfa için cursor=<next_cursor|prev_cursor>; prev_cursor None ve
+            # has_prev true ise önceki sayfa ilk sayfadır (cursor'suz istek)
+            # approximate: total/pages planlayıcı tahmini; kesin sayı için exact_count=1
+            'pagination': {'page': page, 'per_page': per_page, 'total': total_count, 'pages': total_pages,
+                           'approximate': count_approximate,
+                           'has_next': has_next, 'has_prev': has_prev,
+                           'next_cursor': next_cursor, 'prev_cursor': prev_cursor},
+            'analytics': analytics,
+            'failed_panels': failed_panels
         })
     
     # ==================== QUICK STATS FOR DASHBOARD ====================
-    quick_stats_query = """
-        WITH ranked_matches AS (
-            SELECT m.*,
-                   ROW_NUMBER() OVER (
-                       PARTITION BY m.match_date,
-                                    LEAST(m.home_team_id, m.away_team_id),
-                                    GREATEST(m.home_team_id, m.away_team_id)
-                       ORDER BY m.match_id
-                   ) as rn
-            FROM Matches m
-            WHERE m.league = %s AND m.home_score IS NOT NULL AND m.away_score IS NOT NULL
-        ),
-        unique_matches AS (
-            SELECT * FROM ranked_matches WHERE rn = 1
-        )
-        SELECT
-            COUNT(*) AS total_matches,
-            COUNT(CASE WHEN home_score > away_score THEN 1 END) AS home_wins,
-            COUNT(CASE WHEN home_score < away_score THEN 1 END) AS away_wins,
-            COUNT(CASE WHEN home_score = away_score THEN 1 END) AS draws,
-            ROUND(AVG(home_score + away_score)::numeric, 1) AS avg_total_score,
-            MAX(home_score + away_score) AS highest_score,
-            (SELECT COUNT(DISTINCT team_id) FROM (
-                SELECT home_team_id AS team_id FROM unique_matches
-                UNION
-                SELECT away_team_id AS team_id FROM unique_matches
-            ) t) AS unique_teams
-        FROM unique_matches
-    """
     try:
-        stats_row = db_api.query(quick_stats_query, (analytics_league,))[0]
+        stats_row = db_api.result_or_raise(panel_results['quick_stats'])[0]
         quick_stats = {
             'total_matches': stats_row[0],
             'home_wins': stats_row[1],
@@ -1400,38 +1642,8 @@ def matches_page():
         quick_stats = {}
 
     # ==================== NEW: BIGGEST BLOWOUTS ====================
-    blowouts_query = """
-        WITH ranked_matches AS (
-            SELECT m.*,
-                   ROW_NUMBER() OVER (
-                       PARTITION BY m.match_date,
-                                    LEAST(m.home_team_id, m.away_team_id),
-                                    GREATEST(m.home_team_id, m.away_team_id)
-                       ORDER BY m.match_id
-                   ) as rn
-            FROM Matches m
-            WHERE m.league = %s AND m.home_score IS NOT NULL AND m.away_score IS NOT NULL
-        ),
-        unique_matches AS (
-            SELECT * FROM ranked_matches WHERE rn = 1
-        )
-        SELECT
-            t1.team_name AS winner,
-            t2.team_name AS loser,
-            CASE WHEN m.home_score > m.away_score THEN m.home_score ELSE m.away_score END AS winner_score,
-            CASE WHEN m.home_score > m.away_score THEN m.away_score ELSE m.home_score END AS loser_score,
-            ABS(m.home_score - m.away_score) AS point_diff,
-            m.match_date,
-            CASE WHEN m.home_score > m.away_score THEN 'Home' ELSE 'Away' END AS winner_location
-        FROM unique_matches m
-        JOIN Teams t1 ON m.home_team_id = t1.team_id
-        JOIN Teams t2 ON m.away_team_id = t2.team_id
-        WHERE ABS(m.home_score - m.away_score) >= 20
-        ORDER BY point_diff DESC, m.match_date DESC
-        LIMIT 10
-    """
     try:
-        blowouts_rows = db_api.query(blowouts_query, (analytics_league,))
+        blowouts_rows = db_api.result_or_raise(panel_results['blowouts'])
         biggest_blowouts = [{
             'winner': row[0],
             'loser': row[1],
@@ -1446,59 +1658,8 @@ def matches_page():
         biggest_blowouts = []
 
     # ==================== NEW: HOME VS AWAY PERFORMANCE ====================
-    home_away_query = """
-        WITH ranked_matches AS (
-            SELECT m.*,
-                   ROW_NUMBER() OVER (
-                       PARTITION BY m.match_date,
-                                    LEAST(m.home_team_id, m.away_team_id),
-                                    GREATEST(m.home_team_id, m.away_team_id)
-                       ORDER BY m.match_id
-                   ) as rn
-            FROM Matches m
-            WHERE m.league = %s AND m.home_score IS NOT NULL AND m.away_score IS NOT NULL
-        ),
-        unique_matches AS (
-            SELECT * FROM ranked_matches WHERE rn = 1
-        ),
-        home_stats AS (
-            SELECT
-                t.team_name,
-                COUNT(*) as home_games,
-                SUM(CASE WHEN m.home_score > m.away_score THEN 1 ELSE 0 END) as home_wins,
-                ROUND(AVG(m.home_score)::numeric, 1) as avg_home_scored
-            FROM unique_matches m
-            JOIN Teams t ON m.home_team_id = t.team_id
-            GROUP BY t.team_name
-        ),
-        away_stats AS (
-            SELECT
-                t.team_name,
-                COUNT(*) as away_games,
-                SUM(CASE WHEN m.away_score > m.home_score THEN 1 ELSE 0 END) as away_wins,
-                ROUND(AVG(m.away_score)::numeric, 1) as avg_away_scored
-            FROM unique_matches m
-            JOIN Teams t ON m.away_team_id = t.team_id
-            GROUP BY t.team_name
-        )
-        SELECT
-            COALESCE(h.team_name, a.team_name) as team_name,
-            COALESCE(h.home_games, 0) as home_games,
-            COALESCE(h.home_wins, 0) as home_wins,
-            COALESCE(h.avg_home_scored, 0) as avg_home_scored,
-            COALESCE(a.away_games, 0) as away_games,
-            COALESCE(a.away_wins, 0) as away_wins,
-            COALESCE(a.avg_away_scored, 0) as avg_away_scored,
-            CASE WHEN h.home_games > 0 THEN ROUND((h.home_wins * 100.0 / h.home_games)::numeric, 1) ELSE 0 END as home_win_pct,
-            CASE WHEN a.away_games > 0 THEN ROUND((a.away_wins * 100.0 / a.away_games)::numeric, 1) ELSE 0 END as away_win_pct
-        FROM home_stats h
-        FULL OUTER JOIN away_stats a ON h.team_name = a.team_name
-        WHERE COALESCE(h.home_games, 0) + COALESCE(a.away_games, 0) >= 5
-        ORDER BY (COALESCE(h.home_games, 0) + COALESCE(a.away_games, 0)) DESC
-        LIMIT 12
-    """
     try:
-        home_away_rows = db_api.query(home_away_query, (analytics_league,))
+        home_away_rows = db_api.result_or_raise(panel_results['home_away'])
         home_away_stats = [{
             'team_name': row[0],
             'home_games': row[1],
@@ -1516,25 +1677,7 @@ def matches_page():
 
     # ==================== NEW: LEAGUE AVERAGE FOR NESTED QUERY ====================
     try:
-        league_avg_query = """
-            WITH ranked_matches AS (
-                SELECT m.*,
-                       ROW_NUMBER() OVER (
-                           PARTITION BY m.match_date,
-                                        LEAST(m.home_team_id, m.away_team_id),
-                                        GREATEST(m.home_team_id, m.away_team_id)
-                           ORDER BY m.match_id
-                       ) as rn
-                FROM Matches m
-                WHERE m.league = %s AND m.home_score IS NOT NULL
-            ),
-            unique_matches AS (
-                SELECT * FROM ranked_matches WHERE rn = 1
-            )
-            SELECT ROUND(AVG(home_score)::numeric, 1) as avg_home_score
-            FROM unique_matches
-        """
-        avg_result = db_api.query(league_avg_query, (analytics_league,))
+        avg_result = db_api.result_or_raise(panel_results['league_avg'])
         league_avg_home_score = float(avg_result[0][0]) if avg_result and avg_result[0][0] else 0
     except:
         league_avg_home_score = 0
@@ -1554,11 +1697,17 @@ def matches_page():
         biggest_blowouts=biggest_blowouts,
         home_away_stats=home_away_stats,
         league_avg_home_score=league_avg_home_score,
+        failed_panels=failed_panels,
         # Pagination data
         current_page=page,
         total_pages=total_pages,
+        first_url=first_url,
+        prev_url=prev_url,
+        next_url=next_url,
         per_page=per_page,
         total_count=total_count,
+        count_approximate=count_approximate,
+        exact_count_url=url_for('matches_page', **dict(request.args.to_dict(flat=False), exact_count='1')),
         # Filter data for dropdowns
         leagues=leagues,
         cities=cities,
@@ -1587,6 +1736,42 @@ def matches_page():
     )
 
 # --- MATCHES: CREATE (Add Match) ---
+# Matches: each game is stored once. Same league + date + team pair (in either
+# home/away order) is the same game; source IDs of its mirrored copies are kept in
+# match_aliases and resolve to the stored row.
+def find_same_match(league, match_date, home_team_id, away_team_id, exclude_id=None):
+    if not match_date:
+        return None
+    rows = db_api.query("""
+        SELECT match_id FROM Matches
+        WHERE match_date = %s AND league = %s
+          AND ((home_team_id = %s AND away_team_id = %s) OR (home_team_id = %s AND away_team_id = %s))
+          AND match_id IS DISTINCT FROM %s
+        LIMIT 1
+    """, (match_date, league, home_team_id, away_team_id, away_team_id, home_team_id, exclude_id))
+    return rows[0][0] if rows else None
+
+def resolve_match_id(match_id):
+    rows = db_api.query("SELECT match_id FROM match_aliases WHERE source_match_id = %s", (match_id,))
+    return rows[0][0] if rows else match_id
+
+MATCH_ID_TAKEN_SQL = """
+    SELECT 1 FROM Matches WHERE match_id = %s
+    UNION ALL
+    SELECT 1 FROM match_aliases WHERE source_match_id = %s
+"""
+
+def match_league(match_id):
+    rows = db_api.query("SELECT league FROM Matches WHERE match_id = %s", (match_id,))
+    return rows[0][0] if rows else None
+
+def execute_match_write(sql, params, leagues):
+    # unique_matches (analytics panels) is refreshed for the touched leagues in the
+    # same transaction as the write, so the panels never see half of a change
+    leagues = sorted({league for league in leagues if league})
+    db_api.execute(sql + ";\n        SELECT refresh_unique_matches(l) FROM unnest(%s::text[]) AS l",
+                   tuple(params) + (leagues,))
+
 @app.route('/matches/add', methods=['POST'])
 @login_required
 def add_match():
@@ -1615,12 +1800,22 @@ def add_match():
             flash("Error: Home and away teams cannot be the same!", "danger")
             return redirect(url_for('matches_page'))
         
+        # Canonical storage: the same game (also with home/away swapped) is stored once
+        same_match = find_same_match(league, match_date, home_team_id, away_team_id)
+        if same_match:
+            flash(f"Error: This game is already recorded (ID: {same_match})!", "danger")
+            return redirect(url_for('matches_page'))
+
         # AUTO-GENERATE match_id: Format = "1EA" + number (e.g., 1EA263, 1EA4509, 1EA10000...)
-        # Find the highest existing match_id number and increment
+        # Find the highest existing match_id number (stored or aliased) and increment
         max_id_query = """
-            SELECT COALESCE(MAX(CAST(SUBSTRING(match_id FROM 4) AS INTEGER)), 4999) 
-            FROM Matches 
-            WHERE match_id ~ '^1EA[0-9]+$'
+            SELECT COALESCE(MAX(CAST(SUBSTRING(id FROM 4) AS INTEGER)), 4999)
+            FROM (
+                SELECT match_id AS id FROM Matches
+                UNION ALL
+                SELECT source_match_id FROM match_aliases
+            ) ids
+            WHERE id ~ '^1EA[0-9]+$'
         """
         max_result = db_api.query(max_id_query)
         print(f"DEBUG max_result: {max_result}")
@@ -1634,11 +1829,11 @@ def add_match():
         print(f"DEBUG match_id: {match_id}")
         
         # Ensure uniqueness (in case of conflicts)
-        existing = db_api.query("SELECT 1 FROM Matches WHERE match_id = %s", (match_id,))
+        existing = db_api.query(MATCH_ID_TAKEN_SQL, (match_id, match_id))
         while existing and len(existing) > 0:
             next_num += 1
             match_id = f"1EA{next_num}"
-            existing = db_api.query("SELECT 1 FROM Matches WHERE match_id = %s", (match_id,))
+            existing = db_api.query(MATCH_ID_TAKEN_SQL, (match_id, match_id))
         
         # Handle scores: convert to int or None
         try:
@@ -1661,10 +1856,10 @@ def add_match():
             ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
         """
         
-        db_api.execute(sql, (
+        execute_match_write(sql, (
             match_id, home_team_id, away_team_id, match_date, match_hour,
             home_score, away_score, match_week, league, match_city, match_saloon
-        ))
+        ), [league])
         
         flash(f"Match successfully added! (ID: {match_id})", "success")
         return redirect(url_for('matches_page'))
@@ -1682,7 +1877,7 @@ def update_match():
         data = request.form
         
         # Extract form data (convert empty strings to None for SQL NULL)
-        match_id = data.get('match_id')
+        match_id = resolve_match_id(data.get('match_id'))
         home_team_id = data.get('home_team_id')
         away_team_id = data.get('away_team_id')
         match_date = data.get('match_date') or None
@@ -1727,6 +1922,12 @@ def update_match():
         except ValueError:
             flash("Error: Scores must be valid numbers!", "danger")
             return redirect(url_for('matches_page'))
+
+        # Canonical storage: the edit must not turn this row into a copy of another game
+        same_match = find_same_match(league, match_date, home_team_id, away_team_id, exclude_id=match_id)
+        if same_match:
+            flash(f"Error: This game is already recorded (ID: {same_match})!", "danger")
+            return redirect(url_for('matches_page'))
         
         # SQL Update
         sql = """
@@ -1744,11 +1945,12 @@ def update_match():
             WHERE match_id = %s
         """
         
-        db_api.execute(sql, (
+        # A league change moves the game: both the old and the new league are refreshed
+        execute_match_write(sql, (
             home_team_id, away_team_id, match_date, match_hour,
             home_score, away_score, match_week, league, match_city, match_saloon,
             match_id
-        ))
+        ), [match_league(match_id), league])
         
         flash(f"Match updated! (ID: {match_id})", "success")
         return redirect(url_for('matches_page'))
@@ -1763,8 +1965,9 @@ def update_match():
 @login_required
 def delete_match(match_id):
     try:
+        match_id = resolve_match_id(match_id)
         sql = "DELETE FROM Matches WHERE match_id = %s"
-        db_api.execute(sql, (match_id,))
+        execute_match_write(sql, (match_id,), [match_league(match_id)])
         return jsonify({'success': True})
     except Exception as e:
         print(f"DELETE MATCH ERROR: {e}")
@@ -1772,18 +1975,42 @@ def delete_match(match_id):
 
 # 4. Teknik Ekip (Musa Can Turgut) – LIST + FILTER + PAGINATION
 # =========================================================
+# -----------------------------
+# STAFF FİLTRELERİ (liste + dışa aktarma)
+# -----------------------------
+def staff_filter(args):
+    f_name = args.get('name')
+    f_role = args.get('role')
+    f_team = args.get('team')
+    f_league = args.get('league')
+
+    where_clauses = []
+    params = []
+
+    if f_name:
+        where_clauses.append("tr.technic_member_name ILIKE %s")
+        params.append(f"%{f_name}%")
+
+    if f_role:
+        where_clauses.append("tr.technic_member_role ILIKE %s")
+        params.append(f"%{f_role}%")
+
+    if f_team:
+        where_clauses.append("t.team_name ILIKE %s")
+        params.append(f"%{f_team}%")
+
+    if f_league:
+        where_clauses.append("tr.league ILIKE %s")
+        params.append(f"%{f_league}%")
+
+    where_sql = (" WHERE " + " AND ".join(where_clauses)) if where_clauses else ""
+    return where_sql, params
+
 @app.route('/staff')
 def staff_page():
 
     # -----------------------------
-    # 1. Filtre Parametreleri
-    # -----------------------------
-    f_name = request.args.get('name')
-    f_role = request.args.get('role')
-    f_team = request.args.get('team')
-    f_league = request.args.get('league')
-
-    # Sayfalama
+    # 1. Sayfalama
     try:
         page = int(request.args.get('page', 1))
         per_page = 20
@@ -1809,70 +2036,52 @@ def staff_page():
     # -----------------------------
     # 3. FİLTRELER
     # -----------------------------
-    where_clauses = []
-    params = []
-    
-    if f_name:
-        where_clauses.append("tr.technic_member_name ILIKE %s")
-        params.append(f"%{f_name}%")
-
-    if f_role:
-        where_clauses.append("tr.technic_member_role ILIKE %s")
-        params.append(f"%{f_role}%")
-
-    if f_team:
-        where_clauses.append("t.team_name ILIKE %s")
-        params.append(f"%{f_team}%")
-
-    if f_league:
-        where_clauses.append("tr.league ILIKE %s")
-        params.append(f"%{f_league}%")
-
-    if where_clauses:
-        base_sql += " WHERE " + " AND ".join(where_clauses)
-
-    base_sql += " ORDER BY t.team_name NULLS LAST, tr.technic_member_name"
+    where_sql, params = staff_filter(request.args)
 
     # -----------------------------
-    # 4. QUERY ÇALIŞTIR
+    # 4. PAGINATION (SQL tarafında)
     # -----------------------------
+    # Tüm tabloyu Python'a çekip dilimlemek yerine sadece istenen sayfa okunur.
+    # Toplam sayı COUNT önbelleğinden (veya büyük sonuçlarda planlayıcı tahmininden) gelir
+    count_from = """
+        FROM technic_roster tr
+        LEFT JOIN teams t ON tr.team_id = t.team_id
+    """ + where_sql
     try:
-        if params:
-            rows = db_api.query(base_sql, tuple(params))
-        else:
-            rows = db_api.query(base_sql)
+        total_count, count_approximate = list_count('staff', count_from, params, ('technic_roster', 'teams'))
     except Exception as e:
-        print(f"Staff query error: {e}")
-        rows = []
+        print(f"Staff count error: {e}")
+        total_count, count_approximate = 0, False
+
+    total_pages = max(1, math.ceil(total_count / per_page))
+
+    if page < 1:
+        page = 1
+    if page > total_pages and not count_approximate:
+        page = total_pages
+
+    offset = (page - 1) * per_page
+    base_sql += where_sql + " ORDER BY t.team_name NULLS LAST, tr.technic_member_name, tr.staff_id LIMIT %s OFFSET %s"
 
     # -----------------------------
-    # 5. PYTHON LIST
+    # 5. QUERY ÇALIŞTIR
     # -----------------------------
-    staff = []
-    for r in rows:
-        staff.append({
+    try:
+        rows = db_api.query(base_sql, tuple(params) + (per_page, offset))
+        # -----------------------------
+        # 6. PYTHON LIST
+        # -----------------------------
+        staff_paginated = [{
             "staff_id": r[0],
             "name": r[1],
             "role": r[2],
             "team_name": r[3] if r[3] else "Takım Yok",
             "team_id": r[4],
             "league": r[5]
-        })
-
-    # -----------------------------
-    # 6. PAGINATION
-    # -----------------------------
-    total_count = len(staff)
-    total_pages = max(1, math.ceil(total_count / per_page))
-
-    if page < 1:
-        page = 1
-    if page > total_pages:
-        page = total_pages
-
-    start = (page - 1) * per_page
-    end = start + per_page
-    staff_paginated = staff[start:end]
+        } for r in rows]
+    except Exception as e:
+        print(f"Staff query error: {e}")
+        staff_paginated = []
 
     # -----------------------------
     # 7. TEMPLATE
@@ -1882,6 +2091,8 @@ def staff_page():
         staff=staff_paginated,
         current_page=page,
         total_pages=total_pages,
+        total_count=total_count,
+        count_approximate=count_approximate,
         filters=request.args
     )
 
@@ -2006,70 +2217,37 @@ def parse_numeric_filter(col_name, value, where_clauses, params):
     if val.isdigit() or (val.startswith('-') and val[1:].isdigit()):
         where_clauses.append(f"{col_name} {operator} %s")
         params.append(int(val))
-@app.route('/standings')
-def standings_page():
-    # ---------------------------------------------------------
-    # 1. Lig Listesi (Select Box İçin)
-    # ---------------------------------------------------------
-    league_sql = "SELECT DISTINCT league FROM standings ORDER BY league DESC"
-    try:
-        league_rows = db_api.query(league_sql)
-        leagues = [{"league": row[0]} for row in league_rows]
-    except Exception as e:
-        print(f"Lig listesi hatası: {e}")
-        leagues = []
 
-    # ---------------------------------------------------------
-    # 2. Filtre Parametrelerini Al
-    # ---------------------------------------------------------
-    f_league = request.args.get('league')
-    f_team = request.args.get('team_name')
-    f_rank = request.args.get('team_rank') # Örn: "1,2,3"
-    
-    # Sayısal Filtreler
-    f_wins = request.args.get('team_wins')
-    f_losses = request.args.get('team_losses')
-    f_ps = request.args.get('team_points_scored')
-    f_pc = request.args.get('team_points_conceded')
-    f_points = request.args.get('team_total_points')
-
-    # Sıralama ve Limit
-    sort = request.args.get('sort', 'team_rank')
-    order = request.args.get('order', 'asc').lower()
-    
-    # Güvenli Sıralama Sütunları
-    allowed_sorts = {
-        "league", "team_rank", "team_name", "team_matches_played",
-        "team_wins", "team_losses", "team_points_scored",
-        "team_points_conceded", "team_total_points"
-    }
-    if sort not in allowed_sorts: sort = 'team_rank'
-    
+# -------------------------
+# STANDINGS FİLTRELERİ (liste + dışa aktarma)
+# -------------------------
+# Güvenli Sıralama Sütunları
+STANDINGS_SORTS = {
+    "league", "team_rank", "team_name", "team_matches_played",
+    "team_wins", "team_losses", "team_points_scored",
+    "team_points_conceded", "team_total_points"
+}
+
+def standings_order(args, prefix='s.'):
+    # prefix='': sütun adları tek başına (query_many sıralaması, sonuç sütunları üzerinden)
+    sort = args.get('sort', 'team_rank')
+    order = args.get('order', 'asc').lower()
+    if sort not in STANDINGS_SORTS: sort = 'team_rank'
     order_sql = 'DESC' if order == 'desc' else 'ASC' # Varsayılan ASC
+    return f"{prefix}{sort} {order_sql}"
+
+def standings_filter(args):
+    f_league = args.get('league')
+    f_team = args.get('team_name')
+    f_rank = args.get('team_rank') # Örn: "1,2,3"
+
+    # Sayısal Filtreler
+    f_wins = args.get('team_wins')
+    f_losses = args.get('team_losses')
+    f_ps = args.get('team_points_scored')
+    f_pc = args.get('team_points_conceded')
+    f_points = args.get('team_total_points')
 
-    # ---------------------------------------------------------
-    # 3. Dinamik SQL İnşası
-    # ---------------------------------------------------------
-    base_sql = """
-        SELECT 
-            s.league, 
-            s.team_rank, 
-            s.team_name, 
-            s.team_matches_played, 
-            s.team_wins, 
-            s.team_losses, 
-            s.team_points_scored, 
-            s.team_points_conceded, 
-            s.team_home_points, 
-            s.team_home_goal_difference, 
-            s.team_total_goal_difference, 
-            s.team_total_points,
-            s.team_id,   -- <--- YENİ EKLENEN KISIM
-            t.team_url
-        FROM standings s
-        LEFT JOIN Teams t ON s.league = t.league AND s.team_name = t.team_name
-    """
-    
     where_clauses = []
     params = []
 
@@ -2104,37 +2282,60 @@ def standings_page():
     parse_numeric_filter("s.team_total_points", f_points, where_clauses, params)
 
     # WHERE Koşullarını Birleştir
-    if where_clauses:
-        base_sql += " WHERE " + " AND ".join(where_clauses)
+    where_sql = (" WHERE " + " AND ".join(where_clauses)) if where_clauses else ""
+    return where_sql, params
+
+@app.route('/standings')
+def standings_page():
+    # ---------------------------------------------------------
+    # 1. Lig Listesi (Select Box İçin)
+    # ---------------------------------------------------------
+    # (Lig listesi aşağıda ana sorguyla birlikte tek round-trip'te çekilir)
+    league_sql = "SELECT DISTINCT league FROM standings ORDER BY league DESC"
+
+    # ---------------------------------------------------------
+    # 2. Dinamik SQL İnşası
+    # ---------------------------------------------------------
+    base_sql = """
+        SELECT 
+            s.league, 
+            s.team_rank, 
+            s.team_name, 
+            s.team_matches_played, 
+            s.team_wins, 
+            s.team_losses, 
+            s.team_points_scored, 
+            s.team_points_conceded, 
+            s.team_home_points, 
+            s.team_home_goal_difference, 
+            s.team_total_goal_difference, 
+            s.team_total_points,
+            s.team_id,   -- <--- YENİ EKLENEN KISIM
+            t.team_url
+        FROM standings s
+        LEFT JOIN Teams t ON s.league = t.league AND s.team_name = t.team_name
+    """
+    where_sql, params = standings_filter(request.args)
+    base_sql += where_sql + " ORDER BY " + standings_order(request.args)
 
-    # ORDER BY Ekle
-    base_sql += f" ORDER BY s.{sort} {order_sql}"
+    # Sorguları Çalıştır (lig listesi + ana sorgu tek seferde)
+    # (sıralama batch'te sonuç sütunları üzerinden ayrıca verilir, bkz. db_api.query_many)
+    league_rows, rows = db_api.query_many(
+        [(league_sql, None, "league DESC"),
+         (base_sql, tuple(params), standings_order(request.args, prefix=''))],
+        return_exceptions=True, row_format='dict')
 
-    # Sorguyu Çalıştır
     try:
-        rows = db_api.query(base_sql, tuple(params))
+        leagues = db_api.result_or_raise(league_rows)
     except Exception as e:
-        print(f"Sorgu hatası: {e}")
-        rows = []
+        print(f"Lig listesi hatası: {e}")
+        leagues = []
 
-    # Dictionary'e çevir
-    cols = [
-        "league",
-        "team_rank",
-        "team_name",
-        "team_matches_played",
-        "team_wins",
-        "team_losses",
-        "team_points_scored",
-        "team_points_conceded",
-        "team_home_points",
-        "team_home_goal_difference",
-        "team_total_goal_difference",
-        "team_total_points",
-        "team_id",  # <--- YENİ EKLENEN KISIM
-        "team_url"
-    ]
-    standings = [dict(zip(cols, row)) for row in rows]
+    try:
+        standings = db_api.result_or_raise(rows)
+    except Exception as e:
+        print(f"Sorgu hatası: {e}")
+        standings = []
 
     return render_template(
         'standings.html', 
@@ -2321,7 +2522,8 @@ def team_players_page(team_id):
             player_name, 
             player_height, 
             player_birthdate, 
-            league
+            league,
+            EXTRACT(YEAR FROM age(birth_date))::int AS age
         FROM Players 
         WHERE team_id = %s
         ORDER BY player_name ASC
@@ -2342,48 +2544,132 @@ def team_players_page(team_id):
             "player_birthdate": row[3],
             "league": row[4]
         })
-        # --- TEAM PLAYER AGE STATISTICS ---
-    from datetime import datetime
-
-    today = datetime.now()
-    ages = []
-
-    for p in players:
-        birth = p.get("player_birthdate")
-        if birth and isinstance(birth, str) and len(birth.strip()) >= 8:
-            try:
-                bdate = datetime.strptime(birth.strip(), "%d.%m.%Y")
-                age = today.year - bdate.year - (
-                    (today.month, today.day) < (bdate.month, bdate.day)
-                )
-                ages.append({
-                    "name": p["player_name"],
-                    "age": age
-                })
-            except:
-                pass
-
-        # İstatistikleri üret
-        if ages:
-            avg_age = round(sum(a["age"] for a in ages) / len(ages), 1)
-            youngest = min(ages, key=lambda x: x["age"])
-            oldest = max(ages, key=lambda x: x["age"])
-        else:
-            avg_age = "-"
-            youngest = None
-            oldest = None
-
-        team_stats = {
-            "player_count": len(players),
-            "avg_age": avg_age,
-            "youngest": youngest,
-            "oldest": oldest
-        }
+
+    # --- TEAM PLAYER AGE STATISTICS ---
+    # Yaş SQL'de tipli birth_date kolonundan geliyor (tarihi olmayanlar atlanır)
+    ages = [{"name": row[1], "age": row[5]} for row in player_rows if row[5] is not None]
+
+    # İstatistikleri üret
+    if ages:
+        avg_age = round(sum(a["age"] for a in ages) / len(ages), 1)
+        youngest = min(ages, key=lambda x: x["age"])
+        oldest = max(ages, key=lambda x: x["age"])
+    else:
+        avg_age = "-"
+        youngest = None
+        oldest = None
+
+    team_stats = {
+        "player_count": len(players),
+        "avg_age": avg_age,
+        "youngest": youngest,
+        "oldest": oldest
+    }
 
     # Verileri yeni bir HTML sayfasına gönderiyoruz
     return render_template('team_players.html', team=team_info, players=players, stats= team_stats)
 
 
+# =====================================================================
+# BULK EXPORT (CSV / NDJSON)
+# =====================================================================
+# /export/<tablo>.csv ve /export/<tablo>.ndjson, liste sayfalarıyla aynı filtre
+# parametrelerini alır (ör. /export/matches.csv?league=bsl-2023-2024&weeks=NS 01).
+# Veri PostgreSQL'den COPY ... TO STDOUT ile parça parça gelir ve doğrudan istemciye
+# akıtılır; satırlar Python'da tek tek işlenmez, tüm tablo bellekte tutulmaz.
+
+def export_matches_sql(args):
+    where_sql, params = matches_filter(args)
+    sql = f"""
+        SELECT m.match_id, m.match_date, m.match_hour,
+               t1.team_name AS home_team, m.home_score, m.away_score, t2.team_name AS away_team,
+               m.match_saloon, m.league, m.match_week, m.match_city,
+               m.home_team_id, m.away_team_id
+        FROM matches m
+        JOIN teams t1 ON m.home_team_id = t1.team_id
+        JOIN teams t2 ON m.away_team_id = t2.team_id
+        WHERE {where_sql}
+        ORDER BY {matches_order(args)}
+    """
+    return sql, params
+
+def export_players_sql(args):
+    where_sql, params = players_filter(args)
+    sql = f"""
+        SELECT p.player_id, p.player_name, p.player_height, p.player_birthdate,
+               p.league, t.team_name, p.team_url, p.team_id,
+               p.player_foot, p.player_bio, p.birth_date, p.height_cm
+        FROM players p
+        LEFT JOIN teams t ON p.team_id = t.team_id
+        WHERE {where_sql}
+        ORDER BY {players_order(args.get('sort_by', 'default').strip())}
+    """
+    return sql, params
+
+def export_teams_sql(args):
+    # /teams/table ile aynı: ?season=<lig> (veya "all")
+    selected_season = args.get('season')
+    sql = """
+        SELECT team_id, staff_id, team_url, team_name, league, team_city,
+               team_year, saloon_name, saloon_capacity, saloon_address
+        FROM Teams
+    """
+    if selected_season and selected_season != "all":
+        return sql + " WHERE league = %s ORDER BY team_name ASC", [selected_season]
+    return sql + " ORDER BY league DESC, team_name ASC", []
+
+def export_standings_sql(args):
+    where_sql, params = standings_filter(args)
+    sql = """
+        SELECT s.league, s.team_rank, s.team_name, s.team_matches_played,
+               s.team_wins, s.team_losses, s.team_points_scored, s.team_points_conceded,
+               s.team_home_points, s.team_home_goal_difference, s.team_total_goal_difference,
+               s.team_total_points, s.team_id, t.team_url
+        FROM standings s
+        LEFT JOIN Teams t ON s.league = t.league AND s.team_name = t.team_name
+    """ + where_sql + " ORDER BY " + standings_order(args)
+    return sql, params
+
+def export_staff_sql(args):
+    where_sql, params = staff_filter(args)
+    sql = """
+        SELECT tr.staff_id, tr.technic_member_name, tr.technic_member_role,
+               t.team_name, t.team_id, tr.league
+        FROM technic_roster tr
+        LEFT JOIN teams t ON tr.team_id = t.team_id
+    """ + where_sql + " ORDER BY t.team_name NULLS LAST, tr.technic_member_name, tr.staff_id"
+    return sql, params
+
+EXPORTS = {
+    'matches': export_matches_sql,
+    'players': export_players_sql,
+    'teams': export_teams_sql,
+    'standings': export_standings_sql,
+    'technic_roster': export_staff_sql,
+}
+
+EXPORT_MIMETYPES = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+@app.route('/export/<table>.<any(csv, ndjson):fmt>')
+def export_table(table, fmt):
+    build = EXPORTS.get(table)
+    if build is None:
+        return f"Bilinmeyen tablo: {table}", 404
+
+    sql, params = build(request.args)
+    # Filtre için yapılan küçük sorgular (ör. takım adı) bitti: okuma bağlamının
+    # bağlantısı akış boyunca boşta tutulmasın, COPY kendi bağlantısını alır
+    db_api.end_read_scope()
+
+    chunks = db_api.copy_out(sql, tuple(params), fmt=fmt)
+    response = Response(stream_with_context(chunks), mimetype=EXPORT_MIMETYPES[fmt])
+    response.headers['Content-Disposition'] = f'attachment; filename="{table}.{fmt}"'
+    return response
+
+
 
 
 
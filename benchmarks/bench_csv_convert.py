@@ -0,0 +1,151 @@
+"""
+CSV -> COPY conversion throughput for init_db.
+
+Writes a synthetic matches CSV (same columns and value shapes as
+tables/matches.csv, seeded), then converts it to COPY text with the old
+per-row converter (DictReader + _default_row_converter as it was before the
+conversion plan) and with init_db's ConversionPlan, and prints rows/sec.
+No database is needed; with --db the plan output is also COPYed into a
+TEMP table on DATABASE_URL.
+
+    python benchmarks/bench_csv_convert.py                  # 1M rows
+    python benchmarks/bench_csv_convert.py --rows 200000 --memory
+    python benchmarks/bench_csv_convert.py --db
+"""
+import os
+import sys
+import csv
+import time
+import random
+import argparse
+import tempfile
+import tracemalloc
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import init_db
+import database.db as db_api
+
+MATCHES = next(spec for spec in init_db.TABLE_SPECS if spec.name == "Matches")
+
+CITIES = ["İSTANBUL", "ANKARA", "İZMİR", "BURSA", "ANTALYA", "KONYA"]
+SALOONS = ["Sinan Erdem Spor Salonu", "Halkapınar Spor Salonu", "Ankara Spor Salonu", "Tofaş Spor Salonu"]
+
+
+def write_synthetic_matches(path, n):
+    rnd = random.Random(42)
+    start = date(2010, 10, 1)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(MATCHES.columns)
+        for i in range(n):
+            home, away = rnd.sample(range(20000, 25000), 2)
+            played = rnd.random() > 0.05
+            w.writerow([
+                f"1EA{i:x}", home, away,
+                (start + timedelta(days=i // 8 % 5000)).isoformat(),
+                rnd.choice(["15:00", "17:30", "19:00", "20:30"]),
+                rnd.randint(55, 115) if played else "",
+                rnd.randint(55, 115) if played else "",
+                f"bsl-{2010 + i // 300 % 15}-{2011 + i // 300 % 15}",
+                f"NS {1 + i // 8 % 30:02d}",
+                rnd.choice(CITIES), rnd.choice(SALOONS),
+            ])
+
+
+# --- converter as written in init_db.py before the conversion plan ---
+def legacy_row_converter(row, columns):
+    vals = []
+    for col in columns:
+        v = row.get(col)
+        if v is None or v == "":
+            vals.append(None)
+        else:
+            if col not in init_db.TEXT_COLUMNS:
+                n = init_db._extract_first_int(v)
+                if n is not None:
+                    vals.append(n)
+                    continue
+                try:
+                    vals.append(int(float(v)))
+                    continue
+                except Exception:
+                    vals.append(None)
+                    continue
+            vals.append(v)
+    return tuple(vals)
+
+
+def legacy_chunks(f):
+    rows = [legacy_row_converter(row, MATCHES.columns) for row in csv.DictReader(f)]
+    return ["".join("\t".join(map(init_db._copy_text, row)) + "\n" for row in rows)]
+
+
+def plan_chunks(f):
+    return init_db.iter_copy_chunks(MATCHES, f)
+
+
+def drain(path, make_chunks):
+    with open(path, encoding="utf-8-sig") as f:
+        stream = init_db.CopyStream(make_chunks(f))
+        total = 0
+        while True:
+            data = stream.read(65536)
+            if not data:
+                return total
+            total += len(data)
+
+
+def measure(name, path, rows, make_chunks, memory):
+    start = time.perf_counter()
+    size = drain(path, make_chunks)
+    elapsed = time.perf_counter() - start
+    line = f"  {name:18} {elapsed:8.2f} s {rows / elapsed:12,.0f} rows/s {size / 2**20:9.1f} MiB out"
+    if memory:
+        tracemalloc.start()
+        drain(path, make_chunks)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        line += f"   peak {peak / 2**20:8.1f} MiB"
+    print(line)
+
+
+def copy_into_db(path, rows):
+    conn = db_api.get_conn()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("CREATE TEMP TABLE bench_matches AS SELECT * FROM Matches WITH NO DATA")
+            start = time.perf_counter()
+            with open(path, encoding="utf-8-sig") as f:
+                cur.copy_expert("COPY bench_matches (%s) FROM STDIN" % ", ".join(MATCHES.columns),
+                                init_db.CopyStream(plan_chunks(f)))
+            elapsed = time.perf_counter() - start
+        print(f"  {'plan + COPY':18} {elapsed:8.2f} s {rows / elapsed:12,.0f} rows/s")
+    finally:
+        conn.rollback()
+        db_api.put_conn(conn)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--memory", action="store_true", help="also report tracemalloc peak (slow)")
+    parser.add_argument("--db", action="store_true", help="also COPY the plan output into a TEMP table")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "matches.csv")
+        start = time.perf_counter()
+        write_synthetic_matches(path, args.rows)
+        print(f"synthetic matches.csv: {args.rows:,} rows, {os.path.getsize(path) / 2**20:.1f} MiB "
+              f"({time.perf_counter() - start:.1f} s to write)")
+
+        measure("legacy converter", path, args.rows, legacy_chunks, args.memory)
+        measure("conversion plan", path, args.rows, plan_chunks, args.memory)
+        if args.db:
+            copy_into_db(path, args.rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Page latency benchmark (p50 / p95) for the list handlers.
+
+Runs each route through Flask's test client against the database in
+DATABASE_URL, once with db_api.query_many() batching enabled and once with
+it disabled (statements executed one by one), and prints the difference.
+
+    python benchmarks/bench_pages.py                # default routes, 50 runs each
+    python benchmarks/bench_pages.py -n 200 /matches "/matches?league=bsl-2023-2024"
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database.db as db_api
+from app import app
+
+DEFAULT_ROUTES = ["/matches", "/players", "/standings"]
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    k = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[k]
+
+
+def measure(client, route, runs, warmup):
+    for _ in range(warmup):
+        client.get(route)
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        resp = client.get(route)
+        resp.get_data()
+        samples.append((time.perf_counter() - start) * 1000)
+        if resp.status_code != 200:
+            raise SystemExit(f"{route} returned HTTP {resp.status_code}")
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("routes", nargs="*", default=DEFAULT_ROUTES)
+    parser.add_argument("-n", "--runs", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=5)
+    args = parser.parse_args()
+
+    client = app.test_client()
+    print(f"{'route':40} {'mode':10} {'p50 ms':>9} {'p95 ms':>9} {'mean ms':>9}")
+    for route in args.routes:
+        results = {}
+        for mode, batched in (("sequential", False), ("batched", True)):
+            db_api.BATCH_QUERIES = batched
+            samples = measure(client, route, args.runs, args.warmup)
+            results[mode] = percentile(samples, 95)
+            print(f"{route:40} {mode:10} {percentile(samples, 50):9.2f} "
+                  f"{results[mode]:9.2f} {statistics.mean(samples):9.2f}")
+        drop = results["sequential"] - results["batched"]
+        pct = drop * 100 / results["sequential"] if results["sequential"] else 0
+        print(f"{route:40} {'p95 drop':10} {drop:9.2f} ms ({pct:.1f}%)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+CPU and memory cost of the db_api row formats versus the hand mapping
+used in matches_page / players_page.
+
+By default rows are synthetic (shaped like the matches and players list
+queries), so no database is needed. With --db the real rows are fetched
+once from DATABASE_URL and then mapped.
+
+    python benchmarks/bench_row_mapping.py                 # 50k synthetic rows
+    python benchmarks/bench_row_mapping.py --rows 500000
+    python benchmarks/bench_row_mapping.py --db
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tracemalloc
+from datetime import date, time as dtime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database.db as db_api
+
+MATCH_COLS = ['match_id', 'match_date', 'match_hour', 'home_team', 'home_score',
+              'away_score', 'away_team', 'match_saloon', 'league', 'match_week',
+              'match_city', 'home_team_id', 'away_team_id']
+
+PLAYER_COLS = ['player_id', 'player_name', 'player_height', 'player_birthdate',
+               'league', 'team_name', 'team_url', 'team_id', 'player_foot', 'player_bio']
+
+MATCH_SQL = """
+    SELECT m.match_id, m.match_date, m.match_hour, t1.team_name, m.home_score, m.away_score,
+           t2.team_name, m.match_saloon, m.league, m.match_week, m.match_city,
+           m.home_team_id, m.away_team_id
+    FROM matches m
+    JOIN teams t1 ON m.home_team_id = t1.team_id
+    JOIN teams t2 ON m.away_team_id = t2.team_id
+"""
+
+PLAYER_SQL = """
+    SELECT p.player_id, p.player_name, p.player_height, p.player_birthdate, p.league,
+           t.team_name, p.team_url, p.team_id, p.player_foot, p.player_bio
+    FROM players p
+    LEFT JOIN teams t ON p.team_id = t.team_id
+"""
+
+
+def synthetic_matches(n):
+    rnd = random.Random(1)
+    return [(f"1EA{i}", date(2024, 1 + i % 12, 1 + i % 28), dtime(19, 0), f"Team {i % 16}",
+             rnd.randint(60, 110), rnd.randint(60, 110), f"Team {(i + 3) % 16}",
+             "Sinan Erdem Spor Salonu", "bsl-2024-2025", f"NS {1 + i % 30:02d}", "İSTANBUL",
+             i % 640, (i + 3) % 640) for i in range(n)]
+
+
+def synthetic_players(n):
+    return [(i, f"Player {i}", "198 cm", "15.07.2003", "bsl-2024-2025", f"Team {i % 16}",
+             "https://www.tbf.org.tr/takim", i % 640, None, None) for i in range(n)]
+
+
+# --- hand mapping, as written in app.py before row_format existed ---
+def hand_matches(rows):
+    return [dict(zip(MATCH_COLS, row)) for row in rows]
+
+
+def hand_players(rows):
+    players = []
+    for row in rows:
+        p_id, p_name, p_height, p_birth, p_league, t_name, t_url, t_id, p_foot, p_bio = row
+        players.append({
+            "player_id": p_id, "player_name": p_name, "player_height": p_height,
+            "player_birthdate": p_birth, "league": p_league, "team_name": t_name,
+            "team_url": t_url, "team_id": t_id, "player_foot": p_foot, "player_bio": p_bio
+        })
+    return players
+
+
+def measure(fn, rows):
+    fn(rows)  # warm up (namedtuple class cache etc.)
+    start = time.perf_counter()
+    fn(rows)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    result = fn(rows)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return elapsed, peak
+
+
+def run_suite(title, cols, rows, hand):
+    print(f"\n{title}: {len(rows)} rows x {len(cols)} columns")
+    print(f"  {'mode':14} {'time ms':>10} {'us/row':>8} {'peak MiB':>10}")
+    modes = [("hand mapping", hand)] + [
+        (fmt, lambda r, fmt=fmt: db_api.shape_rows(cols, r, fmt))
+        for fmt in ("dict", "namedtuple", "columns")
+    ]
+    for name, fn in modes:
+        elapsed, peak = measure(fn, rows)
+        print(f"  {name:14} {elapsed * 1000:10.1f} {elapsed * 1e6 / max(len(rows), 1):8.2f} {peak / 2**20:10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--db", action="store_true", help="map real rows fetched from DATABASE_URL")
+    args = parser.parse_args()
+
+    if args.db:
+        match_rows = db_api.query(MATCH_SQL)
+        player_rows = db_api.query(PLAYER_SQL)
+    else:
+        match_rows = synthetic_matches(args.rows)
+        player_rows = synthetic_players(args.rows)
+
+    run_suite("matches_page list", MATCH_COLS, match_rows, hand_matches)
+    run_suite("players_page list", PLAYER_COLS, player_rows, hand_players)
+
+
+if __name__ == "__main__":
+    main()
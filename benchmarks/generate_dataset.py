@@ -0,0 +1,291 @@
+"""
+Seeded synthetic dataset for load and scale testing.
+
+Writes team_data.csv, matches.csv, standings.csv, player_data.csv and
+technic_roster.csv with the same columns and value formats as tables/*.csv,
+SCALE times larger. Every bundled league is a template: division 0 keeps its
+bsl-YYYY-YYYY name, divisions 1..SCALE-1 are "bslN-YYYY-YYYY" copies with
+their own teams. A copy keeps the template's team count, cities, saloons,
+week labels and dates (including unplayed weeks and the Çeyrek/PÇ playoff
+naming of its season) and the rosters' role mix, heights and birthdates;
+results, rosters and standings are generated (team strength + home advantage,
+score pairs drawn from the bundled games, standings computed from the
+generated regular season). A share of the games is written twice the way the
+source feed does it (mirrored home/away, or a re-post without the score) so
+the canonical match dedup has work to do.
+
+All ids are new (teams from 1000000, players from 10000000, matches "1EA"
++ counter), every team id points at a generated team, and the same --seed
+gives byte-identical files. Files are written league by league, so 1000x does
+not need to fit in memory.
+
+    python benchmarks/generate_dataset.py --scale 10               # -> tables_x10/
+    python benchmarks/generate_dataset.py --scale 1000 --out /data/x1000
+    python init_db.py --tables tables_x10 --force
+"""
+import os
+import csv
+import math
+import time
+import random
+import argparse
+from collections import Counter, defaultdict
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TEAM_COLUMNS = ["team_id", "team_url", "team_name", "league", "team_city", "team_year",
+                "saloon_name", "saloon_capacity", "saloon_address"]
+MATCH_COLUMNS = ["match_id", "home_team_id", "away_team_id", "match_date", "match_hour",
+                 "home_score", "away_score", "league", "match_week", "match_city", "match_saloon"]
+STANDING_COLUMNS = ["league", "team_rank", "team_name", "team_matches_played", "team_wins",
+                    "team_losses", "team_points_scored", "team_points_conceded", "team_home_points",
+                    "team_home_goal_difference", "team_total_goal_difference", "team_total_points"]
+PLAYER_COLUMNS = ["team_id", "team_url", "league", "player_name", "player_id",
+                  "player_birthdate", "player_height"]
+STAFF_COLUMNS = ["team_id", "team_url", "league", "technic_member_name", "technic_member_role"]
+
+TEAM_URL = "https://www.tbf.org.tr/ligler/{league}/takim-detay/{team_id}"
+
+# Playoff turu -> turdaki takım sayısı (eski sezonlar Çeyrek/Yarı, yeniler PÇ/PY)
+PLAYOFF_ROUNDS = {"Çeyrek": 8, "PÇ": 8, "Yarı": 4, "PY": 4, "PF": 2}
+
+HOME_ADVANTAGE = 0.35
+
+
+def read_csv(name, source):
+    with open(os.path.join(source, name), encoding="utf-8-sig", newline="") as f:
+        return list(csv.DictReader(f))
+
+
+class Templates:
+    """What the generator copies from the bundled CSVs, grouped by league."""
+
+    def __init__(self, source):
+        teams = read_csv("team_data.csv", source)
+        matches = read_csv("matches.csv", source)
+        players = read_csv("player_data.csv", source)
+        staff = read_csv("technic_roster.csv", source)
+
+        self.teams = defaultdict(list)              # league -> [team row]
+        for t in sorted(teams, key=lambda t: int(t["team_id"])):
+            self.teams[t["league"]].append(t)
+        self.leagues = sorted(self.teams)
+
+        # Ev sahibi takımın gerçek maç şehri/salonu (team_city ile her zaman aynı değil)
+        venues = defaultdict(Counter)
+        for m in matches:
+            venues[m["home_team_id"]][(m["match_city"], m["match_saloon"])] += 1
+        self.venue = {
+            t["team_id"]: (venues[t["team_id"]].most_common(1)[0][0] if venues[t["team_id"]]
+                           else (t["team_city"].strip(), t["saloon_name"]))
+            for t in teams
+        }
+
+        # league -> [(week, [dates], unplayed share)] in calendar order
+        weeks = defaultdict(lambda: defaultdict(list))
+        for m in matches:
+            weeks[m["league"]][m["match_week"]].append(m)
+        self.weeks = {}
+        for league, by_week in weeks.items():
+            ordered = sorted(by_week.items(), key=lambda kv: min(m["match_date"] for m in kv[1]))
+            self.weeks[league] = [
+                (week, [m["match_date"] for m in rows],
+                 sum(1 for m in rows if not m["home_score"] or not m["away_score"]) / len(rows))
+                for week, rows in ordered
+            ]
+        self.hours = defaultdict(list)
+        for m in matches:
+            self.hours[m["league"]].append(m["match_hour"])
+        # (kazanan, kaybeden) skor çiftleri
+        self.scores = sorted(
+            (max(int(m["home_score"]), int(m["away_score"])), min(int(m["home_score"]), int(m["away_score"])))
+            for m in matches if m["home_score"] and m["away_score"] and m["home_score"] != m["away_score"]
+        )
+
+        self.roster = defaultdict(list)             # team_id -> [role]
+        for s in staff:
+            self.roster[s["team_id"]].append(s["technic_member_role"])
+        self.squad = Counter(p["team_id"] for p in players)
+        self.birthdates = defaultdict(list)         # league -> [raw birthdate]
+        self.heights = defaultdict(list)            # league -> [raw height]
+        for p in players:
+            self.birthdates[p["league"]].append(p["player_birthdate"])
+            self.heights[p["league"]].append(p["player_height"])
+        names = [p["player_name"] for p in players] + [s["technic_member_name"] for s in staff]
+        split = [n.split() for n in names if len(n.split()) >= 2]
+        self.given = sorted({" ".join(parts[:-1]) for parts in split})
+        self.surnames = sorted({parts[-1] for parts in split})
+
+
+class Ids:
+    def __init__(self):
+        self.team = 1_000_000
+        self.player = 10_000_000
+        self.match = 10_000
+
+    def next_team(self):
+        self.team += 1
+        return self.team
+
+    def next_player(self):
+        self.player += 1
+        return self.player
+
+    def next_match(self):
+        self.match += 1
+        return f"1EA{self.match}"
+
+
+def league_name(template, division):
+    return template if division == 0 else template.replace("bsl-", f"bsl{division}-", 1)
+
+
+def round_robin(team_ids):
+    """Circle method: list of rounds, each a list of (home, away); odd counts get a bye."""
+    slots = list(team_ids) + ([None] if len(team_ids) % 2 else [])
+    n = len(slots)
+    rounds = []
+    for r in range(n - 1):
+        pairs = []
+        for i in range(n // 2):
+            a, b = slots[i], slots[n - 1 - i]
+            if a is not None and b is not None:
+                pairs.append((a, b) if (r + i) % 2 == 0 else (b, a))
+        rounds.append(pairs)
+        slots = [slots[0], slots[-1]] + slots[1:-1]
+    # ikinci yarı: aynı eşleşmeler, saha değişik
+    return rounds + [[(b, a) for a, b in pairs] for pairs in rounds]
+
+
+def play(rnd, scores, strength, home, away):
+    p_home = 1 / (1 + math.exp(-(strength[home] - strength[away] + HOME_ADVANTAGE)))
+    win, lose = rnd.choice(scores)
+    return (win, lose) if rnd.random() < p_home else (lose, win)
+
+
+def generate_league(rnd, tpl, template, division, ids, writers, mirror_rate):
+    league = league_name(template, division)
+    suffix = "" if division == 0 else f" B{division}"
+    w_team, w_match, w_standing, w_player, w_staff = writers
+
+    teams = []
+    for t in tpl.teams[template]:
+        team_id = ids.next_team()
+        url = TEAM_URL.format(league=league, team_id=team_id)
+        teams.append((team_id, t, url))
+        w_team.writerow([team_id, url, t["team_name"] + suffix, league, t["team_city"], t["team_year"],
+                         t["saloon_name"], t["saloon_capacity"], t["saloon_address"]])
+        for _ in range(tpl.squad[t["team_id"]]):
+            w_player.writerow([team_id, url, league,
+                               f"{rnd.choice(tpl.given)} {rnd.choice(tpl.surnames)}", ids.next_player(),
+                               rnd.choice(tpl.birthdates[template]), rnd.choice(tpl.heights[template])])
+        for role in tpl.roster[t["team_id"]]:
+            w_staff.writerow([team_id, url, league, f"{rnd.choice(tpl.given)} {rnd.choice(tpl.surnames)}", role])
+
+    by_id = {team_id: t for team_id, t, _ in teams}
+    names = {team_id: t["team_name"] + suffix for team_id, t, _ in teams}
+    strength = {team_id: rnd.gauss(0, 1) for team_id in by_id}
+    table = {team_id: [0, 0, 0, 0] for team_id in by_id}   # wins, losses, scored, conceded
+    hours = tpl.hours[template]
+
+    def emit(home, away, week, dates, unplayed):
+        match_date, hour = rnd.choice(dates), rnd.choice(hours)
+        city, saloon = tpl.venue[by_id[home]["team_id"]]
+        score = None if rnd.random() < unplayed else play(rnd, tpl.scores, strength, home, away)
+        hs, as_ = score if score else ("", "")
+        w_match.writerow([ids.next_match(), home, away, match_date, hour, hs, as_, league, week, city, saloon])
+        if rnd.random() < mirror_rate:
+            # Kaynakta aynı maç ikinci kez: çoğunlukla ev/deplasman ters, bazen skorsuz tekrar
+            if rnd.random() < 0.8:
+                w_match.writerow([ids.next_match(), away, home, match_date, hour, as_, hs,
+                                  league, week, city, saloon])
+            else:
+                w_match.writerow([ids.next_match(), home, away, match_date, hour, "", "",
+                                  league, week, city, saloon])
+        return score
+
+    rounds = round_robin(list(by_id))
+    regular = [w for w in tpl.weeks.get(template, []) if w[0].startswith("NS")]
+    playoffs = [w for w in tpl.weeks.get(template, []) if not w[0].startswith("NS")]
+
+    for k, (week, dates, unplayed) in enumerate(regular):
+        for home, away in rounds[k % len(rounds)]:
+            score = emit(home, away, week, dates, unplayed)
+            if score:
+                for team, own, other in ((home, score[0], score[1]), (away, score[1], score[0])):
+                    table[team][0 if own > other else 1] += 1
+                    table[team][2] += own
+                    table[team][3] += other
+
+    standings = sorted(by_id, key=lambda t: (-(2 * table[t][0] + table[t][1]),
+                                             -(table[t][2] - table[t][3]), names[t]))
+    for rank, team in enumerate(standings, 1):
+        wins, losses, scored, conceded = table[team]
+        w_standing.writerow([league, rank, names[team], wins + losses, wins, losses, scored, conceded,
+                             0, 0, scored - conceded, 2 * wins + losses])
+
+    # Playoff: 1-8, 2-7 ... eşleşmeleri, seriyi kazanan bir sonraki tura çıkar
+    alive = None
+    for week, dates, unplayed in playoffs:
+        size = PLAYOFF_ROUNDS.get(week, 2)
+        alive = (alive or standings)[:size]
+        pairs = [(alive[i], alive[size - 1 - i]) for i in range(size // 2)]
+        series_wins = Counter()
+        for g in range(len(dates)):
+            high, low = pairs[g % len(pairs)]
+            home, away = (high, low) if (g // len(pairs)) % 2 == 0 else (low, high)
+            score = emit(home, away, week, dates, unplayed)
+            if score:
+                series_wins[home if score[0] > score[1] else away] += 1
+        alive = [high if series_wins[high] >= series_wins[low] else low for high, low in pairs]
+
+
+def generate(out, scale, seed, mirror_rate, source):
+    tpl = Templates(source)
+    ids = Ids()
+    os.makedirs(out, exist_ok=True)
+    files = [open(os.path.join(out, name), "w", encoding="utf-8", newline="")
+             for name in ("team_data.csv", "matches.csv", "standings.csv", "player_data.csv", "technic_roster.csv")]
+    try:
+        writers = [csv.writer(f) for f in files]
+        for w, columns in zip(writers, (TEAM_COLUMNS, MATCH_COLUMNS, STANDING_COLUMNS, PLAYER_COLUMNS, STAFF_COLUMNS)):
+            w.writerow(columns)
+        for division in range(scale):
+            # her bölüm kendi RNG'si ile: aynı seed, aynı dosyalar
+            rnd = random.Random(f"{seed}:{division}")
+            for template in tpl.leagues:
+                generate_league(rnd, tpl, template, division, ids, writers, mirror_rate)
+    finally:
+        for f in files:
+            f.close()
+
+
+def count_rows(path):
+    with open(path, encoding="utf-8", newline="") as f:
+        return sum(1 for _ in csv.reader(f)) - 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=int, default=10, help="multiple of the bundled data (10, 100, 1000, ...)")
+    parser.add_argument("--out", help="output directory (default: tables_x<scale>/ in the repo root)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--mirror-rate", type=float, default=0.05,
+                        help="share of games written a second time, mostly mirrored (1.0 = every game twice)")
+    parser.add_argument("--source", default=os.path.join(BASE_DIR, "tables"),
+                        help="bundled CSVs used as templates")
+    args = parser.parse_args()
+    if args.scale < 1:
+        parser.error("--scale must be at least 1")
+    out = args.out or os.path.join(BASE_DIR, f"tables_x{args.scale}")
+
+    start = time.perf_counter()
+    generate(out, args.scale, args.seed, args.mirror_rate, args.source)
+    print(f"scale {args.scale}x, seed {args.seed} -> {out} ({time.perf_counter() - start:.1f} s)")
+    for name in sorted(os.listdir(out)):
+        path = os.path.join(out, name)
+        print(f"  {name:20} {count_rows(path):12,} rows {os.path.getsize(path) / 2**20:9.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
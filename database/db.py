@@ -1,42 +1,1437 @@
 import os
+import json
+import datetime
+import time
+import re
+import hashlib
+import itertools
+import threading
+import queue
+from collections import OrderedDict, namedtuple
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
 import psycopg2
 from psycopg2 import pool
+from psycopg2 import extensions
+import psycopg2.errors
 
 DATABASE_URL = os.environ.get("DATABASE_URL")
-_pool = None
 
-def init_pool(minconn=1, maxconn=5):
-    global _pool
+# Okuma replikaları: virgülle ayrılmış DSN listesi. Boşsa tüm sorgular DATABASE_URL'e gider.
+DATABASE_READ_URLS = [u.strip() for u in os.environ.get("DATABASE_READ_URLS", "").split(",") if u.strip()]
+READ_BALANCE = os.environ.get("DB_READ_BALANCE", "round_robin")      # round_robin | least_busy
+# Bir yazma işleminden sonra aynı oturumun okumaları bu kadar süre birincil sunucuda kalır
+STICKY_PRIMARY_SECONDS = float(os.environ.get("DB_STICKY_PRIMARY_SECONDS", 5.0))
+
+# Pool ayarları (ortam değişkenlerinden)
+POOL_MIN = int(os.environ.get("DB_POOL_MIN", 1))
+POOL_MAX = int(os.environ.get("DB_POOL_MAX", 10))
+POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", 10.0))        # bağlantı beklerken max süre (sn)
+POOL_MAX_IDLE = float(os.environ.get("DB_POOL_MAX_IDLE", 300.0))     # bu kadar boşta kalan bağlantı kontrol edilir
+POOL_MAX_LIFETIME = float(os.environ.get("DB_POOL_MAX_LIFETIME", 3600.0))  # bu kadar yaşlı bağlantı yenilenir
+
+# query_many(): tüm okuma sorgularını tek round-trip'te gönder (0 = sırayla tek tek çalıştır)
+BATCH_QUERIES = os.environ.get("DB_BATCH_QUERIES", "1") != "0"
+
+# query_parallel(): istek başına aynı anda çalışacak en fazla sorgu sayısı ve sorgu
+# başına zaman aşımı (sn, sorgu başladığında başlar)
+PARALLEL_WORKERS = int(os.environ.get("DB_PARALLEL_WORKERS", 4))
+PANEL_TIMEOUT = float(os.environ.get("DB_PANEL_TIMEOUT", 5.0))
+
+# Bağlantı başına saklanacak en fazla prepared statement sayısı (LRU)
+PREPARE_CACHE_SIZE = int(os.environ.get("DB_PREPARE_CACHE_SIZE", 64))
+
+# Bu süreyi (ms) aşan sorgular slow-query log'a yazılır
+SLOW_QUERY_MS = float(os.environ.get("DB_SLOW_QUERY_MS", 200))
+
+# COPY TO STDOUT dışa aktarma: istemciye gönderilen parça boyutu ve bekleyen parça sayısı
+EXPORT_CHUNK_SIZE = int(os.environ.get("DB_EXPORT_CHUNK_SIZE", 64 * 1024))
+EXPORT_QUEUE_CHUNKS = int(os.environ.get("DB_EXPORT_QUEUE_CHUNKS", 8))
+
+# Bekleme süresi histogramı için üst sınırlar (saniye)
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, float("inf"))
+
+
+# invalidate_prepared() her çağrıldığında artar (bkz. prepared statement önbelleği)
+_schema_generation = 0
+
+
+class PooledConnection(extensions.connection):
+    """Havuz bağlantısı: ait olduğu havuzu ve kendi prepared statement önbelleğini taşır."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pool = None
+        self.prepared = OrderedDict()           # (sql, parametre tipleri) -> prepared statement adı (LRU sırası)
+        self.prepared_generation = _schema_generation
+
+
+class BoundedConnectionPool:
+    """
+    Thread-safe, sınırlı bağlantı havuzu.
+
+    - Havuz doluysa PoolError atmak yerine `timeout` saniyeye kadar bekler.
+    - Kopmuş / uzun süre boşta kalmış / çok yaşlı bağlantıları tespit edip yenisiyle değiştirir.
+    - fork() sonrası child process'te durumu sıfırlar (parent'ın soketleri paylaşılmaz).
+    """
+
+    def __init__(self, minconn, maxconn, dsn, timeout=POOL_TIMEOUT,
+                 max_idle=POOL_MAX_IDLE, max_lifetime=POOL_MAX_LIFETIME, name="primary"):
+        if minconn < 0 or maxconn < 1 or minconn > maxconn:
+            raise ValueError("invalid pool size: min=%s max=%s" % (minconn, maxconn))
+        self.name = name
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.dsn = dsn
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self._cond = threading.Condition(threading.Lock())
+        self._reset_state()
+        for _ in range(minconn):
+            self._idle.append(self._connect())
+
+    def _reset_state(self):
+        self._pid = os.getpid()
+        self._idle = []          # [(conn, last_used), ...] - LIFO
+        self._used = {}          # id(conn) -> conn
+        self._created = {}       # id(conn) -> oluşturulma zamanı
+        self._opening = 0        # şu an açılmakta olan bağlantı sayısı
+        self._closed = False
+        self._wait_hist = [0] * len(WAIT_BUCKETS)
+        self._wait_total = 0.0
+        self._timeouts = 0
+        self._replaced = 0
+
+    def _connect(self):
+        conn = psycopg2.connect(self.dsn, connection_factory=PooledConnection)
+        conn.pool = self
+        now = time.monotonic()
+        # getconn() bağlantıyı kilit dışında açar; paylaşılan sözlük kilitle güncellenir
+        with self._cond:
+            self._created[id(conn)] = now
+        return conn, now
+
+    def _size(self):
+        return len(self._idle) + len(self._used) + self._opening
+
+    def busy(self):
+        # least_busy dengeleme için yaklaşık değer (kilitsiz okunur)
+        return len(self._used) + self._opening
+
+    def _check_fork(self):
+        # Gunicorn/uwsgi gibi pre-fork sunucularda parent'ın bağlantıları child'a geçer.
+        # Bunları kapatmadan bırakıyoruz (parent hâlâ kullanıyor olabilir), sadece unutuyoruz.
+        if self._pid != os.getpid():
+            self._reset_state()
+
+    def _is_healthy(self, conn):
+        # Kilit altında çağrılır: sadece yerel kontroller, ağ round-trip'i yok
+        if conn.closed:
+            return False
+        now = time.monotonic()
+        if now - self._created.get(id(conn), now) > self.max_lifetime:
+            return False
+        return conn.info.transaction_status == extensions.TRANSACTION_STATUS_IDLE
+
+    def _ping(self, conn):
+        # Kilit dışında çağrılır: yavaş bir bağlantı diğer getconn() çağrılarını bekletmesin
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _discard(self, conn):
+        self._created.pop(id(conn), None)
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def getconn(self, timeout=None):
+        timeout = self.timeout if timeout is None else timeout
+        start = time.monotonic()
+        deadline = start + timeout
+        with self._cond:
+            self._check_fork()
+            while True:
+                if self._closed:
+                    raise pool.PoolError("connection pool is closed")
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                    if not self._is_healthy(conn):
+                        self._discard(conn)
+                        self._replaced += 1
+                        continue
+                    if time.monotonic() - last_used > self.max_idle:
+                        # uzun süre boşta kaldı: sunucu bağlantıyı kapatmış olabilir.
+                        # Kontrol sürerken bağlantı "açılıyor" sayılır (havuz boyutu aşılmasın)
+                        self._opening += 1
+                        self._cond.release()
+                        try:
+                            alive = self._ping(conn)
+                        finally:
+                            self._cond.acquire()
+                            self._opening -= 1
+                        if not alive or self._closed:
+                            self._discard(conn)
+                            self._replaced += 1
+                            self._cond.notify()
+                            continue
+                    break
+                if self._size() < self.maxconn:
+                    # bağlantıyı kilit dışında aç, diğer thread'ler beklemesin
+                    self._opening += 1
+                    self._cond.release()
+                    try:
+                        conn, _ = self._connect()
+                    except Exception:
+                        self._cond.acquire()
+                        self._opening -= 1
+                        self._cond.notify()
+                        raise
+                    self._cond.acquire()
+                    self._opening -= 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise pool.PoolError(
+                        "connection pool exhausted: no connection available after %.1fs" % timeout)
+                self._cond.wait(remaining)
+
+            self._used[id(conn)] = conn
+            self._record_wait(time.monotonic() - start)
+            return conn
+
+    def putconn(self, conn, close=False):
+        with self._cond:
+            if self._pid != os.getpid():
+                # fork'tan önce alınmış bağlantı: bu process'e ait değil
+                return
+            if self._used.pop(id(conn), None) is None:
+                raise pool.PoolError("trying to put unkeyed connection")
+            if not close and not conn.closed:
+                status = conn.info.transaction_status
+                if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+                    close = True
+                elif status != extensions.TRANSACTION_STATUS_IDLE:
+                    # yarım kalmış transaction havuza geri dönmesin
+                    try:
+                        conn.rollback()
+                    except psycopg2.Error:
+                        close = True
+            if close or conn.closed or self._closed:
+                self._discard(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def closeall(self):
+        with self._cond:
+            for conn, _ in self._idle:
+                self._discard(conn)
+            for conn in list(self._used.values()):
+                self._discard(conn)
+            self._idle = []
+            self._used = {}
+            self._closed = True
+            self._cond.notify_all()
+
+    def _record_wait(self, waited):
+        self._wait_total += waited
+        for i, bound in enumerate(WAIT_BUCKETS):
+            if waited <= bound:
+                self._wait_hist[i] += 1
+                break
+
+    def stats(self):
+        with self._cond:
+            self._check_fork()
+            return {
+                "name": self.name,
+                "pid": self._pid,
+                "min": self.minconn,
+                "max": self.maxconn,
+                "in_use": len(self._used),
+                "idle": len(self._idle),
+                "opening": self._opening,
+                "checkouts": sum(self._wait_hist),
+                "wait_total_s": round(self._wait_total, 6),
+                "wait_histogram": {
+                    ("+Inf" if b == float("inf") else "%gs" % b): n
+                    for b, n in zip(WAIT_BUCKETS, self._wait_hist)
+                },
+                "timeouts": self._timeouts,
+                "replaced": self._replaced,
+            }
+
+
+_pool = None            # birincil (yazma) havuzu
+_read_pools = []        # replika havuzları
+_read_rr = itertools.count()
+_pool_lock = threading.Lock()
+
+
+def _after_fork_in_child():
+    # child process kendi havuzlarını ilk kullanımda sıfırlar
+    for p in ([_pool] if _pool is not None else []) + _read_pools:
+        p._check_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+def init_pool(minconn=None, maxconn=None):
+    global _pool, _read_pools
     if _pool is None:
-        _pool = pool.SimpleConnectionPool(minconn, maxconn, dsn=DATABASE_URL)
+        with _pool_lock:
+            if _pool is None:
+                minconn = POOL_MIN if minconn is None else minconn
+                maxconn = POOL_MAX if maxconn is None else maxconn
+                _read_pools = [
+                    BoundedConnectionPool(minconn, maxconn, dsn=dsn, name="replica-%d" % (i + 1))
+                    for i, dsn in enumerate(DATABASE_READ_URLS)
+                ]
+                _pool = BoundedConnectionPool(minconn, maxconn, dsn=DATABASE_URL)
     return _pool
 
-def get_conn():
+def set_primary_reads(flag):
+    """
+    Bu thread'in okumalarını birincil sunucuya sabitler (read-your-writes).
+    Yazma isteklerinde ve yazmadan hemen sonraki isteklerde açılır.
+    """
+    _local.primary_reads = bool(flag)
+
+def _read_pool():
     if _pool is None:
         init_pool()
-    return _pool.getconn()
+    if not _read_pools or getattr(_local, "primary_reads", False):
+        return _pool
+    if READ_BALANCE == "least_busy":
+        return min(_read_pools, key=lambda p: p.busy())
+    return _read_pools[next(_read_rr) % len(_read_pools)]
 
-def put_conn(conn):
-    if _pool is not None:
-        _pool.putconn(conn)
+def get_conn(timeout=None, readonly=False):
+    """
+    Havuzdan bağlantı alır. readonly=True ise (replika tanımlıysa) okuma havuzlarından
+    biri seçilir; replikaya bağlanılamazsa birincile düşülür. Yazmalar her zaman birincildir.
+    """
+    if _pool is None:
+        init_pool()
+    if readonly:
+        target = _read_pool()
+        if target is not _pool:
+            try:
+                return target.getconn(timeout)
+            except psycopg2.OperationalError as e:
+                print(f"[db] {target.name} unavailable, reading from primary: {e}")
+    return _pool.getconn(timeout)
 
-def query(sql, params=None):
-    conn = get_conn()
-    try:
+def put_conn(conn, close=False):
+    target = getattr(conn, "pool", None) or _pool
+    if target is not None:
+        target.putconn(conn, close=close)
+
+def pool_stats():
+    if _pool is None:
+        return {}
+    stats = _pool.stats()
+    stats["replicas"] = [p.stats() for p in _read_pools]
+    stats["prepared"] = prepared_stats()
+    return stats
+
+# -------------------------------------------------------------------
+# İstek bazlı okuma bağlamı (request-scoped read context)
+# -------------------------------------------------------------------
+# Bir HTTP isteği boyunca tüm SELECT'ler aynı bağlantıyı ve aynı READ ONLY
+# snapshot'ı kullanır; istek bitince transaction kapatılıp bağlantı iade edilir.
+_local = threading.local()
+
+READ_COMMITTED = "READ COMMITTED"
+REPEATABLE_READ = "REPEATABLE READ"
+
+
+_savepoint_ids = itertools.count(1)
+
+
+class _ReadScope:
+    def __init__(self, isolation):
+        self.isolation = isolation
+        self.conn = None
+        self.snapshot = None
+
+    def connection(self):
+        # bağlantı ilk sorguda alınır (hiç sorgu atmayan istekler havuzu meşgul etmez)
+        if self.conn is None:
+            conn = get_conn(readonly=True)
+            try:
+                conn.set_session(isolation_level=self.isolation, readonly=True)
+            except Exception:
+                put_conn(conn, close=True)
+                raise
+            self.conn = conn
+        return self.conn
+
+    def export_snapshot(self):
+        """
+        REPEATABLE READ bağlamında snapshot'ı dışa aktarır; paralel sorgular
+        (farklı bağlantılarda) aynı snapshot'ı görür. Aktarılamıyorsa (hot standby
+        replika) None: sorgular bağlamın kendi bağlantısında sırayla çalışmalı.
+        """
+        if self.isolation != REPEATABLE_READ:
+            return None
+        if self.snapshot is None:
+            # Standby pg_export_snapshot()'ı hata ile reddeder; hata transaction'ı bozar ve
+            # savepoint ile korunamaz (alt transaction'dan snapshot dışa aktarılamaz). Bu
+            # yüzden fonksiyon standby'da hiç çağrılmaz: CASE aynı ifadede kontrol eder.
+            conn = self.connection()
+            try:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT CASE WHEN pg_is_in_recovery() THEN NULL "
+                                "ELSE pg_export_snapshot() END")
+                    self.snapshot = cur.fetchone()[0] or False
+            except psycopg2.Error as e:
+                # beklenmeyen hata (ör. bağlantı koptu): transaction zaten kullanılamaz
+                print(f"[db] pg_export_snapshot failed, read scope restarts with a new snapshot: {e}")
+                conn.rollback()
+                self.snapshot = False
+        return self.snapshot or None
+
+    # Her ifade kendi SAVEPOINT'i içinde çalışır: hata veren sorgu sadece kendini geri
+    # alır, bağlamın transaction'ı (REPEATABLE READ snapshot'ı ve dışa aktarılan
+    # snapshot kimliği) isteğin geri kalanı için geçerli kalır.
+    def savepoint(self):
+        name = "db_api_%d" % next(_savepoint_ids)
+        with self.connection().cursor() as cur:
+            cur.execute("SAVEPOINT " + name)
+        return name
+
+    def release(self, name):
+        with self.conn.cursor() as cur:
+            cur.execute("RELEASE SAVEPOINT " + name)
+
+    def rollback_to(self, name):
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("ROLLBACK TO SAVEPOINT " + name)
+                cur.execute("RELEASE SAVEPOINT " + name)
+        except psycopg2.Error:
+            # bağlantı kopmuş / transaction kurtarılamıyor: snapshot artık geçersiz,
+            # sonraki sorgular yeni transaction'da çalışır
+            self.snapshot = None
+            try:
+                self.conn.rollback()
+            except psycopg2.Error:
+                pass
+
+    def run(self, fn):
+        """fn(conn)'u bağlamın bağlantısında, kendi SAVEPOINT'i içinde çalıştırır."""
+        name = self.savepoint()
+        try:
+            result = fn(self.conn)
+        except psycopg2.Error:
+            self.rollback_to(name)
+            raise
+        self.release(name)
+        return result
+
+    def close(self):
+        self.snapshot = None
+        conn, self.conn = self.conn, None
+        if conn is None:
+            return
+        try:
+            conn.rollback()
+            conn.set_session(isolation_level="DEFAULT", readonly="DEFAULT")
+        except Exception:
+            put_conn(conn, close=True)
+            return
+        put_conn(conn)
+
+
+def begin_read_scope(isolation=READ_COMMITTED):
+    """Bu thread için okuma bağlamı açar. Önceki bağlam varsa önce kapatılır."""
+    end_read_scope()
+    _local.scope = _ReadScope(isolation)
+
+
+def end_read_scope():
+    scope = getattr(_local, "scope", None)
+    _local.scope = None
+    if scope is not None:
+        scope.close()
+
+
+def current_read_scope():
+    return getattr(_local, "scope", None)
+
+
+class read_scope:
+    """`with db_api.read_scope(REPEATABLE_READ): ...` - request dışı kullanım için."""
+
+    def __init__(self, isolation=READ_COMMITTED):
+        self.isolation = isolation
+
+    def __enter__(self):
+        self._outer = getattr(_local, "scope", None)
+        _local.scope = _ReadScope(self.isolation)
+        return _local.scope
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            _local.scope.close()
+        finally:
+            _local.scope = self._outer
+        return False
+
+
+# -------------------------------------------------------------------
+# Sorgu ölçümleri (instrumentation)
+# -------------------------------------------------------------------
+# Her sorgu için süre, dönen satır sayısı, normalize edilmiş SQL parmak izi ve
+# çağıran route kaydedilir. İstek toplamları Server-Timing header'ı olarak döner.
+_RE_COMMENT = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_RE_STRING = re.compile(r"'(?:[^']|'')*'")
+_RE_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_RE_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_RE_SPACE = re.compile(r"\s+")
+
+_fingerprint_cache = {}
+
+def fingerprint(sql):
+    """
+    Sabitleri ve parametreleri '?' ile değiştirip boşlukları sadeleştirir.
+    Aynı sorgunun farklı parametreli çağrıları aynı parmak izini alır.
+    Dönüş: (kısa id, normalize SQL)
+    """
+    fp = _fingerprint_cache.get(sql)
+    if fp is None:
+        text = _RE_COMMENT.sub(" ", sql)
+        text = _RE_STRING.sub("?", text)
+        text = text.replace("%s", "?")
+        text = _RE_NUMBER.sub("?", text)
+        text = _RE_IN_LIST.sub("(?)", text)
+        text = _RE_SPACE.sub(" ", text).strip().lower()
+        fp = (hashlib.md5(text.encode("utf-8")).hexdigest()[:8], text)
+        if len(_fingerprint_cache) < 2048:
+            _fingerprint_cache[sql] = fp
+    return fp
+
+
+class RequestStats:
+    """Bir isteğin sorgu toplamları (paralel sorgular farklı thread'den yazar)."""
+
+    def __init__(self, route):
+        self.route = route
+        self.count = 0
+        self.total_ms = 0.0
+        self.rows = 0
+        self.slowest = None     # (ms, fingerprint_id)
+        self._lock = threading.Lock()
+
+    def add(self, fp_id, ms, rows):
+        with self._lock:
+            self.count += 1
+            self.total_ms += ms
+            self.rows += rows
+            if self.slowest is None or ms > self.slowest[0]:
+                self.slowest = (ms, fp_id)
+
+    def server_timing(self):
+        parts = ['db;desc="%d queries, %d rows";dur=%.1f' % (self.count, self.rows, self.total_ms)]
+        if self.slowest is not None:
+            parts.append('db-slowest;desc="%s";dur=%.1f' % (self.slowest[1], self.slowest[0]))
+        return ", ".join(parts)
+
+
+# (route, fingerprint_id) -> [sql, calls, total_ms, max_ms, rows]
+_query_totals = {}
+_query_totals_lock = threading.Lock()
+
+
+def begin_request_stats(route):
+    _local.stats = RequestStats(route)
+    return _local.stats
+
+def end_request_stats():
+    stats = getattr(_local, "stats", None)
+    _local.stats = None
+    return stats
+
+def current_request_stats():
+    return getattr(_local, "stats", None)
+
+def _record(sql, elapsed, rows, stats=None):
+    stats = stats if stats is not None else current_request_stats()
+    route = stats.route if stats is not None else None
+    fp_id, fp_text = fingerprint(sql)
+    ms = elapsed * 1000.0
+    if stats is not None:
+        stats.add(fp_id, ms, rows)
+    with _query_totals_lock:
+        entry = _query_totals.get((route, fp_id))
+        if entry is None:
+            entry = _query_totals[(route, fp_id)] = [fp_text, 0, 0.0, 0.0, 0]
+        entry[1] += 1
+        entry[2] += ms
+        entry[3] = max(entry[3], ms)
+        entry[4] += rows
+    if ms >= SLOW_QUERY_MS:
+        print(f"[db] SLOW QUERY {ms:.1f}ms rows={rows} route={route} fp={fp_id}: {fp_text[:300]}")
+
+def query_stats(route=None):
+    """Süreç başladığından beri route + parmak izi bazında toplamlar (en yavaştan hızlıya)."""
+    with _query_totals_lock:
+        items = [(r, fp, list(v)) for (r, fp), v in _query_totals.items() if route is None or r == route]
+    items.sort(key=lambda x: x[2][2], reverse=True)
+    return [{
+        "route": r,
+        "fingerprint": fp,
+        "sql": v[0],
+        "calls": v[1],
+        "total_ms": round(v[2], 2),
+        "avg_ms": round(v[2] / v[1], 2) if v[1] else 0,
+        "max_ms": round(v[3], 2),
+        "rows": v[4],
+    } for r, fp, v in items]
+
+def reset_query_stats():
+    with _query_totals_lock:
+        _query_totals.clear()
+
+
+# -------------------------------------------------------------------
+# Prepared statement önbelleği (bağlantı başına LRU)
+# -------------------------------------------------------------------
+# Büyük CTE'li analitik sorgular her istekte yeniden parse/plan edilmesin diye
+# sunucu tarafında PREPARE edilir; aynı SQL metni yeni parametrelerle geldiğinde
+# sadece EXECUTE gönderilir.
+_prepare_ids = itertools.count(1)
+_prepare_stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+_prepare_stats_lock = threading.Lock()
+
+_RE_DDL = re.compile(r"\s*(CREATE|ALTER|DROP)\b", re.I)
+_RE_PLACEHOLDER = re.compile(r"%%|%s")
+# Yer tutucunun $n'e çevrilmesinin güvenli olmadığı yerler: literal, tırnaklı ad, yorum
+_RE_QUOTED = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|\$(\w*)\$.*?\$\1\$|--[^\n]*|/\*.*?\*/", re.S)
+
+def _count_prepare(key):
+    with _prepare_stats_lock:
+        _prepare_stats[key] += 1
+
+def _to_dollar_params(sql):
+    """
+    psycopg2 tarzı %s yer tutucularını PREPARE için $1, $2 ... yapar; %% -> % olur.
+    Literal / tırnaklı ad / yorum içinde yer tutucu varsa çeviri güvenli değildir:
+    (None, 0) döner ve sorgu PREPARE edilmeden çalıştırılır.
+    """
+    def placeholders(text):
+        return _RE_PLACEHOLDER.findall(text).count("%s")
+
+    if placeholders(_RE_QUOTED.sub(" ", sql)) != placeholders(sql):
+        return None, 0
+    n = 0
+
+    def sub(m):
+        nonlocal n
+        if m.group(0) == "%%":
+            return "%"
+        n += 1
+        return "$%d" % n
+
+    return _RE_PLACEHOLDER.sub(sub, sql), n
+
+def _param_type(value):
+    """
+    PREPARE'e verilen parametre tipi: psycopg2'nin aynı değer için ürettiği literal'in
+    tipi. Böylece hazırlanmış plan, sorgunun doğrudan çalıştırılmasıyla aynı şekilde
+    çözülür; string ve NULL literal'leri gibi "unknown" kalanlar bağlamdan çıkarılır.
+    """
+    if isinstance(value, bool):
+        return "boolean"
+    if isinstance(value, int):
+        if -2 ** 31 <= value < 2 ** 31:
+            return "integer"
+        return "bigint" if -2 ** 63 <= value < 2 ** 63 else "numeric"
+    if isinstance(value, (float, Decimal)):
+        return "numeric"
+    if isinstance(value, datetime.datetime):
+        return "timestamptz" if value.tzinfo is not None else "timestamp"
+    if isinstance(value, datetime.date):
+        return "date"
+    if isinstance(value, datetime.time):
+        return "time"
+    if isinstance(value, datetime.timedelta):
+        return "interval"
+    return "unknown"
+
+def invalidate_prepared():
+    """
+    Şema değiştiğinde çağrılır: tüm bağlantılar bir sonraki kullanımda
+    DEALLOCATE ALL yapıp önbelleklerini boşaltır.
+    """
+    global _schema_generation
+    _schema_generation += 1
+
+def prepared_stats():
+    with _prepare_stats_lock:
+        stats = dict(_prepare_stats)
+    total = stats["hits"] + stats["misses"]
+    stats["hit_ratio"] = round(stats["hits"] / total, 3) if total else 0
+    stats["generation"] = _schema_generation
+    return stats
+
+def _execute_prepared(cur, sql, params):
+    conn = cur.connection
+    cache = getattr(conn, "prepared", None)
+    params = tuple(params or ())
+    if cache is None or PREPARE_CACHE_SIZE <= 0:
+        cur.execute(sql, params)
+        return
+
+    if conn.prepared_generation != _schema_generation:
+        cur.execute("DEALLOCATE ALL")
+        cache.clear()
+        conn.prepared_generation = _schema_generation
+        _count_prepare("invalidations")
+
+    # parametre tipleri anahtarın parçası: aynı SQL farklı tiplerle ayrı hazırlanır
+    types = tuple(_param_type(value) for value in params)
+    key = (sql, types)
+    name = cache.get(key)
+    if name is None:
+        text, n = _to_dollar_params(sql)
+        if text is None or n != len(params):
+            cur.execute(sql, params)
+            return
+        _count_prepare("misses")
+        name = "ps_%d" % next(_prepare_ids)
+        cur.execute("PREPARE %s%s AS %s" % (name, "(%s)" % ", ".join(types) if types else "", text))
+        cache[key] = name
+        if len(cache) > PREPARE_CACHE_SIZE:
+            _, old_name = cache.popitem(last=False)
+            cur.execute("DEALLOCATE " + old_name)
+            _count_prepare("evictions")
+    else:
+        _count_prepare("hits")
+        cache.move_to_end(key)
+
+    if params:
+        cur.execute("EXECUTE %s (%s)" % (name, ", ".join(["%s"] * len(params))), params)
+    else:
+        cur.execute("EXECUTE " + name)
+
+def _forget_prepared(conn, sql):
+    # Başka bir süreç şemayı değiştirdiyse: "cached plan must not change result type".
+    # Çağıran, hatalı ifadeyi önce geri almış olmalı (savepoint ya da kendi transaction'ı);
+    # burada rollback yapılmaz, okuma bağlamının transaction'ı ve snapshot'ı korunur.
+    cache = getattr(conn, "prepared", None)
+    names = [cache.pop(key) for key in list(cache) if key[0] == sql] if cache is not None else []
+    if names:
         with conn.cursor() as cur:
+            for name in names:
+                cur.execute("DEALLOCATE " + name)
+        _count_prepare("invalidations")
+    return bool(names)
+
+# -------------------------------------------------------------------
+# Sonuç biçimleri (row_format)
+# -------------------------------------------------------------------
+# "tuple"      : psycopg2'nin döndürdüğü tuple listesi (varsayılan)
+# "dict"       : [{sütun: değer}, ...]  - şablonlara doğrudan verilebilir
+# "namedtuple" : [Row(sütun=değer), ...] - sütun başına dict yerine tek tuple (daha az bellek)
+# "columns"    : {sütun: [değerler]}     - JSON cevapları için sütun bazlı çıktı
+ROW_FORMATS = ("tuple", "dict", "namedtuple", "columns")
+
+# NUMERIC sütunları Decimal yerine doğrudan float olarak okur (cursor bazında kaydedilir)
+_NUMERIC_AS_FLOAT = extensions.new_type(
+    extensions.DECIMAL.values, "NUMERIC_AS_FLOAT",
+    lambda value, cur: float(value) if value is not None else None)
+
+@lru_cache(maxsize=256)
+def _row_class(names):
+    return namedtuple("Row", names, rename=True)
+
+def shape_rows(names, rows, row_format="tuple"):
+    """Tuple satırlarını istenen biçime çevirir (names: sütun adları, cursor.description sırası)."""
+    if row_format == "tuple":
+        return rows
+    if row_format == "dict":
+        return [dict(zip(names, row)) for row in rows]
+    if row_format == "namedtuple":
+        make = _row_class(tuple(names))._make
+        return [make(row) for row in rows]
+    if row_format == "columns":
+        columns = list(zip(*rows)) if rows else [()] * len(names)
+        return {name: list(col) for name, col in zip(names, columns)}
+    raise ValueError("unknown row_format: %r (expected one of %s)" % (row_format, ", ".join(ROW_FORMATS)))
+
+def _run(conn, sql, params, prepare=False, row_format="tuple", numeric_as_float=False):
+    start = time.perf_counter()
+    with conn.cursor() as cur:
+        if numeric_as_float:
+            extensions.register_type(_NUMERIC_AS_FLOAT, cur)
+        if prepare:
+            _execute_prepared(cur, sql, params)
+        else:
             cur.execute(sql, params or ())
-            return cur.fetchall()
+        rows = cur.fetchall()
+        names = [d[0] for d in cur.description]
+        _remember_columns(sql, cur.description)
+    _record(sql, time.perf_counter() - start, len(rows))
+    return shape_rows(names, rows, row_format)
+
+def query(sql, params=None, prepare=False, row_format="tuple", numeric_as_float=False):
+    """
+    SELECT çalıştırıp tüm satırları döndürür.
+    prepare=True: sık çalışan ağır sorgular için bağlantının prepared statement önbelleğini kullanır.
+    row_format: "tuple" | "dict" | "namedtuple" | "columns" (bkz. ROW_FORMATS)
+    numeric_as_float=True: NUMERIC sütunlar Decimal yerine float gelir.
+    """
+    def attempt(conn):
+        return _run(conn, sql, params, prepare, row_format, numeric_as_float)
+
+    scope = current_read_scope()
+    if scope is not None:
+        # hatalı sorgu sadece kendi savepoint'ini geri alır; sayfanın diğer panelleri
+        # aynı snapshot'la çalışmaya devam eder
+        try:
+            return scope.run(attempt)
+        except psycopg2.errors.FeatureNotSupported:
+            # şema başka süreçte değişti: eski plan silinip sorgu yeniden hazırlanır
+            if not prepare or not _forget_prepared(scope.conn, sql):
+                raise
+            return scope.run(attempt)
+
+    conn = get_conn(readonly=True)
+    try:
+        try:
+            rows = attempt(conn)
+        except psycopg2.errors.FeatureNotSupported:
+            conn.rollback()
+            if not prepare or not _forget_prepared(conn, sql):
+                raise
+            rows = attempt(conn)
+        # SELECT de transaction açar; havuza "idle in transaction" dönmesin
+        conn.rollback()
+        return rows
     finally:
         put_conn(conn)
 
+# -------------------------------------------------------------------
+# query_many(): tek round-trip'te birden fazla sorgu
+# -------------------------------------------------------------------
+# psycopg2 bir execute'tan sadece son result set'i döndürür. Bu yüzden her sorgu
+# db_api_batch_part(<sql>, <sıralama>) çağrısına sarılıp tek SELECT'te gönderilir
+# (0013_query_many_order.sql): her çağrı kendi alt transaction'ında çalışır, hata
+# veren sorgu diğerlerini etkilemez; satırlar verilen sıralamayla numaralanıp o
+# sırayla JSON'a toplanır. JSON değerleri, sorgunun daha önce tek başına
+# çalıştığında cursor.description'dan öğrenilen sütun tipleriyle psycopg2'nin kendi
+# typecaster'larından geçirilir: sonuçlar query() ile aynı Python tiplerinde döner.
+#
+# Sınırlar:
+# - Sorgunun kendi ORDER BY'ı batch'te korunmaz (dış sorgu alt sorgunun sırasını
+#   garanti etmez). Üst seviyede ORDER BY olan sorgu, çağıran sıralamayı çıktı
+#   sütunları üzerinden ayrıca vermezse batch'e girmez, tek başına çalışır.
+# - Sütun tipleri ancak sorgu bir kez tek başına çalıştıktan sonra bilinir: her
+#   sorgunun (süreç başına) ilk çağrısı batch'siz çalışır.
+# - Değerler JSON metni olarak taşınır. Tarih/saat, NUMERIC, float ve psycopg2'nin
+#   caster'ı olan diğer tipler metinden geri çevrilir; diziler ve bileşik tipler ise
+#   JSON karşılıklarıyla (elemanlar tipsiz: sayı int/Decimal, tarih string) döner.
+#   Böyle sütunları olan sorgular için query() kullanın.
+_batch_columns = {}         # sql -> (şema nesli, [(sütun adı, tip OID), ...])
+_batch_unavailable = False  # db_api_batch_part yoksa (migration uygulanmamış) sırayla çalışılır
+
+_TEXT_OIDS = (19, 25, 1042, 1043)       # name, text, char(n), varchar: JSON string'i olduğu gibi
+_JSON_OIDS = (114, 3802)                # json, jsonb
+_TIMESTAMP_OIDS = (1114, 1184)          # JSON'da "YYYY-MM-DDTHH:MM:SS", metin çıktısında boşluk
+
+
+class _JsonNumber(str):
+    """JSON sayısının metni: sütun tipine göre int / Decimal / float'a çevrilir."""
+
+
+class _JsonObject(list):
+    """JSON nesnesi, (anahtar, değer) çiftleri olarak (sıra ve tekrar eden anahtarlar korunur)."""
+
+
+def _remember_columns(sql, description):
+    if sql in _batch_columns or len(_batch_columns) < 2048:
+        _batch_columns[sql] = (_schema_generation, [(d[0], d[1]) for d in description])
+
+def _known_columns(sql):
+    entry = _batch_columns.get(sql)
+    if entry is None or entry[0] != _schema_generation:
+        return None
+    return entry[1]
+
+def _json_value(value, numeric_as_float=False):
+    # tipi bilinmeyen / json sütunları: sayılar int ya da Decimal (float), nesneler dict
+    if isinstance(value, _JsonNumber):
+        if value.lstrip("-").isdigit():
+            return int(value)
+        return float(value) if numeric_as_float else Decimal(value)
+    if isinstance(value, _JsonObject):
+        return {k: _json_value(v, numeric_as_float) for k, v in value}
+    if isinstance(value, list):
+        return [_json_value(v, numeric_as_float) for v in value]
+    return value
+
+def _column_decoder(oid, cur, numeric_as_float):
+    if oid in _TEXT_OIDS:
+        return lambda value: value
+    if oid in _JSON_OIDS:
+        return lambda value: _json_value(value, numeric_as_float)
+    caster = _NUMERIC_AS_FLOAT if numeric_as_float and oid in extensions.DECIMAL.values \
+        else extensions.string_types.get(oid)
+    if caster is None:
+        return lambda value: _json_value(value, numeric_as_float)
+    fix = (lambda text: text.replace("T", " ", 1)) if oid in _TIMESTAMP_OIDS else str
+
+    def decode(value):
+        if isinstance(value, str):
+            return caster(fix(value), cur)
+        # true/false, diziler: JSON karşılığı (dizi elemanları tipsiz çözülür)
+        return _json_value(value, numeric_as_float)
+    return decode
+
+def _batch_error(part):
+    try:
+        error_class = psycopg2.errors.lookup(part["sqlstate"])
+    except KeyError:
+        error_class = psycopg2.Error
+    return error_class(part["error"])
+
+def _decode_batch(text, columns_list, cur, row_format="tuple", numeric_as_float=False):
+    parts = json.loads(text, parse_int=_JsonNumber, parse_float=_JsonNumber, object_pairs_hook=_JsonObject)
+    results = []
+    for part, columns in zip(parts, columns_list):
+        part = dict(part)
+        if "error" in part:
+            results.append(_batch_error(part))
+            continue
+        names = [name for name, _ in columns]
+        decoders = [_column_decoder(oid, cur, numeric_as_float) for _, oid in columns]
+        rows = [
+            # son çift satır numarası (db_api_rn)
+            tuple(decode(value) for decode, (_, value) in zip(decoders, row[:-1]))
+            for row in part["rows"]
+        ]
+        results.append(shape_rows(names, rows, row_format))
+    return results
+
+_RE_ORDER_TOKENS = re.compile(r"[()]|\border\s+by\b", re.I)
+
+def _has_top_level_order(sql):
+    # string/tanımlayıcı/yorumlar atılır; parantez içindeki ORDER BY'lar (alt sorgu,
+    # OVER (...), aggregate) sonucun sırasını belirlemez
+    depth = 0
+    for m in _RE_ORDER_TOKENS.finditer(_RE_QUOTED.sub(" ", sql)):
+        token = m.group(0)
+        if token == "(":
+            depth += 1
+        elif token == ")":
+            depth -= 1
+        elif depth == 0:
+            return True
+    return False
+
+def query_many(statements, return_exceptions=False, row_format="tuple", numeric_as_float=False):
+    """
+    Birbirinden bağımsız okuma sorgularını tek bağlantı + tek round-trip ile çalıştırır.
+
+    statements: [(sql, params), ...], [(sql, params, order_by), ...] veya [sql, ...]
+    order_by: sonucun sıralaması, sorgunun çıktı sütunları üzerinden (ör.
+    "team_name, league DESC"); sorgunun kendi ORDER BY'ı ile aynı olmalı. Üst
+    seviyede ORDER BY'ı olup order_by verilmeyen sorgu batch'e girmez.
+    Dönüş: her sorgunun satır listesi, verilen sırayla.
+
+    Sonuç tipleri query() ile aynıdır (DATE/TIME/NUMERIC/float dahil; diziler ve
+    bileşik tipler hariç, bkz. yukarıdaki sınırlar). Bir sorgu ilk kez görüldüğünde
+    sütun tiplerini öğrenmek için tek başına çalıştırılır; sonraki çağrılarda batch'e girer.
+
+    Hata veren sorgu batch'in diğer sorgularını etkilemez (tekrar çalıştırma yok).
+    return_exceptions=True ise hatalı sorgunun yerine exception nesnesi konur,
+    değilse ilk hata fırlatılır.
+
+    row_format / numeric_as_float: query() ile aynı (tüm sorgulara uygulanır).
+    """
+    global _batch_unavailable
+    statements = [(st, None, None) if isinstance(st, str) else tuple(st) + (None,) * (3 - len(st))
+                  for st in statements]
+    results = [None] * len(statements)
+    batch = []
+    for i, (sql, params, order_by) in enumerate(statements):
+        if BATCH_QUERIES and not _batch_unavailable and _known_columns(sql) is not None \
+                and (order_by is not None or not _has_top_level_order(sql)):
+            batch.append(i)
+            continue
+        try:
+            results[i] = query(sql, params, row_format=row_format, numeric_as_float=numeric_as_float)
+        except Exception as e:
+            if not return_exceptions:
+                raise
+            results[i] = e
+
+    if batch:
+        try:
+            batch_results = _query_batch([statements[i] for i in batch], row_format, numeric_as_float)
+        except psycopg2.errors.UndefinedFunction:
+            _batch_unavailable = True
+            print("[db] db_api_batch_part(sql, order) yok (migration 0013?): query_many sırayla çalışacak")
+            return query_many(statements, return_exceptions, row_format, numeric_as_float)
+        for i, result in zip(batch, batch_results):
+            results[i] = result
+
+    if not return_exceptions:
+        for result in results:
+            result_or_raise(result)
+    return results
+
+def result_or_raise(result):
+    """query_many(return_exceptions=True) sonucundaki exception'ı tekrar fırlatır."""
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+def _query_batch(statements, row_format="tuple", numeric_as_float=False):
+    columns_list = [_known_columns(sql) for sql, _, _ in statements]
+
+    def run(conn):
+        with conn.cursor() as cur:
+            encoding = extensions.encodings.get(conn.encoding, "utf-8")
+            args = []
+            for sql, params, order_by in statements:
+                args += [cur.mogrify(sql.strip().rstrip(";"), params or ()).decode(encoding), order_by]
+            cur.execute("SELECT json_build_array(%s)::text"
+                        % ", ".join(["db_api_batch_part(%s, %s)"] * len(statements)), args)
+            # typecaster'lar cursor'ın bağlantısını (encoding, tzinfo) kullanır
+            return _decode_batch(cur.fetchone()[0], columns_list, cur, row_format, numeric_as_float)
+
+    start = time.perf_counter()
+    scope = current_read_scope()
+    if scope is not None:
+        results = scope.run(run)
+    else:
+        conn = get_conn(readonly=True)
+        try:
+            results = run(conn)
+        finally:
+            conn.rollback()
+            put_conn(conn)
+    # tek round-trip tek kayıt: süre sorgulara bölüştürülmez
+    rows = sum(len(next(iter(r.values()), [])) if isinstance(r, dict) else len(r)
+               for r in results if not isinstance(r, Exception))
+    _record("/* query_many */ " + ";\n".join(sql for sql, _, _ in statements), time.perf_counter() - start, rows)
+    return results
+
+def _query_isolated(target, sql, params, timeout, snapshot, stats, prepare):
+    # Süre sorgu gerçekten başladığında başlar: havuzdan bağlantı beklemesi dahil,
+    # sırada beklenen süre hariç. Kalan süre sunucuda statement_timeout olur (iptal
+    # edilen sorgu bağlantıyı boşa meşgul etmez).
+    deadline = time.monotonic() + timeout
+    conn = target.getconn(timeout)
+    try:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError("no connection within %.1fs" % timeout)
+        if snapshot:
+            conn.set_session(isolation_level=REPEATABLE_READ, readonly=True)
+        with conn.cursor() as cur:
+            if snapshot:
+                # transaction'ın ilk komutu olmalı
+                cur.execute("SET TRANSACTION SNAPSHOT %s", (snapshot,))
+            cur.execute("SET LOCAL statement_timeout = %s", (max(1, int(remaining * 1000)),))
+            start = time.perf_counter()
+            if prepare:
+                _execute_prepared(cur, sql, params)
+            else:
+                cur.execute(sql, params or ())
+            rows = cur.fetchall()
+            _record(sql, time.perf_counter() - start, len(rows), stats)
+        conn.rollback()
+    except psycopg2.errors.QueryCanceled as e:
+        conn.rollback()
+        raise TimeoutError("query did not finish in %.1fs" % timeout) from e
+    except psycopg2.errors.FeatureNotSupported:
+        # şema başka süreçte değişti: önbellekteki plan bir sonraki seferde yeniden hazırlanır
+        conn.rollback()
+        _forget_prepared(conn, sql)
+        raise
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        if snapshot:
+            try:
+                conn.set_session(isolation_level="DEFAULT", readonly="DEFAULT")
+            except psycopg2.Error:
+                put_conn(conn, close=True)
+                conn = None
+        if conn is not None:
+            put_conn(conn)
+    return rows
+
+def _query_serial(scope, statements, timeout, prepare):
+    # query_parallel yedeği: sorgular bağlamın bağlantısında (aynı snapshot) sırayla,
+    # her biri kendi SAVEPOINT'i ve statement_timeout'u ile çalışır
+    def attempt(conn, sql, params):
+        with conn.cursor() as cur:
+            cur.execute("SET LOCAL statement_timeout = %s", (max(1, int(timeout * 1000)),))
+        rows = _run(conn, sql, params, prepare)
+        with conn.cursor() as cur:
+            cur.execute("SET LOCAL statement_timeout TO DEFAULT")
+        return rows
+
+    results = []
+    for sql, params in statements:
+        try:
+            try:
+                results.append(scope.run(lambda conn: attempt(conn, sql, params)))
+            except psycopg2.errors.FeatureNotSupported:
+                if not prepare or not _forget_prepared(scope.conn, sql):
+                    raise
+                results.append(scope.run(lambda conn: attempt(conn, sql, params)))
+        except psycopg2.errors.QueryCanceled:
+            results.append(TimeoutError("query did not finish in %.1fs" % timeout))
+        except Exception as e:
+            results.append(e)
+    return results
+
+def query_parallel(statements, timeout=None, prepare=False):
+    """
+    Birbirinden bağımsız okuma sorgularını ayrı havuz bağlantılarında eşzamanlı çalıştırır.
+    Toplam süre en yavaş sorguya yakın olur (query_many'de sorguların toplamıdır).
+
+    statements: [(sql, params), ...] veya [sql, ...]
+    Dönüş: sonuç listesi, verilen sırayla. Hata veren ya da `timeout` saniyeyi aşan
+    sorgunun yerine exception nesnesi konur (db_api.result_or_raise ile açılabilir) ve
+    hata loglanır. Süre her sorgu için kendisi başladığında başlar.
+    prepare=True ise sorgular bağlantıların prepared statement önbelleğinden çalışır.
+
+    REPEATABLE READ okuma bağlamı açıksa bağlamın snapshot'ı tüm bağlantılara
+    aktarılır; sorgular yine tek ve tutarlı bir snapshot görür. Snapshot dışa
+    aktarılamıyorsa (hot standby) sorgular bağlamın bağlantısında sırayla çalışır.
+    """
+    timeout = PANEL_TIMEOUT if timeout is None else timeout
+    statements = [(st, None) if isinstance(st, str) else st for st in statements]
+    if not statements:
+        return []
+
+    scope = current_read_scope()
+    snapshot = scope.export_snapshot() if scope is not None else None
+    if scope is not None and scope.isolation == REPEATABLE_READ and not snapshot:
+        # snapshot paylaşılamıyor (hot standby): tutarlılık için bağlamın bağlantısında sırayla
+        results = _query_serial(scope, statements, timeout, prepare)
+    else:
+        # snapshot sadece aynı sunucuda içe aktarılabilir: bağlamın bağlantısıyla aynı havuz
+        target = scope.conn.pool if snapshot else _read_pool()
+
+        # Her çağrının kendi worker'ları var: istekler ortak bir kuyrukta birbirinin
+        # sorgularını beklemez. İstek başına en fazla PARALLEL_WORKERS bağlantı, havuzun
+        # bir eksiği ile sınırlı (biri bağlamın kendi bağlantısı); toplamı havuz sınırlar.
+        workers = min(PARALLEL_WORKERS, len(statements), max(1, target.maxconn - 1))
+        stats = current_request_stats()
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="db-parallel") as executor:
+            futures = [executor.submit(_query_isolated, target, sql, params, timeout, snapshot, stats, prepare)
+                       for sql, params in statements]
+            results = []
+            for future in futures:
+                # her sorgu kendi süresiyle (bağlantı + statement_timeout) sınırlı
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    results.append(e)
+
+    for (sql, _), result in zip(statements, results):
+        if isinstance(result, Exception):
+            print(f"[db] query_parallel [{fingerprint(sql)[0]}] {type(result).__name__}: {result}")
+    return results
+
+_stream_ids = itertools.count(1)
+
+def stream(sql, params=None, itersize=2000, row_format="tuple"):
+    """
+    Sunucu taraflı (named) cursor ile satırları parça parça döndüren generator.
+    Bellekte aynı anda en fazla `itersize` satır tutulur; tablo büyüse de bellek sabit kalır.
+    Okuma bağlamı açıksa onun bağlantısı/snapshot'ı kullanılır.
+    row_format: "tuple" | "dict" | "namedtuple" ("columns" akışta anlamsız)
+    """
+    if row_format not in ("tuple", "dict", "namedtuple"):
+        raise ValueError("stream() does not support row_format=%r" % (row_format,))
+    scope = current_read_scope()
+    own_conn = scope is None
+    conn = get_conn(readonly=True) if own_conn else scope.connection()
+    # bağlamın transaction'ında: hata sadece bu akışın savepoint'ini geri alır
+    savepoint = None if own_conn else scope.savepoint()
+    cur = conn.cursor(name="stream_%d_%d" % (os.getpid(), next(_stream_ids)))
+    stats = current_request_stats()
+    start = time.perf_counter()
+    count = 0
+    try:
+        cur.itersize = itersize
+        cur.execute(sql, params or ())
+        make = None
+        for row in cur:
+            if make is None and row_format != "tuple":
+                names = [d[0] for d in cur.description]
+                make = (_row_class(tuple(names))._make if row_format == "namedtuple"
+                        else lambda r, names=names: dict(zip(names, r)))
+            count += 1
+            yield make(row) if make else row
+        _record(sql, time.perf_counter() - start, count, stats)
+    except psycopg2.Error:
+        if savepoint is None:
+            conn.rollback()
+        else:
+            scope.rollback_to(savepoint)
+            savepoint = None
+        raise
+    finally:
+        try:
+            cur.close()
+        except psycopg2.Error:
+            pass
+        if savepoint is not None:
+            try:
+                scope.release(savepoint)
+            except psycopg2.Error:
+                scope.rollback_to(savepoint)
+        if own_conn:
+            try:
+                conn.rollback()
+            finally:
+                put_conn(conn)
+
+# -------------------------------------------------------------------
+# Filtrelenmiş COUNT önbelleği
+# -------------------------------------------------------------------
+# Liste sayfalarının toplam kayıt sayısı, filtre kümesinin kanonik biçimiyle
+# (SQL + parametreler) anahtarlanıp tabloların sürümleriyle birlikte saklanır.
+# Sürüm, table_changes'te tablonun görünen satırlarının toplamıdır (0012_table_changes.sql:
+# her yazma ifadesi bir satır ekler, kilit çakışması olmaz; sürüm ancak commit'te artar),
+# bu yüzden başka süreçlerin yazmaları da önbelleği geçersiz kılar. Önbellekte olmayan ve planlayıcı tahmini
+# COUNT_ESTIMATE_THRESHOLD'u aşan sonuçlar için COUNT(*) yerine tahmin döner.
+COUNT_ESTIMATE_THRESHOLD = int(os.environ.get("DB_COUNT_ESTIMATE_THRESHOLD", 50000))
+COUNT_CACHE_SIZE = int(os.environ.get("DB_COUNT_CACHE_SIZE", 512))
+
+_count_cache = OrderedDict()    # key -> (versions, value)
+_count_cache_lock = threading.Lock()
+_count_stats = {"hits": 0, "misses": 0, "estimates": 0, "stale": 0}
+
+def count_key(name, sql, params=()):
+    # Boşluk farkları ve parametre tipleri (date / str) anahtarı değiştirmesin
+    return (name, _RE_SPACE.sub(" ", sql).strip(), tuple(str(p) for p in params))
+
+def table_versions(tables):
+    rows = query("SELECT table_name, sum(changes)::bigint FROM table_changes "
+                 "WHERE table_name = ANY(%s) GROUP BY table_name",
+                 ([t.lower() for t in tables],))
+    versions = dict(rows)
+    return tuple(versions.get(t.lower(), 0) for t in tables)
+
+def count_cache_get(key, versions):
+    with _count_cache_lock:
+        entry = _count_cache.get(key)
+        if entry is None:
+            _count_stats["misses"] += 1
+            return None
+        if entry[0] != versions:
+            # tablolardan biri değişmiş: eski sayı bir daha kullanılmaz
+            del _count_cache[key]
+            _count_stats["stale"] += 1
+            return None
+        _count_cache.move_to_end(key)
+        _count_stats["hits"] += 1
+        return entry[1]
+
+def count_cache_put(key, versions, value):
+    with _count_cache_lock:
+        _count_cache[key] = (versions, value)
+        _count_cache.move_to_end(key)
+        while len(_count_cache) > COUNT_CACHE_SIZE:
+            _count_cache.popitem(last=False)
+
+def count_cache_stats():
+    with _count_cache_lock:
+        return dict(_count_stats, size=len(_count_cache), max_size=COUNT_CACHE_SIZE,
+                    estimate_threshold=COUNT_ESTIMATE_THRESHOLD)
+
+def estimate_rows(from_sql, params=()):
+    """
+    Planlayıcının satır tahmini (pg_class / pg_statistic istatistikleri). Sorgu
+    çalıştırılmaz, sadece planlanır; from_sql "FROM ... WHERE ..." kısmıdır.
+    """
+    plan = query("EXPLAIN (FORMAT JSON) SELECT 1 " + from_sql, params)[0][0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+def filtered_count(name, from_sql, params=(), tables=(), exact=False):
+    """
+    from_sql ("FROM ... WHERE ...") için toplam satır sayısı: (count, approximate).
+    Önbellekteki kesin sayı tablolar değişmediyse kullanılır. Yoksa planlayıcı tahmini
+    eşiği aşıyorsa tahmin döner (approximate=True); exact=True ise her durumda
+    COUNT(*) çalıştırılıp sonuç önbelleğe yazılır.
+    """
+    key = count_key(name, from_sql, params)
+    # Sürümler sayımdan önce okunur: arada gelen bir yazma en fazla bir sonraki
+    # isteğin yeniden saymasına yol açar, eski sayının saklanmasına değil
+    versions = table_versions(tables)
+    cached = count_cache_get(key, versions)
+    if cached is not None:
+        return cached, False
+    if not exact:
+        estimate = estimate_rows(from_sql, params)
+        if estimate >= COUNT_ESTIMATE_THRESHOLD:
+            with _count_cache_lock:
+                _count_stats["estimates"] += 1
+            return estimate, True
+    total = query("SELECT COUNT(*) " + from_sql, params)[0][0]
+    count_cache_put(key, versions, total)
+    return total, False
+
+# -------------------------------------------------------------------
+# COPY ... TO STDOUT ile toplu dışa aktarma
+# -------------------------------------------------------------------
+# copy_expert() veriyi bir dosya nesnesine senkron yazar; generator'dan parça parça
+# okuyabilmek için COPY ayrı bir thread'de çalışır ve parçalar sınırlı bir kuyruktan
+# geçer. İstemci yavaş okursa kuyruk dolar ve COPY bekler (bellek sabit kalır).
+EXPORT_FORMATS = ("csv", "ndjson")
+
+_COPY_OPTIONS = {
+    "csv": b"WITH (FORMAT csv, HEADER)",
+    # JSON satırları CSV içinde hiç geçmeyen quote/delimiter ile yazılır: kaçış yapılmaz
+    "ndjson": b"WITH (FORMAT csv, QUOTE E'\\x01', DELIMITER E'\\x02')",
+}
+
+
+class _ChunkWriter:
+    def __init__(self, chunks, chunk_size, cancelled):
+        self.chunks = chunks
+        self.chunk_size = chunk_size
+        self.cancelled = cancelled
+        self.buf = []
+        self.size = 0
+
+    def write(self, data):
+        # psycopg2 her COPY mesajında (yaklaşık satır başına) bir kez çağırır
+        self.buf.append(data)
+        self.size += len(data)
+        if self.size >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if self.buf:
+            chunk = b"".join(self.buf)
+            self.buf, self.size = [], 0
+            _offer(self.chunks, chunk, self.cancelled)
+
+
+def _offer(chunks, item, cancelled):
+    # istemci bağlantıyı kestiyse bekleme bırakılır, veri atılır
+    while not cancelled.is_set():
+        try:
+            chunks.put(item, timeout=0.5)
+            return
+        except queue.Full:
+            pass
+
+
+def _copy_worker(conn, copy_sql, chunks, chunk_size, cancelled):
+    writer = _ChunkWriter(chunks, chunk_size, cancelled)
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SET TRANSACTION READ ONLY")
+            cur.copy_expert(copy_sql, writer)
+            rows = max(cur.rowcount, 0)
+        writer.flush()
+        result = rows
+    except Exception as e:
+        result = e
+    try:
+        conn.rollback()
+    except psycopg2.Error:
+        pass
+    _offer(chunks, result, cancelled)
+
+
+def copy_out(sql, params=None, fmt="csv", chunk_size=None):
+    """
+    SELECT sonucunu `COPY (...) TO STDOUT` ile bytes parçaları halinde döndüren generator.
+    Satırlar Python nesnesine çevrilmez; Flask Response'a doğrudan verilebilir.
+
+    fmt: "csv"    -> başlık satırlı CSV
+         "ndjson" -> her satır bir JSON nesnesi (row_to_json)
+    Generator yarıda kapatılırsa (istemci koptu) sunucudaki COPY iptal edilir.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError("copy_out() does not support fmt=%r" % (fmt,))
+    chunk_size = chunk_size or EXPORT_CHUNK_SIZE
+
+    # okuma bağlamının tek bağlantısı uzun bir COPY ile meşgul edilmez: ayrı bağlantı
+    conn = get_conn(readonly=True)
+    try:
+        with conn.cursor() as cur:
+            select = cur.mogrify(sql, params or ())
+    except Exception:
+        put_conn(conn)
+        raise
+    if fmt == "ndjson":
+        select = b"SELECT row_to_json(q) FROM (" + select + b") q"
+    copy_sql = b"COPY (" + select + b") TO STDOUT " + _COPY_OPTIONS[fmt]
+
+    chunks = queue.Queue(maxsize=EXPORT_QUEUE_CHUNKS)
+    cancelled = threading.Event()
+    stats = current_request_stats()
+    start = time.perf_counter()
+    worker = threading.Thread(target=_copy_worker, name="db-copy", daemon=True,
+                              args=(conn, copy_sql, chunks, chunk_size, cancelled))
+    worker.start()
+    finished = False
+    try:
+        while True:
+            item = chunks.get()
+            if isinstance(item, bytes):
+                yield item
+                continue
+            finished = True
+            if isinstance(item, Exception):
+                raise item
+            _record(sql, time.perf_counter() - start, item, stats)
+            return
+    finally:
+        if not finished:
+            cancelled.set()
+            try:
+                conn.cancel()
+            except psycopg2.Error:
+                pass
+        worker.join()
+        # yarıda kesilen COPY'nin bağlantısı kapatılır: geç ulaşan cancel isteği
+        # havuzdan bu bağlantıyı alan bir sonraki sorguyu iptal edebilirdi
+        put_conn(conn, close=not finished or bool(conn.closed))
+
 def execute(sql, params=None):
+    # Yazma işlemleri okuma bağlamından bağımsız, kendi bağlantısında commit edilir
     conn = get_conn()
     try:
+        start = time.perf_counter()
         with conn.cursor() as cur:
             cur.execute(sql, params or ())
+            affected = max(cur.rowcount, 0)
         conn.commit()
+        _record(sql, time.perf_counter() - start, affected)
+        if _RE_DDL.match(sql):
+            invalidate_prepared()
     except:
         conn.rollback()
         raise
     finally:
-        put_conn(conn)
\ No newline at end of file
+        put_conn(conn)
@@ -0,0 +1,110 @@
+-- 0001: baseline schema (tables as created by init_db before migrations existed)
+-- IF NOT EXISTS everywhere: databases created by the old init_db adopt this as v1 unchanged.
+
+CREATE TABLE IF NOT EXISTS users (
+    id SERIAL PRIMARY KEY,
+    username VARCHAR(64) UNIQUE NOT NULL,
+    password_hash VARCHAR(256) NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS Teams (
+    team_id INT PRIMARY KEY,
+    staff_id INT,
+    team_url VARCHAR(255),
+    team_name VARCHAR(100),
+    league VARCHAR(64),
+    team_city VARCHAR(64),
+    team_year INT,
+    saloon_name VARCHAR(128),
+    saloon_capacity INT,
+    saloon_address TEXT
+);
+
+CREATE TABLE IF NOT EXISTS Matches (
+    match_id VARCHAR(16) NOT NULL PRIMARY KEY,
+    home_team_id INT NOT NULL,
+    away_team_id INT NOT NULL,
+    match_date DATE,
+    match_hour TIME,
+    home_score SMALLINT,
+    away_score SMALLINT,
+    league VARCHAR(64),
+    match_week VARCHAR(16),
+    match_city VARCHAR(64),
+    match_saloon VARCHAR(128),
+    CONSTRAINT chk_distinct_teams CHECK (home_team_id <> away_team_id)
+);
+
+CREATE TABLE IF NOT EXISTS standings (
+    league TEXT NOT NULL,
+    team_rank INTEGER,
+    team_name TEXT NOT NULL,
+    team_id INT,
+    team_matches_played INTEGER,
+    team_wins INTEGER,
+    team_losses INTEGER,
+    team_points_scored INTEGER,
+    team_points_conceded INTEGER,
+    team_home_points INTEGER,
+    team_home_goal_difference INTEGER,
+    team_total_goal_difference INTEGER,
+    team_total_points INTEGER,
+    PRIMARY KEY (league, team_name)
+);
+
+CREATE TABLE IF NOT EXISTS Players (
+    team_id INT,
+    team_url VARCHAR(255),
+    league VARCHAR(100),
+    player_name VARCHAR(200),
+    player_id INT PRIMARY KEY,
+    player_birthdate VARCHAR(50),
+    player_height VARCHAR(20)
+);
+
+CREATE TABLE IF NOT EXISTS technic_roster (
+    staff_id SERIAL PRIMARY KEY,
+    team_id INT,
+    team_url TEXT,
+    league VARCHAR(64),
+    technic_member_name VARCHAR(100) NOT NULL,
+    technic_member_role VARCHAR(100)
+);
+
+-- Foreign keys (skipped when the old init_db already created them)
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'fk_matches_home') THEN
+        ALTER TABLE Matches ADD CONSTRAINT fk_matches_home
+            FOREIGN KEY (home_team_id) REFERENCES Teams(team_id);
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'fk_matches_away') THEN
+        ALTER TABLE Matches ADD CONSTRAINT fk_matches_away
+            FOREIGN KEY (away_team_id) REFERENCES Teams(team_id);
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'technic_roster_team_id_fkey') THEN
+        ALTER TABLE technic_roster ADD CONSTRAINT technic_roster_team_id_fkey
+            FOREIGN KEY (team_id) REFERENCES Teams(team_id) ON DELETE SET NULL;
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'fk_teams_staff') THEN
+        ALTER TABLE Teams ADD CONSTRAINT fk_teams_staff
+            FOREIGN KEY (staff_id) REFERENCES technic_roster(staff_id) ON DELETE SET NULL;
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'fk_standings_team') THEN
+        ALTER TABLE standings ADD CONSTRAINT fk_standings_team
+            FOREIGN KEY (team_id) REFERENCES Teams(team_id) ON DELETE CASCADE;
+    END IF;
+END $$;
+
+-- Performance indexes
+CREATE INDEX IF NOT EXISTS idx_matches_home_team ON Matches(home_team_id);
+CREATE INDEX IF NOT EXISTS idx_matches_away_team ON Matches(away_team_id);
+CREATE INDEX IF NOT EXISTS idx_matches_league ON Matches(league);
+CREATE INDEX IF NOT EXISTS idx_matches_date ON Matches(match_date);
+CREATE INDEX IF NOT EXISTS idx_matches_city ON Matches(match_city);
+CREATE INDEX IF NOT EXISTS idx_matches_week ON Matches(match_week);
+CREATE INDEX IF NOT EXISTS idx_matches_dedup ON Matches(match_date, home_team_id, away_team_id);
+CREATE INDEX IF NOT EXISTS idx_matches_scores ON Matches(home_score, away_score) WHERE home_score IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_teams_name ON Teams(team_name);
+CREATE INDEX IF NOT EXISTS idx_teams_league ON Teams(league);
+CREATE INDEX IF NOT EXISTS idx_technic_team ON technic_roster(team_id);
@@ -0,0 +1,3 @@
+-- 0002: player profile fields edited from the players page
+ALTER TABLE Players ADD COLUMN IF NOT EXISTS player_foot VARCHAR(10);
+ALTER TABLE Players ADD COLUMN IF NOT EXISTS player_bio TEXT;
@@ -0,0 +1,20 @@
+-- 0003: bookkeeping tables used by init_db
+
+-- CSV/schema manifest: a boot with unchanged CSVs skips the reload
+CREATE TABLE IF NOT EXISTS init_manifest (
+    name TEXT PRIMARY KEY,          -- 'schema' or a TableSpec name
+    content_hash TEXT NOT NULL,     -- schema fingerprint or CSV sha256
+    row_count INT,
+    loaded_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-- Secondary indexes / FKs dropped for a bulk load and not rebuilt yet.
+-- Definitions are read from the catalog before the drop, so a reload that dies
+-- halfway still knows what to recreate on the next run.
+CREATE TABLE IF NOT EXISTS init_deferred (
+    name TEXT PRIMARY KEY,
+    kind TEXT NOT NULL CHECK (kind IN ('index', 'foreign_key')),
+    table_name TEXT NOT NULL,
+    ref_table TEXT,                 -- referenced table (foreign keys)
+    definition TEXT NOT NULL        -- CREATE INDEX statement / FOREIGN KEY clause
+);
@@ -0,0 +1,13 @@
+-- 0004: canonical match storage
+-- Matches keeps each game once; the other source rows of the same game (the copy
+-- listed with home/away swapped) are mapped to the stored row here.
+CREATE TABLE IF NOT EXISTS match_aliases (
+    source_match_id VARCHAR(16) PRIMARY KEY,
+    match_id VARCHAR(16) NOT NULL,
+    mirrored BOOLEAN NOT NULL       -- home/away swapped relative to the stored row
+);
+
+ALTER TABLE match_aliases ADD CONSTRAINT fk_match_aliases_match
+    FOREIGN KEY (match_id) REFERENCES Matches(match_id) ON DELETE CASCADE;
+
+CREATE INDEX IF NOT EXISTS idx_match_aliases_match ON match_aliases(match_id);
@@ -0,0 +1,37 @@
+-- 0005: typed birth date / height for Players
+-- The source values are text ("15.07.2003 ", " 198 cm", "unknown"). The typed
+-- columns are generated from them, so CSV loads and the add/update routes fill
+-- them without any extra code, and sorts/filters/statistics can use an index
+-- instead of parsing every row.
+
+CREATE OR REPLACE FUNCTION parse_birth_date(raw TEXT) RETURNS DATE
+LANGUAGE plpgsql IMMUTABLE AS $$
+DECLARE
+    parts TEXT[] := regexp_match(btrim(raw), '^(\d{1,2})\.(\d{1,2})\.(\d{4})$');
+BEGIN
+    IF parts IS NULL THEN
+        RETURN NULL;
+    END IF;
+    RETURN make_date(parts[3]::int, parts[2]::int, parts[1]::int);
+EXCEPTION WHEN datetime_field_overflow THEN
+    RETURN NULL;  -- e.g. 31.02.2001
+END $$;
+
+-- Same digits-only rule the queries used (CAST(REGEXP_REPLACE(h, '[^0-9]', ''))),
+-- NULL when there are no digits or the value can't be a height
+CREATE OR REPLACE FUNCTION parse_height_cm(raw TEXT) RETURNS SMALLINT
+LANGUAGE sql IMMUTABLE AS $$
+    SELECT CASE WHEN d ~ '^[0-9]{1,4}$' THEN d::smallint END
+    FROM (SELECT regexp_replace(raw, '[^0-9]', '', 'g') AS d) digits
+$$;
+
+ALTER TABLE Players
+    ADD COLUMN IF NOT EXISTS birth_date DATE GENERATED ALWAYS AS (parse_birth_date(player_birthdate)) STORED,
+    ADD COLUMN IF NOT EXISTS height_cm SMALLINT GENERATED ALWAYS AS (parse_height_cm(player_height)) STORED;
+
+-- age_desc sorts ASC NULLS LAST, age_asc DESC NULLS LAST: one index per direction
+CREATE INDEX IF NOT EXISTS idx_players_birth_date ON Players(birth_date);
+CREATE INDEX IF NOT EXISTS idx_players_birth_date_desc ON Players(birth_date DESC NULLS LAST);
+CREATE INDEX IF NOT EXISTS idx_players_height_cm ON Players(height_cm DESC NULLS LAST);
+-- per-team average height (players stats) as an index-only scan
+CREATE INDEX IF NOT EXISTS idx_players_team_height ON Players(team_id, height_cm);
@@ -0,0 +1,62 @@
+-- 0006: materialized match set for the /matches analytics panels
+-- The scored games of Matches (which holds each game once, see 0004), narrowed to
+-- the columns the panels read and indexed by league and by team. A materialized
+-- view can only be refreshed as a whole, so this is a table kept in step per league
+-- by refresh_unique_matches(): after add/update/delete_match (app.py) and delta
+-- ingests, full rebuild in init_db.
+CREATE TABLE IF NOT EXISTS unique_matches (
+    match_id VARCHAR(16) PRIMARY KEY,
+    league VARCHAR(64) NOT NULL,
+    match_date DATE,
+    home_team_id INT NOT NULL,
+    away_team_id INT NOT NULL,
+    home_score SMALLINT NOT NULL,
+    away_score SMALLINT
+);
+
+CREATE INDEX IF NOT EXISTS idx_unique_matches_league ON unique_matches(league, match_date DESC);
+CREATE INDEX IF NOT EXISTS idx_unique_matches_home ON unique_matches(home_team_id, league);
+CREATE INDEX IF NOT EXISTS idx_unique_matches_away ON unique_matches(away_team_id, league);
+
+-- Bir ligin satırlarını Matches ile eşitler, değişen satır sayısını döndürür.
+-- REFRESH MATERIALIZED VIEW CONCURRENTLY gibi fark uygulanır: değişmeyen satırlara
+-- dokunulmaz, okuyanlar commit'e kadar eski satırları görür. Aynı lig için iki
+-- yenileme advisory lock ile sıraya girer; farklı ligler birbirini beklemez.
+CREATE OR REPLACE FUNCTION refresh_unique_matches(p_league TEXT) RETURNS INT
+LANGUAGE plpgsql AS $$
+DECLARE
+    removed INT;
+    changed INT;
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtext('unique_matches:' || p_league));
+
+    DELETE FROM unique_matches u
+    WHERE u.league = p_league
+      AND NOT EXISTS (SELECT 1 FROM Matches m
+                      WHERE m.match_id = u.match_id AND m.league = p_league AND m.home_score IS NOT NULL);
+    GET DIAGNOSTICS removed = ROW_COUNT;
+
+    INSERT INTO unique_matches (match_id, league, match_date, home_team_id, away_team_id, home_score, away_score)
+    SELECT match_id, league, match_date, home_team_id, away_team_id, home_score, away_score
+    FROM Matches
+    WHERE league = p_league AND home_score IS NOT NULL
+    ON CONFLICT (match_id) DO UPDATE
+       SET (league, match_date, home_team_id, away_team_id, home_score, away_score) =
+           ROW(EXCLUDED.league, EXCLUDED.match_date, EXCLUDED.home_team_id, EXCLUDED.away_team_id,
+               EXCLUDED.home_score, EXCLUDED.away_score)
+     WHERE ROW(unique_matches.league, unique_matches.match_date, unique_matches.home_team_id,
+               unique_matches.away_team_id, unique_matches.home_score, unique_matches.away_score)
+           IS DISTINCT FROM
+           ROW(EXCLUDED.league, EXCLUDED.match_date, EXCLUDED.home_team_id, EXCLUDED.away_team_id,
+               EXCLUDED.home_score, EXCLUDED.away_score);
+    GET DIAGNOSTICS changed = ROW_COUNT;
+
+    RETURN removed + changed;
+END;
+$$;
+
+INSERT INTO unique_matches (match_id, league, match_date, home_team_id, away_team_id, home_score, away_score)
+SELECT match_id, league, match_date, home_team_id, away_team_id, home_score, away_score
+FROM Matches
+WHERE league IS NOT NULL AND home_score IS NOT NULL
+ON CONFLICT (match_id) DO NOTHING;
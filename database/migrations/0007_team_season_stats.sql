@@ -0,0 +1,163 @@
+-- 0007: per team and season aggregates for the /matches panels
+-- One row per (league, team_id) with the scored games of Matches: totals and
+-- home/away splits. Statement-level triggers on Matches apply only the change
+-- (net delta of the inserted/updated/deleted rows), so the team performance,
+-- home/away and participation panels read ~16 rows by primary key however many
+-- matches are stored. team_season_stats_expected is the same aggregate computed
+-- from Matches: used for the rebuild and by the consistency check (init_db.py).
+CREATE TABLE IF NOT EXISTS team_season_stats (
+    league VARCHAR(64) NOT NULL,
+    team_id INT NOT NULL,
+    games INT NOT NULL DEFAULT 0,
+    wins INT NOT NULL DEFAULT 0,
+    losses INT NOT NULL DEFAULT 0,
+    points_for INT NOT NULL DEFAULT 0,
+    points_against INT NOT NULL DEFAULT 0,
+    home_games INT NOT NULL DEFAULT 0,
+    home_wins INT NOT NULL DEFAULT 0,
+    home_points_for INT NOT NULL DEFAULT 0,
+    home_points_against INT NOT NULL DEFAULT 0,
+    away_games INT NOT NULL DEFAULT 0,
+    away_wins INT NOT NULL DEFAULT 0,
+    away_points_for INT NOT NULL DEFAULT 0,
+    away_points_against INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (league, team_id)
+);
+
+CREATE OR REPLACE VIEW team_season_stats_expected AS
+WITH sides AS (
+    SELECT league, home_team_id AS team_id, TRUE AS home, home_score AS pf, away_score AS pa
+    FROM Matches
+    WHERE league IS NOT NULL AND home_score IS NOT NULL AND away_score IS NOT NULL
+    UNION ALL
+    SELECT league, away_team_id, FALSE, away_score, home_score
+    FROM Matches
+    WHERE league IS NOT NULL AND home_score IS NOT NULL AND away_score IS NOT NULL
+)
+SELECT league, team_id,
+       count(*)::int AS games,
+       count(*) FILTER (WHERE pf > pa)::int AS wins,
+       count(*) FILTER (WHERE pf < pa)::int AS losses,
+       sum(pf)::int AS points_for,
+       sum(pa)::int AS points_against,
+       count(*) FILTER (WHERE home)::int AS home_games,
+       count(*) FILTER (WHERE home AND pf > pa)::int AS home_wins,
+       COALESCE(sum(pf) FILTER (WHERE home), 0)::int AS home_points_for,
+       COALESCE(sum(pa) FILTER (WHERE home), 0)::int AS home_points_against,
+       count(*) FILTER (WHERE NOT home)::int AS away_games,
+       count(*) FILTER (WHERE NOT home AND pf > pa)::int AS away_wins,
+       COALESCE(sum(pf) FILTER (WHERE NOT home), 0)::int AS away_points_for,
+       COALESCE(sum(pa) FILTER (WHERE NOT home), 0)::int AS away_points_against
+FROM sides
+GROUP BY league, team_id;
+
+-- Transition table'lar: satır başına değil, ifade başına bir kez çalışır (CSV yüklemesi
+-- tek INSERT ... SELECT). Eski satırlar -1, yeni satırlar +1 ile sayılır; skor/lig/takım
+-- değişmeyen UPDATE'ler net sıfır olur ve dokunulmaz.
+CREATE OR REPLACE FUNCTION team_season_stats_apply() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    changed TEXT := CASE TG_OP
+        WHEN 'INSERT' THEN 'SELECT 1 AS sign, * FROM new_rows'
+        WHEN 'DELETE' THEN 'SELECT -1 AS sign, * FROM old_rows'
+        ELSE 'SELECT 1 AS sign, * FROM new_rows UNION ALL SELECT -1, * FROM old_rows'
+    END;
+    emptied_leagues TEXT[];
+    emptied_teams INT[];
+BEGIN
+    EXECUTE format($sql$
+        WITH changed AS (%s),
+        sides AS (
+            SELECT sign, league, home_team_id AS team_id, TRUE AS home, home_score AS pf, away_score AS pa
+            FROM changed
+            WHERE league IS NOT NULL AND home_score IS NOT NULL AND away_score IS NOT NULL
+            UNION ALL
+            SELECT sign, league, away_team_id, FALSE, away_score, home_score
+            FROM changed
+            WHERE league IS NOT NULL AND home_score IS NOT NULL AND away_score IS NOT NULL
+        ),
+        delta AS (
+            SELECT league, team_id,
+                   sum(sign) AS games,
+                   sum(CASE WHEN pf > pa THEN sign ELSE 0 END) AS wins,
+                   sum(CASE WHEN pf < pa THEN sign ELSE 0 END) AS losses,
+                   sum(sign * pf) AS points_for,
+                   sum(sign * pa) AS points_against,
+                   sum(CASE WHEN home THEN sign ELSE 0 END) AS home_games,
+                   sum(CASE WHEN home AND pf > pa THEN sign ELSE 0 END) AS home_wins,
+                   sum(CASE WHEN home THEN sign * pf ELSE 0 END) AS home_points_for,
+                   sum(CASE WHEN home THEN sign * pa ELSE 0 END) AS home_points_against,
+                   sum(CASE WHEN NOT home THEN sign ELSE 0 END) AS away_games,
+                   sum(CASE WHEN NOT home AND pf > pa THEN sign ELSE 0 END) AS away_wins,
+                   sum(CASE WHEN NOT home THEN sign * pf ELSE 0 END) AS away_points_for,
+                   sum(CASE WHEN NOT home THEN sign * pa ELSE 0 END) AS away_points_against
+            FROM sides
+            GROUP BY league, team_id
+        ),
+        applied AS (
+            INSERT INTO team_season_stats AS s
+            SELECT * FROM delta d
+            WHERE (d.games, d.wins, d.losses, d.points_for, d.points_against,
+                   d.home_games, d.home_wins, d.home_points_for, d.home_points_against,
+                   d.away_games, d.away_wins, d.away_points_for, d.away_points_against)
+                  IS DISTINCT FROM (0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0)
+            ON CONFLICT (league, team_id) DO UPDATE SET
+                games = s.games + EXCLUDED.games,
+                wins = s.wins + EXCLUDED.wins,
+                losses = s.losses + EXCLUDED.losses,
+                points_for = s.points_for + EXCLUDED.points_for,
+                points_against = s.points_against + EXCLUDED.points_against,
+                home_games = s.home_games + EXCLUDED.home_games,
+                home_wins = s.home_wins + EXCLUDED.home_wins,
+                home_points_for = s.home_points_for + EXCLUDED.home_points_for,
+                home_points_against = s.home_points_against + EXCLUDED.home_points_against,
+                away_games = s.away_games + EXCLUDED.away_games,
+                away_wins = s.away_wins + EXCLUDED.away_wins,
+                away_points_for = s.away_points_for + EXCLUDED.away_points_for,
+                away_points_against = s.away_points_against + EXCLUDED.away_points_against
+            RETURNING s.league, s.team_id, s.games
+        )
+        SELECT array_agg(league), array_agg(team_id) FROM applied WHERE games = 0
+    $sql$, changed) INTO emptied_leagues, emptied_teams;
+
+    -- Skorlu maçı kalmayan takımın satırı silinir (yeniden kurulmuş tabloyla aynı kalsın)
+    IF emptied_teams IS NOT NULL THEN
+        DELETE FROM team_season_stats s
+        USING unnest(emptied_leagues, emptied_teams) AS e(league, team_id)
+        WHERE s.league = e.league AND s.team_id = e.team_id AND s.games = 0;
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION team_season_stats_truncate() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    TRUNCATE team_season_stats;
+    RETURN NULL;
+END;
+$$;
+
+-- Transition table'lı trigger tek olaya bağlanabilir: her olay için ayrı trigger
+DROP TRIGGER IF EXISTS matches_team_season_stats_insert ON Matches;
+CREATE TRIGGER matches_team_season_stats_insert
+    AFTER INSERT ON Matches REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION team_season_stats_apply();
+
+DROP TRIGGER IF EXISTS matches_team_season_stats_update ON Matches;
+CREATE TRIGGER matches_team_season_stats_update
+    AFTER UPDATE ON Matches REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION team_season_stats_apply();
+
+DROP TRIGGER IF EXISTS matches_team_season_stats_delete ON Matches;
+CREATE TRIGGER matches_team_season_stats_delete
+    AFTER DELETE ON Matches REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION team_season_stats_apply();
+
+DROP TRIGGER IF EXISTS matches_team_season_stats_truncate ON Matches;
+CREATE TRIGGER matches_team_season_stats_truncate
+    AFTER TRUNCATE ON Matches
+    FOR EACH STATEMENT EXECUTE FUNCTION team_season_stats_truncate();
+
+TRUNCATE team_season_stats;
+INSERT INTO team_season_stats SELECT * FROM team_season_stats_expected;
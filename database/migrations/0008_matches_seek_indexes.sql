@@ -0,0 +1,30 @@
+-- 0008: keyset pagination indexes for /matches
+-- The list is ordered by (sort column, match_hour, match_id), all in the requested
+-- direction. NULLs are part of the order, so each nullable column is keyed as
+-- (col IS NULL, COALESCE(col, <constant>)): the pair sorts like the column with
+-- NULLS LAST (ASC) / NULLS FIRST (DESC) and can be compared as a row value.
+-- The expressions must stay identical to MATCH_SEEK_KEYS in app.py; one index per
+-- entry of MATCH_SORT_COLUMNS, scanned forward or backward depending on the order.
+CREATE INDEX IF NOT EXISTS idx_matches_seek_date ON Matches (
+    (match_date IS NULL), COALESCE(match_date, DATE '1970-01-01'),
+    (match_hour IS NULL), COALESCE(match_hour, TIME '00:00'), match_id);
+
+CREATE INDEX IF NOT EXISTS idx_matches_seek_week ON Matches (
+    (match_week IS NULL), COALESCE(match_week, ''),
+    (match_hour IS NULL), COALESCE(match_hour, TIME '00:00'), match_id);
+
+CREATE INDEX IF NOT EXISTS idx_matches_seek_league ON Matches (
+    (league IS NULL), COALESCE(league, ''),
+    (match_hour IS NULL), COALESCE(match_hour, TIME '00:00'), match_id);
+
+CREATE INDEX IF NOT EXISTS idx_matches_seek_city ON Matches (
+    (match_city IS NULL), COALESCE(match_city, ''),
+    (match_hour IS NULL), COALESCE(match_hour, TIME '00:00'), match_id);
+
+CREATE INDEX IF NOT EXISTS idx_matches_seek_home_score ON Matches (
+    (home_score IS NULL), COALESCE(home_score, 0),
+    (match_hour IS NULL), COALESCE(match_hour, TIME '00:00'), match_id);
+
+CREATE INDEX IF NOT EXISTS idx_matches_seek_away_score ON Matches (
+    (away_score IS NULL), COALESCE(away_score, 0),
+    (match_hour IS NULL), COALESCE(match_hour, TIME '00:00'), match_id);
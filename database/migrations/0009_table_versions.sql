@@ -0,0 +1,30 @@
+-- 0009: change counters for cached list counts
+-- Every write statement on a listed table bumps its version (statement-level, so a
+-- bulk load is one bump). The app caches exact COUNT(*) results per filter set
+-- together with the versions they were computed at, and reuses them until one of
+-- the tables changes - also after writes from other processes (ingest, other workers).
+CREATE TABLE IF NOT EXISTS table_versions (
+    table_name TEXT PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0
+);
+
+CREATE OR REPLACE FUNCTION bump_table_version() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO table_versions (table_name, version) VALUES (TG_TABLE_NAME, 1)
+    ON CONFLICT (table_name) DO UPDATE SET version = table_versions.version + 1;
+    RETURN NULL;
+END;
+$$;
+
+DO $$
+DECLARE
+    t TEXT;
+BEGIN
+    FOREACH t IN ARRAY ARRAY['matches', 'teams', 'players', 'technic_roster'] LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', t || '_bump_version', t);
+        EXECUTE format('CREATE TRIGGER %I AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON %I '
+                       'FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version()', t || '_bump_version', t);
+        INSERT INTO table_versions (table_name) VALUES (t) ON CONFLICT DO NOTHING;
+    END LOOP;
+END $$;
@@ -0,0 +1,21 @@
+-- 0010: per-statement result sets for db_api.query_many()
+-- query_many() sends its statements as one SELECT json_build_array(db_api_batch_part(...), ...).
+-- Each call runs its statement in its own subtransaction (EXCEPTION block): a failing
+-- statement returns {"error", "sqlstate"} and the others still return their rows, in the
+-- same round trip. Rows are numbered in the statement's output order and aggregated by
+-- that number, so the statement's ORDER BY is kept. STABLE: read-only, and all parts
+-- see the snapshot of the calling SELECT.
+CREATE OR REPLACE FUNCTION db_api_batch_part(p_sql TEXT) RETURNS json
+LANGUAGE plpgsql STABLE AS $$
+DECLARE
+    result json;
+BEGIN
+    EXECUTE format(
+        'SELECT COALESCE(json_agg(q ORDER BY q.db_api_rn), ''[]'') '
+        'FROM (SELECT s.*, row_number() OVER () AS db_api_rn FROM (%s) s) q', p_sql)
+    INTO result;
+    RETURN json_build_object('rows', result);
+EXCEPTION WHEN OTHERS THEN
+    RETURN json_build_object('error', SQLERRM, 'sqlstate', SQLSTATE);
+END;
+$$;
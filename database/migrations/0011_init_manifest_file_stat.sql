@@ -0,0 +1,5 @@
+-- 0011: file size / mtime next to each CSV hash in init_manifest
+-- init_db compares (size, mtime_ns) first and only re-hashes the CSVs whose stat
+-- changed, so an unchanged boot does not read every file (100x-1000x datasets).
+ALTER TABLE init_manifest ADD COLUMN IF NOT EXISTS file_size BIGINT;
+ALTER TABLE init_manifest ADD COLUMN IF NOT EXISTS file_mtime_ns BIGINT;
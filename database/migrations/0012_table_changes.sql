@@ -0,0 +1,48 @@
+-- 0012: insert-only change log for the count cache (replaces table_versions, 0009)
+-- 0009 bumped one table_versions row per table: every write statement on Matches
+-- (Teams, ...) took that row's lock until commit, so concurrent writers to the same
+-- table were serialized. Now each write statement inserts a row instead; inserts do
+-- not conflict. A table's version is sum(changes) of its rows visible to the reader:
+-- it only grows when a write commits (never before), so a count computed after
+-- reading the version can not be cached under a version it does not reflect.
+-- Rows are folded into one per table now and then (same sum, so versions hold).
+CREATE TABLE IF NOT EXISTS table_changes (
+    id BIGSERIAL PRIMARY KEY,
+    table_name TEXT NOT NULL,
+    changes BIGINT NOT NULL DEFAULT 1
+);
+
+CREATE INDEX IF NOT EXISTS idx_table_changes_table ON table_changes(table_name);
+
+-- Versions so far carry over (the cache compares them for equality only)
+INSERT INTO table_changes (table_name, changes)
+SELECT table_name, version FROM table_versions WHERE version > 0;
+
+-- Same trigger function as 0009 (the triggers on matches, teams, players and
+-- technic_roster stay as they are), new body.
+CREATE OR REPLACE FUNCTION bump_table_version() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    new_id BIGINT;
+BEGIN
+    INSERT INTO table_changes (table_name) VALUES (TG_TABLE_NAME) RETURNING id INTO new_id;
+
+    -- Ara sıra katlama: bu tablonun görünen satırları tek satırda toplanır. Aynı anda
+    -- tek katlama (try lock: yazan beklemez); REPEATABLE READ yazanlar katlamaz
+    -- (başkasının katladığı satırı silmeye çalışıp serialization hatası almasınlar).
+    IF new_id % 64 = 0
+       AND current_setting('transaction_isolation') = 'read committed'
+       AND pg_try_advisory_xact_lock(hashtext('table_changes')) THEN
+        WITH folded AS (
+            DELETE FROM table_changes
+            WHERE table_name = TG_TABLE_NAME AND id < new_id
+            RETURNING changes
+        )
+        INSERT INTO table_changes (table_name, changes)
+        SELECT TG_TABLE_NAME, sum(changes) FROM folded HAVING count(*) > 0;
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TABLE IF EXISTS table_versions;
@@ -0,0 +1,25 @@
+-- 0013: explicit row order for db_api.query_many() batch parts (replaces 0010's function)
+-- 0010 numbered the rows with row_number() OVER () over the statement as a subquery.
+-- Postgres does not promise that an outer window / aggregate sees a subquery's rows
+-- in its ORDER BY order, so that order was not guaranteed. Now the caller passes the
+-- ordering over the statement's output columns (p_order, e.g. 'team_name, league DESC')
+-- and rows are numbered with row_number() OVER (ORDER BY p_order). Statements with a
+-- top-level ORDER BY and no p_order are not batched (db.py runs them on their own).
+-- Old one-argument signature is dropped: with both, a one-argument call is ambiguous.
+DROP FUNCTION IF EXISTS db_api_batch_part(TEXT);
+
+CREATE OR REPLACE FUNCTION db_api_batch_part(p_sql TEXT, p_order TEXT) RETURNS json
+LANGUAGE plpgsql STABLE AS $$
+DECLARE
+    result json;
+BEGIN
+    EXECUTE format(
+        'SELECT COALESCE(json_agg(q ORDER BY q.db_api_rn), ''[]'') '
+        'FROM (SELECT s.*, row_number() OVER (%s) AS db_api_rn FROM (%s) s) q',
+        CASE WHEN p_order IS NULL THEN '' ELSE 'ORDER BY ' || p_order END, p_sql)
+    INTO result;
+    RETURN json_build_object('rows', result);
+EXCEPTION WHEN OTHERS THEN
+    RETURN json_build_object('error', SQLERRM, 'sqlstate', SQLSTATE);
+END;
+$$;
@@ -1,152 +1,341 @@
 import os
 import csv
 import re
-from dataclasses import dataclass
-from typing import List, Optional, Callable, Tuple
+import time
+import hashlib
+import argparse
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Callable, Tuple
 
-from psycopg2.extras import execute_values
 import database.db as db_api
+import migrate
+
+
+@dataclass
+class Canonical:
+    key: List[str]                 # SQL expressions identifying copies of the same real-world row
+    order: str                     # ORDER BY choosing the copy that is stored
+    alias_table: str               # (source_<pk>, <pk>, mirrored) rows for the other copies
+    mirrored: str = "FALSE"        # SQL over a (copy) and c (stored row): is the copy flipped?
 
 
 @dataclass
 class TableSpec:
     name: str                      # table name in DB
-    ddl: str                       # CREATE TABLE ... SQL
     columns: List[str]             # column names in CSV and INSERT
     csv_path: Optional[str] = None # path to CSV file (optional)
     truncate: bool = True          # truncate before insert
+    column_kinds: Dict[str, str] = field(default_factory=dict)
+    # column_kinds: per-column override of the conversion ("int", "text", "strip");
+    # by default columns in TEXT_COLUMNS are text and every other column is an integer
     converter: Optional[Callable[[dict], Tuple]] = None
-    # converter: function(row_dict) -> tuple(values) if custom conversion needed
+    # converter: function(row_dict) -> tuple(values), only for conversions the plan can't express
+    references: List[Tuple[str, str, str]] = field(default_factory=list)
+    # references: (column, ref_table, ref_column) - rows whose key is missing in ref_table are filtered
+    checks: List[str] = field(default_factory=list)
+    # checks: SQL conditions a row must satisfy (CHECK constraints of the target table)
+    primary_key: List[str] = field(default_factory=list)
+    # primary_key: key columns used by delta ingest (empty = table only supports full reload)
+    depends_on: List[str] = field(default_factory=list)
+    # depends_on: tables that must be loaded first (besides the ones in references)
+    canonical: Optional[Canonical] = None
+    # canonical: store one row per canonical key, map the other copies in alias_table
+
+    def dependencies(self) -> List[str]:
+        deps = list(self.depends_on)
+        for _, ref_table, _ in self.references:
+            if ref_table != self.name and ref_table not in deps:
+                deps.append(ref_table)
+        return deps
+
+
+# -------------------------------------------------------------------
+# CSV -> COPY conversion plan
+# -------------------------------------------------------------------
+# Her TableSpec için kolon başına dönüştürücü bir kez seçilir; hücreler doğrudan
+# COPY text formatına çevrilir (None -> \N), ara tuple/int nesnesi üretilmez.
+TEXT_COLUMNS = frozenset({
+    "league",
+    "team_name",
+    "match_date",
+    "match_hour",
+    "match_id",
+    "match_city",
+    "match_saloon",
+    "team_url",
+    "player_name",
+    "player_birthdate",
+    "player_height",
+    "technic_member_name",
+    "technic_member_role",
+})
+
+COPY_NULL = "\\N"
+CHUNK_ROWS = int(os.environ.get("INIT_DB_CHUNK_ROWS", 5000))
+
+_RE_FIRST_INT = re.compile(r'-?\d+')
 
 
 def _extract_first_int(s: str) -> Optional[int]:
     if s is None:
         return None
     clean_s = str(s).replace('.', '').replace(',', '')
-    m = re.search(r'-?\d+', clean_s)
+    m = _RE_FIRST_INT.search(clean_s)
     return int(m.group()) if m else None
 
 
-def _default_row_converter(row: dict, columns: List[str]):
-    vals = []
-    for col in columns:
-        v = row.get(col)
-        if v is None or v == "":
-            vals.append(None)
-        else:
-            # numeric normalization: extract first integer if present
-            if col not in (
-                "league",
-                "team_name",
-                "match_date",
-                "match_hour",
-                "match_id",
-                "match_city",
-                "match_saloon",
-                "team_url",
-                "player_name",
-                "player_birthdate",
-                "player_height",
-                "technic_member_name",
-                "technic_member_role",
-            ):
-                n = _extract_first_int(v)
-                if n is not None:
-                    vals.append(n)
-                    continue
-                try:
-                    vals.append(int(float(v)))
-                    continue
-                except Exception:
-                    vals.append(None)
-                    continue
-            vals.append(v)
-    return tuple(vals)
-
-def teams_row_converter(row: dict) -> tuple:
-    # 1. ID, Yıl (Sayı)
-    t_id = _extract_first_int(row.get('team_id'))
-    year = _extract_first_int(row.get('team_year'))
-    
-    # 2. String Alanlar (Şehir, İsim, Lig vb.)
-    url = row.get('team_url')
-    name = row.get('team_name')
-    league = row.get('league')
-    
-    # Şehir ve Salon isimlerini temizle (None gelmesin diye)
-    city = row.get('team_city', '').strip() if row.get('team_city') else None
-    s_name = row.get('saloon_name', '').strip() if row.get('saloon_name') else None
-    addr = row.get('saloon_address', '').strip() if row.get('saloon_address') else None
-    
-    # 3. Kapasite (Özel Temizlik: "2500 Kişi" -> 2500)
-    raw_cap = row.get('saloon_capacity', '')
-    cap = _extract_first_int(raw_cap)
-
-    # Sıralama columns listesiyle aynı olmalı
-    return (t_id, url, name, league, city, year, s_name, cap, addr)
+def _escape_copy(s: str) -> str:
+    # COPY text format: backslash/tab/newline escaped
+    if "\\" in s or "\t" in s or "\n" in s or "\r" in s:
+        s = s.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+    return s
 
 
-def load_csv_using_conn(conn, spec: TableSpec):
-    if not spec.csv_path or not os.path.exists(spec.csv_path):
-        print(f"[init_db] CSV not found for {spec.name}: {spec.csv_path} — skipping CSV load")
-        return 0
+def _copy_text(value) -> str:
+    return COPY_NULL if value is None else _escape_copy(str(value))
 
-    rows = []
-    with open(spec.csv_path, mode='r', encoding='utf-8-sig') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            if spec.converter:
-                vals = spec.converter(row)
+
+def _int_cell(v: str) -> str:
+    if not v:
+        return COPY_NULL
+    if v.isascii() and v.isdigit():
+        return str(int(v))  # hızlı yol: "81", "2010" (baştaki sıfırlar atılır: "07" -> "7")
+    # "2500 Kişi", "1.234", "NS 01" -> ilk tam sayı; yoksa "1e3" gibi değerler için float
+    n = _extract_first_int(v)
+    if n is None:
+        try:
+            n = int(float(v))
+        except (ValueError, OverflowError):
+            return COPY_NULL
+    return str(n)
+
+
+def _text_cell(v: str) -> str:
+    return _escape_copy(v) if v else COPY_NULL
+
+
+def _strip_cell(v: str) -> str:
+    # boş olmayan değer kırpılır ("  " -> ""), boş/eksik değer NULL olur
+    return _escape_copy(v.strip()) if v else COPY_NULL
+
+
+def _null_cell(v: str) -> str:
+    return COPY_NULL
+
+
+CELL_CONVERTERS = {"int": _int_cell, "text": _text_cell, "strip": _strip_cell}
+
+
+class ConversionPlan:
+    """
+    Typed per-column converters for one TableSpec, bound to the CSV header once.
+    lines()/chunks() turn csv.reader rows into COPY text without building row tuples.
+    """
+
+    def __init__(self, spec: TableSpec, header: List[str]):
+        index = {name: i for i, name in enumerate(header)}
+        self.cells = []
+        for col in spec.columns:
+            kind = spec.column_kinds.get(col) or ("text" if col in TEXT_COLUMNS else "int")
+            if col in index:
+                self.cells.append((index[col], CELL_CONVERTERS[kind]))
             else:
-                vals = _default_row_converter(row, spec.columns)
-            rows.append(vals)
+                self.cells.append((0, _null_cell))  # CSV'de olmayan kolon: hep NULL
+        self.width = len(header)
 
-    if not rows:
-        return 0
+    def line(self, row: List[str]) -> str:
+        if len(row) < self.width:
+            row = row + [""] * (self.width - len(row))
+        return "\t".join([fn(row[i]) for i, fn in self.cells])
+
+    def chunks(self, rows, chunk_rows: int = None):
+        """Yields COPY text blocks of at most chunk_rows lines; memory stays bounded."""
+        chunk_rows = chunk_rows or CHUNK_ROWS
+        line = self.line
+        batch = []
+        for row in rows:
+            batch.append(line(row))
+            if len(batch) >= chunk_rows:
+                yield "\n".join(batch) + "\n"
+                batch = []
+        if batch:
+            yield "\n".join(batch) + "\n"
+
+
+def _converter_chunks(spec: TableSpec, rows, chunk_rows: int = None):
+    # TableSpec.converter ile özel dönüşüm (plan dışı): satır tuple'ları COPY text'e çevrilir
+    chunk_rows = chunk_rows or CHUNK_ROWS
+    batch = []
+    for row in rows:
+        batch.append("\t".join(map(_copy_text, spec.converter(row))))
+        if len(batch) >= chunk_rows:
+            yield "\n".join(batch) + "\n"
+            batch = []
+    if batch:
+        yield "\n".join(batch) + "\n"
 
+
+def iter_copy_chunks(spec: TableSpec, f, chunk_rows: int = None):
+    """Streams an open CSV file as COPY text chunks for spec.columns."""
+    if spec.converter:
+        yield from _converter_chunks(spec, csv.DictReader(f), chunk_rows)
+        return
+    reader = csv.reader(f)
+    header = next(reader, None)
+    if header is None:
+        return
+    yield from ConversionPlan(spec, header).chunks(reader, chunk_rows)
+
+
+class CopyStream:
+    """
+    File-like object for cursor.copy_expert(). psycopg2 sends whatever read()
+    returns as one CopyData message, so each call hands over a whole chunk.
+    """
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+
+    def read(self, size=-1):
+        if size is not None and size >= 0:
+            return next(self._chunks, "")
+        return "".join(self._chunks)
+
+
+def _not_null_columns(cur, spec: TableSpec) -> List[str]:
+    cur.execute("""
+        SELECT attname FROM pg_attribute
+        WHERE attrelid = %s::regclass AND attnum > 0 AND NOT attisdropped AND attnotnull
+    """, (spec.name.lower(),))
+    required = {r[0] for r in cur.fetchall()}
+    return [c for c in spec.columns if c in required]
+
+
+def _stage_csv(cur, spec: TableSpec) -> str:
+    # Staging tablosu: hedefle aynı kolon tipleri, constraint yok, WAL yazılmaz
+    stage = f"stage_{spec.name.lower()}"
     cols_str = ", ".join(spec.columns)
-    placeholders = ", ".join(["%s"] * len(spec.columns))
+    cur.execute(f"DROP TABLE IF EXISTS {stage}")
+    cur.execute(f"CREATE UNLOGGED TABLE {stage} AS SELECT {cols_str} FROM {spec.name} WITH NO DATA")
+    with open(spec.csv_path, mode='r', encoding='utf-8-sig') as f:
+        cur.copy_expert(f"COPY {stage} ({cols_str}) FROM STDIN", CopyStream(iter_copy_chunks(spec, f)))
+    return stage
 
-    inserted_count = 0
+
+def _filtered_source(cur, spec: TableSpec, stage: str):
+    """
+    Returns (src_cte, keep, counts_sql) for a staged table. src_cte flags every row
+    with _valid (NOT NULL / CHECK) and _fk<i> (anti-join per reference); for a
+    canonical spec, _rank numbers the kept copies of each canonical key and
+    _canonical is the key of the copy that is stored. counts_sql selects total,
+    invalid, mirrored-copy and per-reference missing counts from src.
+    """
+    required = _not_null_columns(cur, spec)
+    valid = " AND ".join([f"{c} IS NOT NULL" for c in required] +
+                         [f"({c}) IS NOT FALSE" for c in spec.checks]) or "TRUE"
+    joins, flags, missing = [], "", ""
+    for i, (col, ref_table, ref_col) in enumerate(spec.references):
+        joins.append(f"LEFT JOIN {ref_table} r{i} ON r{i}.{ref_col} = s.{col}")
+        flags += f", (s.{col} IS NULL OR r{i}.{ref_col} IS NOT NULL) AS _fk{i}"
+        missing += f", count(*) FILTER (WHERE _valid AND NOT _fk{i})"
+    keep = " AND ".join(["_valid"] + [f"_fk{i}" for i in range(len(spec.references))])
+    flagged = f"""
+            SELECT s.*{flags}
+            FROM (SELECT *, ({valid}) AS _valid FROM {stage}) s
+            {" ".join(joins)}
+    """
+    if not spec.canonical:
+        return f"src AS ({flagged})", keep, f"count(*), count(*) FILTER (WHERE NOT _valid), 0{missing}"
+
+    # Aynı maçın kopyaları (ev/deplasman yer değiştirmiş) tek satıra indirilir: geçerli
+    # kopyalar arasında sıralamada ilk olan saklanır, diğerleri alias tablosuna yazılır
+    pk = spec.primary_key[0]
+    window = f"PARTITION BY ({keep}), {', '.join(spec.canonical.key)} ORDER BY {spec.canonical.order}"
+    src_cte = f"""
+        src AS (
+            SELECT f.*,
+                   CASE WHEN {keep} THEN row_number() OVER w END AS _rank,
+                   first_value({pk}) OVER w AS _canonical
+            FROM ({flagged}) f
+            WINDOW w AS ({window})
+        )
+    """
+    return src_cte, f"{keep} AND _rank = 1", \
+        f"count(*), count(*) FILTER (WHERE NOT _valid), count(*) FILTER (WHERE _rank > 1){missing}"
+
+
+def _alias_cte(spec: TableSpec) -> str:
+    """Writable CTE recording the non-stored copies of a canonical spec (empty otherwise)."""
+    if not spec.canonical:
+        return ""
+    pk = spec.primary_key[0]
+    return f"""
+        , aliases AS (
+            INSERT INTO {spec.canonical.alias_table} (source_{pk}, {pk}, mirrored)
+            SELECT DISTINCT ON (a.{pk}) a.{pk}, a._canonical, {spec.canonical.mirrored}
+            FROM src a
+            JOIN src c ON c.{pk} = a._canonical AND c._rank = 1
+            WHERE a._rank > 1
+            ON CONFLICT (source_{pk}) DO UPDATE SET {pk} = EXCLUDED.{pk}, mirrored = EXCLUDED.mirrored
+        )
+    """
+
+def _report(spec: TableSpec, staged: int, invalid: int, mirrored: int, missing, applied: str) -> str:
+    report = f"[init_db] {spec.name}: {staged} staged, {applied}"
+    if mirrored:
+        report += f", {mirrored} mirrored copies mapped in {spec.canonical.alias_table}"
+    if invalid:
+        report += f", {invalid} invalid (NULL key / CHECK)"
+    for (col, ref_table, _), n in zip(spec.references, missing):
+        if n:
+            report += f", {n} missing {ref_table} for {col}"
+    return report
+
+
+def load_csv_using_conn(conn, spec: TableSpec):
+    """
+    COPY the CSV into an UNLOGGED staging table, then move it into the target with
+    one set-based INSERT ... SELECT. Rows violating NOT NULL / CHECK or pointing to a
+    missing foreign key are filtered out by an anti-join and reported as counts; for a
+    canonical spec only one copy per canonical key is inserted and the rest are aliased.
+    """
+    if not spec.csv_path or not os.path.exists(spec.csv_path):
+        print(f"[init_db] CSV not found for {spec.name}: {spec.csv_path} — skipping CSV load")
+        return 0
+
+    cols_str = ", ".join(spec.columns)
     with conn.cursor() as cur:
-        # Matches ve Players için satır satır yükleme (FK hatalarında satırı atla)
-        if spec.name.lower() in ("matches", "players"):
-            print(f"[init_db] Loading {spec.name} row by row to handle missing keys...")
-            for row in rows:
-                try:
-                    sql = f"INSERT INTO {spec.name} ({cols_str}) VALUES ({placeholders}) ON CONFLICT DO NOTHING"
-                    cur.execute(sql, row)
-                    inserted_count += 1
-                except Exception:
-                    conn.rollback()
-                    continue
-            conn.commit()
-        else:
-            insert_sql = f"INSERT INTO {spec.name} ({cols_str}) VALUES %s ON CONFLICT DO NOTHING"
-            try:
-                execute_values(cur, insert_sql, rows)
-                conn.commit()
-                inserted_count = len(rows)
-            except Exception as e:
-                conn.rollback()
-                print(f"[init_db] Error loading {spec.name}: {e}")
-                raise e
+        stage = _stage_csv(cur, spec)
+        # Tek INSERT ... SELECT: geçersiz satırlar ve eksik FK'ler anti-join ile elenir
+        src_cte, keep, counts_sql = _filtered_source(cur, spec, stage)
+        cur.execute(f"""
+            WITH {src_cte}, ins AS (
+                INSERT INTO {spec.name} ({cols_str})
+                SELECT {cols_str} FROM src WHERE {keep}
+                ON CONFLICT DO NOTHING
+                RETURNING 1
+            ){_alias_cte(spec)}
+            SELECT {counts_sql}, (SELECT count(*) FROM ins)
+            FROM src
+        """)
+        counts = cur.fetchone()
+        cur.execute(f"DROP TABLE {stage}")
 
-    print(f"[init_db] Loaded {inserted_count} rows into {spec.name}")
-    return inserted_count
+    staged, invalid, mirrored, missing, inserted = counts[0], counts[1], counts[2], counts[3:-1], counts[-1]
+    report = _report(spec, staged, invalid, mirrored, missing, f"{inserted} inserted")
+    duplicates = staged - invalid - mirrored - sum(missing) - inserted
+    if duplicates:
+        report += f", {duplicates} duplicate key"
+    print(report)
+    return inserted
 
 
 def ensure_table_and_load(spec: TableSpec) -> int:
-    print(f"[init_db] Ensuring table {spec.name} ...")
-    db_api.execute(spec.ddl)
-    
-    # Eğer truncate True ise ve tablo varsa içini boşalt
+    # Tablolar migration'larla oluşturulur (migrate.py); burada sadece veri yüklenir
     if spec.truncate:
         print(f"[init_db] Truncating table {spec.name}...")
-        try:
-            db_api.execute(f"TRUNCATE TABLE {spec.name} CASCADE")
-        except Exception as e:
-            print(f"[init_db] Truncate warning (might be new table): {e}")
+        db_api.execute(f"TRUNCATE TABLE {spec.name} CASCADE")
 
     if spec.csv_path:
         conn = db_api.get_conn()
@@ -165,18 +354,13 @@ def ensure_table_and_load(spec: TableSpec) -> int:
 
 
 BASE_DIR = os.path.dirname(__file__)
+# CSV klasörü: varsayılan tables/, ölçek testleri için INIT_DB_TABLES_DIR veya --tables
+TABLES_DIR = os.environ.get("INIT_DB_TABLES_DIR") or os.path.join(BASE_DIR, "tables")
 
 TABLE_SPECS = [
     # 0. Users (Authentication) - ✅ EKLENEN TABLO
     TableSpec(
         name="users",
-        ddl="""
-            CREATE TABLE IF NOT EXISTS users (
-                id SERIAL PRIMARY KEY,
-                username VARCHAR(64) UNIQUE NOT NULL,
-                password_hash VARCHAR(256) NOT NULL
-            );
-        """,
         columns=[],  # CSV yok, boş bırak
         csv_path=None,  # CSV yok
         truncate=False,  # Kullanıcıları silme!
@@ -185,22 +369,6 @@ TABLE_SPECS = [
     # 1. Teams
     TableSpec(
         name="Teams",
-        ddl="""
-            DROP TABLE IF EXISTS Teams CASCADE;
-            
-            CREATE TABLE Teams (
-                team_id INT PRIMARY KEY,
-                staff_id INT, 
-                team_url VARCHAR(255),
-                team_name VARCHAR(100),
-                league VARCHAR(64),
-                team_city VARCHAR(64),
-                team_year INT,
-                saloon_name VARCHAR(128),
-                saloon_capacity INT,
-                saloon_address TEXT
-            );
-        """,
         columns=[
             "team_id",
             "team_url",
@@ -212,31 +380,22 @@ TABLE_SPECS = [
             "saloon_capacity",
             "saloon_address",
         ],
-        csv_path=os.path.join(BASE_DIR, "tables", "team_data.csv"),
-        converter=teams_row_converter,
+        csv_path=os.path.join(TABLES_DIR, "team_data.csv"),
+        # Şehir ve salon bilgileri kırpılır; kapasite "2500 Kişi" -> 2500 (int)
+        column_kinds={"team_city": "strip", "saloon_name": "strip", "saloon_address": "strip"},
+        primary_key=["team_id"],
+    ),
+
+    # 2a. Mirrored source match IDs -> stored match. No CSV: only truncated here,
+    # filled by the Matches load (which therefore waits for it)
+    TableSpec(
+        name="match_aliases",
+        columns=[],
     ),
 
     # 2. Matches
     TableSpec(
         name="Matches",
-        ddl="""
-            CREATE TABLE IF NOT EXISTS Matches (
-                match_id VARCHAR(16) NOT NULL PRIMARY KEY,
-                home_team_id INT NOT NULL,
-                away_team_id INT NOT NULL,
-                match_date DATE,
-                match_hour TIME,
-                home_score SMALLINT,
-                away_score SMALLINT,
-                league VARCHAR(64),
-                match_week VARCHAR(16),
-                match_city VARCHAR(64),
-                match_saloon VARCHAR(128),
-                CONSTRAINT fk_matches_home FOREIGN KEY (home_team_id) REFERENCES Teams(team_id),
-                CONSTRAINT fk_matches_away FOREIGN KEY (away_team_id) REFERENCES Teams(team_id),
-                CONSTRAINT chk_distinct_teams CHECK (home_team_id <> away_team_id)
-            );
-        """,
         columns=[
             "match_id",
             "home_team_id",
@@ -250,30 +409,25 @@ TABLE_SPECS = [
             "match_city",
             "match_saloon",
         ],
-        csv_path=os.path.join(BASE_DIR, "tables", "matches.csv"),
+        csv_path=os.path.join(TABLES_DIR, "matches.csv"),
+        primary_key=["match_id"],
+        references=[("home_team_id", "Teams", "team_id"), ("away_team_id", "Teams", "team_id")],
+        checks=["home_team_id <> away_team_id"],
+        depends_on=["match_aliases"],
+        # Kaynak veride her maç ev/deplasman yer değiştirmiş olarak iki kez geçiyor:
+        # aynı lig + tarih + takım çifti tek maçtır. Skoru olan, sonra en küçük match_id saklanır
+        # (analitik sorguların eski ROW_NUMBER dedup'ı ile aynı seçim)
+        canonical=Canonical(
+            key=["league", "match_date", "LEAST(home_team_id, away_team_id)", "GREATEST(home_team_id, away_team_id)"],
+            order="(home_score IS NULL OR away_score IS NULL), match_id",
+            alias_table="match_aliases",
+            mirrored="a.home_team_id <> c.home_team_id",
+        ),
     ),
 
     # 3. Standings
     TableSpec(
         name="standings",
-        ddl="""
-            CREATE TABLE IF NOT EXISTS standings (
-              league TEXT NOT NULL,
-              team_rank INTEGER,
-              team_name TEXT NOT NULL,
-              team_id INT,
-              team_matches_played INTEGER,
-              team_wins INTEGER,
-              team_losses INTEGER,
-              team_points_scored INTEGER,
-              team_points_conceded INTEGER,
-              team_home_points INTEGER,
-              team_home_goal_difference INTEGER,
-              team_total_goal_difference INTEGER,
-              team_total_points INTEGER,
-              PRIMARY KEY (league, team_name) 
-            );
-        """,
         columns=[
             "league",
             "team_rank",
@@ -288,26 +442,15 @@ TABLE_SPECS = [
             "team_total_goal_difference",
             "team_total_points",
         ],
-        csv_path=os.path.join(BASE_DIR, "tables", "standings.csv"),
+        csv_path=os.path.join(TABLES_DIR, "standings.csv"),
+        primary_key=["league", "team_name"],
+        depends_on=["Teams"],   # team_id backfill + FK after load
         truncate=True, 
     ),
 
     # 4. Players
     TableSpec(
         name="Players",
-        ddl="""
-            CREATE TABLE IF NOT EXISTS Players (
-                team_id INT,
-                team_url VARCHAR(255),
-                league VARCHAR(100),
-                player_name VARCHAR(200),
-                player_id INT PRIMARY KEY,
-                player_birthdate VARCHAR(50),
-                player_height VARCHAR(20),
-                player_foot VARCHAR(10),
-                player_bio TEXT
-            );
-        """,
         columns=[
             "team_id",
             "team_url",
@@ -317,22 +460,14 @@ TABLE_SPECS = [
             "player_birthdate",
             "player_height",
         ],
-        csv_path=os.path.join(BASE_DIR, "tables", "player_data.csv"),
+        csv_path=os.path.join(TABLES_DIR, "player_data.csv"),
+        primary_key=["player_id"],
+        depends_on=["Teams"],   # team_id refers to Teams (no FK constraint)
     ),
 
     # 5. Technic Roster
     TableSpec(
         name="technic_roster",
-        ddl="""
-            CREATE TABLE IF NOT EXISTS technic_roster (
-                staff_id SERIAL PRIMARY KEY,
-                team_id INT REFERENCES Teams(team_id) ON DELETE SET NULL,
-                team_url TEXT,
-                league VARCHAR(64),
-                technic_member_name VARCHAR(100) NOT NULL,
-                technic_member_role VARCHAR(100)
-            );
-        """,
         columns=[
             "team_id",
             "team_url",
@@ -340,21 +475,112 @@ TABLE_SPECS = [
             "technic_member_name",
             "technic_member_role",
         ],
-        csv_path=os.path.join(BASE_DIR, "tables", "technic_roster.csv"),
+        csv_path=os.path.join(TABLES_DIR, "technic_roster.csv"),
+        references=[("team_id", "Teams", "team_id")],
     ),
 ]
 
 
-def init_db():
-    total = 0
+# -------------------------------------------------------------------
+# Manifest: skip the reload when neither the CSVs nor the schema changed
+# -------------------------------------------------------------------
+# Bump when the post-load steps in init_db() (fixups, FKs, indexes) change;
+# a new migration or a column change in TABLE_SPECS is picked up by the fingerprint.
+SCHEMA_VERSION = 3
+
+
+def schema_fingerprint() -> str:
+    h = hashlib.sha256(str(SCHEMA_VERSION).encode())
+    h.update(str(migrate.latest_version()).encode())
     for spec in TABLE_SPECS:
-        try:
-            total += ensure_table_and_load(spec)
-        except Exception as e:
-            print(f"[init_db] ERROR initializing {spec.name}: {e}")
-            print(f"[init_db] Skipping {spec.name} and continuing...")
-    print(f"[init_db] Initialization complete. Total rows inserted: {total}")
+        h.update(spec.name.encode())
+        h.update(",".join(spec.columns).encode())
+    return f"{SCHEMA_VERSION}:{h.hexdigest()[:16]}"
+
+
+def file_hash(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def file_stat(path: str) -> tuple:
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+
+def expected_manifest(known: Optional[dict] = None) -> tuple:
+    """
+    Returns (manifest, stats): {name: hash} and {name: (size, mtime_ns)} per CSV.
+    known is read_manifest()'s {name: (hash, size, mtime_ns)}: a file whose size and
+    mtime are unchanged keeps its recorded hash and is not read again.
+    """
+    known = known or {}
+    manifest = {"schema": schema_fingerprint()}
+    stats = {}
+    for spec in TABLE_SPECS:
+        if not spec.csv_path:
+            continue
+        if not os.path.exists(spec.csv_path):
+            manifest[spec.name] = "missing"
+            continue
+        stats[spec.name] = file_stat(spec.csv_path)
+        recorded = known.get(spec.name)
+        if recorded and recorded[1:] == stats[spec.name]:
+            manifest[spec.name] = recorded[0]
+        else:
+            manifest[spec.name] = file_hash(spec.csv_path)
+    return manifest, stats
+
+
+def read_manifest() -> dict:
+    """{name: (content_hash, file_size, file_mtime_ns)} of the last successful load."""
+    # init her zaman birincil sunucuda çalışır (replika gecikmesi karar vermesin)
+    conn = db_api.get_conn()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT name, content_hash, file_size, file_mtime_ns FROM init_manifest")
+            return {name: (content_hash, size, mtime_ns) for name, content_hash, size, mtime_ns in cur.fetchall()}
+    finally:
+        conn.rollback()
+        db_api.put_conn(conn)
+
 
+def update_manifest(hashes: dict, counts: Optional[dict] = None, stats: Optional[dict] = None):
+    counts = counts or {}
+    stats = stats or {}
+    conn = db_api.get_conn()
+    try:
+        with conn.cursor() as cur:
+            for name, content_hash in hashes.items():
+                size, mtime_ns = stats.get(name, (None, None))
+                cur.execute("""
+                    INSERT INTO init_manifest (name, content_hash, row_count, file_size, file_mtime_ns)
+                    VALUES (%s, %s, %s, %s, %s)
+                    ON CONFLICT (name) DO UPDATE
+                       SET content_hash = EXCLUDED.content_hash, row_count = EXCLUDED.row_count,
+                           file_size = EXCLUDED.file_size, file_mtime_ns = EXCLUDED.file_mtime_ns,
+                           loaded_at = now()
+                """, (name, content_hash, counts.get(name), size, mtime_ns))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        db_api.put_conn(conn)
+
+
+def clear_manifest():
+    # yükleme yarıda kalırsa bir sonraki açılışta eski manifest "değişmedi" demesin
+    db_api.execute("DELETE FROM init_manifest")
+
+
+# -------------------------------------------------------------------
+# Post-load fixups (full reload and delta ingest)
+# -------------------------------------------------------------------
+def backfill_staff_ids():
     try:
         print("[init_db] Updating Teams with staff_ids from technic_roster...")
         db_api.execute("""
@@ -364,73 +590,608 @@ def init_db():
                 SELECT DISTINCT ON (team_id) team_id, staff_id 
                 FROM technic_roster
             ) AS sub
-            WHERE Teams.team_id = sub.team_id;
+            WHERE Teams.team_id = sub.team_id
+              AND Teams.staff_id IS DISTINCT FROM sub.staff_id;
         """)
         print("[init_db] Teams staff_ids updated.")
     except Exception as e:
         print("[init_db] Warning: Could not auto-update staff_ids:", e)
 
-    try:
-        print("[init_db] Adding Foreign Keys to Teams table...")
-        db_api.execute("""
-            ALTER TABLE Teams       
-            ADD CONSTRAINT fk_teams_staff
-            FOREIGN KEY (staff_id) REFERENCES technic_roster(staff_id)
-            ON DELETE SET NULL;
+
+def backfill_standings_team_ids():
+    print("[init_db] Updating standings team_ids based on Name and League...")
+    db_api.execute("""
+        UPDATE standings
+        SET team_id = Teams.team_id
+        FROM Teams
+        WHERE standings.team_name = Teams.team_name
+          AND standings.league = Teams.league
+          AND standings.team_id IS DISTINCT FROM Teams.team_id;
+    """)
+    print("[init_db] standings team_ids updated.")
+
+
+# -------------------------------------------------------------------
+# Delta ingest: apply only what changed in the refreshed CSVs
+# -------------------------------------------------------------------
+def _upsert_staged(cur, spec: TableSpec, stage: str) -> dict:
+    # PG15 MERGE'de RETURNING yok: INSERT ... ON CONFLICT DO UPDATE ile eklenen/güncellenen
+    # satırlar (xmax = 0 -> yeni satır) tek ifadede sayılır. Değişmeyen satırlara dokunulmaz.
+    cols_str = ", ".join(spec.columns)
+    pk_str = ", ".join(spec.primary_key)
+    data_cols = [c for c in spec.columns if c not in spec.primary_key]
+    target_cols = ", ".join(f"{spec.name}.{c}" for c in data_cols)
+    excluded_cols = ", ".join(f"EXCLUDED.{c}" for c in data_cols)
+    league = "league" if "league" in spec.columns else "NULL::text"
+
+    src_cte, keep, counts_sql = _filtered_source(cur, spec, stage)
+    cur.execute(f"""
+        WITH {src_cte}, up AS (
+            INSERT INTO {spec.name} ({cols_str})
+            SELECT DISTINCT ON ({pk_str}) {cols_str} FROM src WHERE {keep}
+            ON CONFLICT ({pk_str}) DO UPDATE
+               SET ({", ".join(data_cols)}) = ROW({excluded_cols})
+             WHERE ROW({target_cols}) IS DISTINCT FROM ROW({excluded_cols})
+            RETURNING (xmax = 0) AS inserted, {league} AS league
+        ){_alias_cte(spec)}
+        SELECT {counts_sql},
+               (SELECT count(*) FILTER (WHERE inserted) FROM up),
+               (SELECT count(*) FILTER (WHERE NOT inserted) FROM up),
+               (SELECT array_agg(DISTINCT league) FROM up)
+        FROM src
+    """)
+    counts = cur.fetchone()
+    staged, invalid, mirrored, missing = counts[0], counts[1], counts[2], counts[3:-3]
+    inserted, updated, leagues = counts[-3], counts[-2], counts[-1]
+    print(_report(spec, staged, invalid, mirrored, missing, f"{inserted} inserted, {updated} updated"))
+    return {"inserted": inserted, "updated": updated, "deleted": 0, "leagues": set(leagues or [])}
+
+
+def _delete_missing(cur, spec: TableSpec, stage: str, result: dict):
+    # CSV'de artık olmayan anahtarlar silinir (geçersiz satırlar dahil: anahtar CSV'de var sayılır)
+    league = "t.league" if "league" in spec.columns else "NULL::text"
+    key_match = " AND ".join(f"s.{c} = t.{c}" for c in spec.primary_key)
+    aliased = ""
+    if spec.canonical:
+        # Artık başka bir kopyanın alias'ı olan satırlar da silinir; kaynağı CSV'den
+        # çıkan alias kayıtları temizlenir
+        pk, alias_table = spec.primary_key[0], spec.canonical.alias_table
+        aliased = f"OR EXISTS (SELECT 1 FROM {alias_table} a WHERE a.source_{pk} = t.{pk})"
+        cur.execute(f"""
+            DELETE FROM {alias_table} a
+            WHERE NOT EXISTS (SELECT 1 FROM {stage} s WHERE s.{pk} = a.source_{pk})
         """)
-    except Exception as e:
-        print("[init_db] Note: Foreign key might already exist.", e)
+    cur.execute(f"""
+        WITH del AS (
+            DELETE FROM {spec.name} t
+            WHERE NOT EXISTS (SELECT 1 FROM {stage} s WHERE {key_match}) {aliased}
+            RETURNING {league} AS league
+        )
+        SELECT count(*), array_agg(DISTINCT league) FROM del
+    """)
+    deleted, leagues = cur.fetchone()
+    result["deleted"] = deleted
+    result["leagues"] |= {lg for lg in (leagues or []) if lg}
+    if deleted:
+        print(f"[init_db] {spec.name}: {deleted} deleted")
+
+
+def delta_ingest(table_names: Optional[List[str]] = None) -> dict:
+    """
+    Compares the CSVs with the database by primary key and applies only the
+    inserts, updates and deletes, all in one transaction. Upserts run in
+    TABLE_SPECS order (parents first), deletes in reverse order (children first).
+
+    Returns {table: {"inserted", "updated", "deleted", "leagues"}}; "leagues" are the
+    leagues touched by the change, for targeted cache invalidation.
+    """
+    migrate.migrate()
+    wanted = {n.lower() for n in table_names} if table_names else None
+    specs = []
+    for spec in TABLE_SPECS:
+        if not spec.csv_path or (wanted is not None and spec.name.lower() not in wanted):
+            continue
+        if not spec.primary_key:
+            print(f"[init_db] {spec.name} has no primary key for delta ingest — use a full reload")
+            continue
+        if not os.path.exists(spec.csv_path):
+            print(f"[init_db] CSV not found for {spec.name}: {spec.csv_path} — skipping")
+            continue
+        specs.append(spec)
 
+    start = time.perf_counter()
+    results = {}
+    conn = db_api.get_conn()
     try:
-        print("[init_db] Updating standings team_ids based on Name and League...")
-        db_api.execute("""
-            UPDATE standings
-            SET team_id = Teams.team_id
-            FROM Teams
-            WHERE standings.team_name = Teams.team_name
-              AND standings.league = Teams.league;
-        """)
-        print("[init_db] standings team_ids updated.")
+        with conn.cursor() as cur:
+            stages = {spec.name: _stage_csv(cur, spec) for spec in specs}
+            for spec in specs:
+                results[spec.name] = _upsert_staged(cur, spec, stages[spec.name])
+            for spec in reversed(specs):
+                _delete_missing(cur, spec, stages[spec.name], results[spec.name])
+            if "Matches" in results:
+                # Analitik panellerin tablosu aynı transaction'da, sadece değişen liglerde yenilenir
+                leagues = sorted(lg for lg in results["Matches"]["leagues"] if lg)
+                cur.execute("SELECT count(*) FROM unnest(%s::text[]) AS l WHERE refresh_unique_matches(l) > 0",
+                            (leagues,))
+                print(f"[init_db] unique_matches refreshed for {cur.fetchone()[0]} of {len(leagues)} leagues")
+            for stage in stages.values():
+                cur.execute(f"DROP TABLE {stage}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        db_api.put_conn(conn)
 
-        print("[init_db] Adding Foreign Key to standings table...")
-        db_api.execute("""
-            ALTER TABLE standings
-            ADD CONSTRAINT fk_standings_team
-            FOREIGN KEY (team_id) REFERENCES Teams(team_id)
-            ON DELETE CASCADE;
-        """)
-        print("[init_db] FK constraint added to standings.")
+    changed = {name for name, r in results.items() if r["inserted"] or r["updated"] or r["deleted"]}
+    if "Teams" in changed:
+        backfill_staff_ids()
+    if changed & {"Teams", "standings"}:
+        backfill_standings_team_ids()
 
-    except Exception as e:
-        print(f"[init_db] Warning: Could not update standings FK. Reason: {e}")
+    # Manifest güncellenir: değişmeyen dosyalar için bir sonraki açılış yine atlanır
+    update_manifest({spec.name: file_hash(spec.csv_path) for spec in specs},
+                    stats={spec.name: file_stat(spec.csv_path) for spec in specs})
 
+    total = sum(r["inserted"] + r["updated"] + r["deleted"] for r in results.values())
+    print(f"[init_db] Delta ingest applied {total} changed rows in {time.perf_counter() - start:.2f} s")
+    return results
+
+
+# -------------------------------------------------------------------
+# Canonical matches: validation against the old per-query dedup
+# -------------------------------------------------------------------
+def validate_canonical_matches() -> bool:
+    """
+    Rebuilds the match set the analytics queries used to see (every source row,
+    deduplicated per league with ROW_NUMBER over date + team pair, ORDER BY match_id)
+    from Matches plus the aliased source rows of matches.csv, and compares it per
+    league with the stored rows. Prints a report; True if every league matches.
+    """
+    spec = next(spec for spec in TABLE_SPECS if spec.name == "Matches")
+    cols = "match_id, league, match_date, home_team_id, away_team_id, home_score, away_score"
+    conn = db_api.get_conn()
     try:
-        print("[init_db] Checking for missing columns in Players table...")
-        db_api.execute("ALTER TABLE Players ADD COLUMN IF NOT EXISTS player_foot VARCHAR(10);")
-        db_api.execute("ALTER TABLE Players ADD COLUMN IF NOT EXISTS player_bio TEXT;")
-        print("[init_db] Migration checks for Players table completed.")
-    except Exception as e:
-        print(f"[init_db] Migration Error: {e}")
+        with conn.cursor() as cur:
+            stage = _stage_csv(cur, spec)
+            cur.execute(f"""
+                WITH source_rows AS (
+                    SELECT {cols} FROM Matches
+                    UNION ALL
+                    SELECT {", ".join(f"s.{c}" for c in cols.split(", "))}
+                    FROM {stage} s JOIN match_aliases a ON a.source_match_id = s.match_id
+                ),
+                legacy AS (
+                    SELECT {cols} FROM (
+                        SELECT r.*, ROW_NUMBER() OVER (
+                                   PARTITION BY league, match_date,
+                                                LEAST(home_team_id, away_team_id),
+                                                GREATEST(home_team_id, away_team_id)
+                                   ORDER BY match_id) AS rn
+                        FROM source_rows r
+                        WHERE home_score IS NOT NULL AND away_score IS NOT NULL
+                    ) ranked
+                    WHERE rn = 1
+                ),
+                stored AS (
+                    SELECT {cols} FROM Matches
+                    WHERE home_score IS NOT NULL AND away_score IS NOT NULL
+                )
+                SELECT COALESCE(l.league, c.league) AS league,
+                       count(l.match_id), count(c.match_id),
+                       count(*) FILTER (WHERE c.match_id IS NULL),
+                       count(*) FILTER (WHERE l.match_id IS NULL),
+                       count(*) FILTER (WHERE l.match_id IS NOT NULL AND c.match_id IS NOT NULL
+                                          AND ROW(l.*) IS DISTINCT FROM ROW(c.*))
+                FROM legacy l
+                FULL JOIN stored c ON c.match_id = l.match_id
+                GROUP BY 1
+                ORDER BY 1
+            """)
+            rows = cur.fetchall()
+    finally:
+        conn.rollback()
+        db_api.put_conn(conn)
+
+    ok = True
+    print(f"[init_db] {'league':20} {'legacy':>8} {'stored':>8} {'missing':>8} {'extra':>8} {'changed':>8}")
+    for league, legacy, stored, missing, extra, changed in rows:
+        flag = "" if missing == extra == changed == 0 else "  MISMATCH"
+        ok = ok and not flag
+        print(f"[init_db] {str(league):20} {legacy:8} {stored:8} {missing:8} {extra:8} {changed:8}{flag}")
+    print(f"[init_db] Canonical matches {'match' if ok else 'DO NOT match'} the per-query dedup "
+          f"({len(rows)} leagues)")
+    return ok
+
+
+# -------------------------------------------------------------------
+# team_season_stats: trigger-maintained aggregates, rebuild and check
+# -------------------------------------------------------------------
+def rebuild_team_season_stats():
+    """Recomputes team_season_stats from Matches (team_season_stats_expected)."""
+    start = time.perf_counter()
+    run_maintenance(
+        "LOCK TABLE Matches IN SHARE MODE",  # yeniden kurulurken maç yazılmasın
+        "TRUNCATE team_season_stats",
+        "INSERT INTO team_season_stats SELECT * FROM team_season_stats_expected",
+        "ANALYZE team_season_stats",
+    )
+    print(f"[init_db] team_season_stats rebuilt ({time.perf_counter() - start:.2f} s)")
+
+
+def check_team_season_stats() -> bool:
+    """
+    Compares team_season_stats with the aggregate recomputed from Matches, per
+    league: rows missing from the table, extra rows and rows with different
+    counters. Prints a report; True if every league matches.
+    """
+    conn = db_api.get_conn()
+    try:
+        with conn.cursor() as cur:
+            # Tek snapshot: tablo ve Matches aynı andaki haliyle karşılaştırılır
+            cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+            cur.execute("""
+                SELECT COALESCE(e.league, s.league) AS league,
+                       count(e.team_id), count(s.team_id),
+                       count(*) FILTER (WHERE s.team_id IS NULL),
+                       count(*) FILTER (WHERE e.team_id IS NULL),
+                       count(*) FILTER (WHERE e.team_id IS NOT NULL AND s.team_id IS NOT NULL
+                                          AND ROW(e.*) IS DISTINCT FROM ROW(s.*))
+                FROM team_season_stats_expected e
+                FULL JOIN team_season_stats s ON s.league = e.league AND s.team_id = e.team_id
+                GROUP BY 1
+                ORDER BY 1
+            """)
+            rows = cur.fetchall()
+    finally:
+        conn.rollback()
+        db_api.put_conn(conn)
+
+    ok = True
+    print(f"[init_db] {'league':20} {'expected':>8} {'stored':>8} {'missing':>8} {'extra':>8} {'changed':>8}")
+    for league, expected, stored, missing, extra, changed in rows:
+        flag = "" if missing == extra == changed == 0 else "  MISMATCH"
+        ok = ok and not flag
+        print(f"[init_db] {str(league):20} {expected:8} {stored:8} {missing:8} {extra:8} {changed:8}{flag}")
+    print(f"[init_db] team_season_stats {'matches' if ok else 'DOES NOT match'} Matches "
+          f"({len(rows)} leagues){'' if ok else ' - run init_db.py --rebuild-team-stats'}")
+    return ok
+
+
+# -------------------------------------------------------------------
+# Load stages and the dependency-aware runner
+# -------------------------------------------------------------------
+LOAD_WORKERS = int(os.environ.get("INIT_DB_WORKERS", 4))
+
+# Index/FK build ayarları (sadece bu oturumlar için, SET LOCAL)
+MAINTENANCE_WORK_MEM = os.environ.get("INIT_DB_MAINTENANCE_WORK_MEM", "256MB")
+MAINTENANCE_WORKERS = int(os.environ.get("INIT_DB_MAINTENANCE_WORKERS", 2))
+
+# staff_id/team_id backfill'i bitmeden bu tablolarda index/FK kurulmaz
+FIXUPS = {"Teams": ["staff_ids"], "technic_roster": ["staff_ids"], "standings": ["standings_team_ids"]}
+
 
+def run_maintenance(*statements):
+    """
+    Runs DDL/ANALYZE in one transaction with the bulk-build memory settings.
+    A statement is an SQL string or an (sql, params) tuple.
+    """
+    conn = db_api.get_conn()
     try:
-        print("[init_db] Creating performance indexes...")
-
-        db_api.execute("CREATE INDEX IF NOT EXISTS idx_matches_home_team ON Matches(home_team_id);")
-        db_api.execute("CREATE INDEX IF NOT EXISTS idx_matches_away_team ON Matches(away_team_id);")
-        db_api.execute("CREATE INDEX IF NOT EXISTS idx_matches_league ON Matches(league);")
-        db_api.execute("CREATE INDEX IF NOT EXISTS idx_matches_date ON Matches(match_date);")
-        db_api.execute("CREATE INDEX IF NOT EXISTS idx_matches_city ON Matches(match_city);")
-        db_api.execute("CREATE INDEX IF NOT EXISTS idx_matches_week ON Matches(match_week);")
-        db_api.execute("CREATE INDEX IF NOT EXISTS idx_matches_dedup ON Matches(match_date, home_team_id, away_team_id);")
-        db_api.execute("CREATE INDEX IF NOT EXISTS idx_matches_scores ON Matches(home_score, away_score) WHERE home_score IS NOT NULL;")
-        db_api.execute("CREATE INDEX IF NOT EXISTS idx_teams_name ON Teams(team_name);")
-        db_api.execute("CREATE INDEX IF NOT EXISTS idx_teams_league ON Teams(league);")
-        db_api.execute("CREATE INDEX IF NOT EXISTS idx_technic_team ON technic_roster(team_id);")
-
-        print("[init_db] ✅ Performance indexes created successfully! (11 indexes total)")
+        with conn.cursor() as cur:
+            cur.execute("SET LOCAL maintenance_work_mem = %s", (MAINTENANCE_WORK_MEM,))
+            cur.execute("SET LOCAL max_parallel_maintenance_workers = %s", (MAINTENANCE_WORKERS,))
+            for sql in statements:
+                if isinstance(sql, tuple):
+                    cur.execute(*sql)
+                else:
+                    cur.execute(sql)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        db_api.put_conn(conn)
+
+
+def deferred_objects():
+    """
+    Secondary indexes and foreign keys of the TABLE_SPECS tables, read from the
+    catalog (they are defined only in the migrations), plus the ones an interrupted
+    reload dropped and never rebuilt (init_deferred). Returns (indexes, foreign_keys):
+      indexes:      [(name, table, CREATE INDEX statement)]
+      foreign_keys: [(table, name, FOREIGN KEY clause, referenced table)]
+    """
+    tables = {spec.name.lower(): spec.name for spec in TABLE_SPECS}
+    conn = db_api.get_conn()
+    try:
+        with conn.cursor() as cur:
+            # PK/UNIQUE kısıtlarının index'leri yükleme sırasında da lazım: dokunulmaz
+            cur.execute("""
+                SELECT ic.relname, c.relname, pg_get_indexdef(i.indexrelid)
+                FROM pg_index i
+                JOIN pg_class c ON c.oid = i.indrelid
+                JOIN pg_class ic ON ic.oid = i.indexrelid
+                WHERE c.relname = ANY(%s) AND pg_table_is_visible(c.oid)
+                  AND NOT EXISTS (SELECT 1 FROM pg_constraint con
+                                  WHERE con.conindid = i.indexrelid AND con.contype IN ('p', 'u', 'x'))
+                ORDER BY c.relname, ic.relname
+            """, (list(tables),))
+            indexes = {name: (name, table, sql) for name, table, sql in cur.fetchall()}
+            cur.execute("""
+                SELECT c.relname, con.conname, pg_get_constraintdef(con.oid), r.relname
+                FROM pg_constraint con
+                JOIN pg_class c ON c.oid = con.conrelid
+                JOIN pg_class r ON r.oid = con.confrelid
+                WHERE con.contype = 'f' AND c.relname = ANY(%s) AND pg_table_is_visible(c.oid)
+                ORDER BY c.relname, con.conname
+            """, (list(tables),))
+            foreign_keys = {name: (table, name, definition.removesuffix(" NOT VALID"), ref_table)
+                            for table, name, definition, ref_table in cur.fetchall()}
+            cur.execute("SELECT name, kind, table_name, ref_table, definition FROM init_deferred")
+            for name, kind, table, ref_table, definition in cur.fetchall():
+                if kind == "index":
+                    indexes.setdefault(name, (name, table, definition))
+                else:
+                    foreign_keys.setdefault(name, (table, name, definition, ref_table))
+    finally:
+        conn.rollback()
+        db_api.put_conn(conn)
+
+    def spec_name(table):
+        return tables.get(table.lower(), table)
+
+    return ([(name, spec_name(table), sql) for name, table, sql in indexes.values()],
+            [(spec_name(table), name, definition, spec_name(ref_table))
+             for table, name, definition, ref_table in foreign_keys.values()])
+
+
+def drop_deferred(indexes, foreign_keys):
+    # Yükleme sırasında index/FK bakımı yapılmasın: yeniden yüklemeden önce kaldırılır.
+    # Tanımlar aynı transaction'da init_deferred'a yazılır; yükleme yarıda kalırsa
+    # bir sonraki çalıştırma neyi yeniden kuracağını oradan bilir.
+    conn = db_api.get_conn()
+    try:
+        with conn.cursor() as cur:
+            for name, table, create_sql in indexes:
+                cur.execute("""
+                    INSERT INTO init_deferred (name, kind, table_name, definition)
+                    VALUES (%s, 'index', %s, %s) ON CONFLICT (name) DO NOTHING
+                """, (name, table, create_sql))
+            for table, name, definition, ref_table in foreign_keys:
+                cur.execute("""
+                    INSERT INTO init_deferred (name, kind, table_name, ref_table, definition)
+                    VALUES (%s, 'foreign_key', %s, %s, %s) ON CONFLICT (name) DO NOTHING
+                """, (name, table, ref_table, definition))
+            for table, name, _, _ in foreign_keys:
+                cur.execute(f"ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {name}")
+            for name, _, _ in indexes:
+                cur.execute(f"DROP INDEX IF EXISTS {name}")
+        conn.commit()
+        print(f"[init_db] Dropped {len(foreign_keys)} foreign keys and {len(indexes)} indexes for the bulk load")
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        db_api.put_conn(conn)
+
+
+UNIQUE_MATCHES_COLUMNS = "match_id, league, match_date, home_team_id, away_team_id, home_score, away_score"
+
+
+def rebuild_unique_matches():
+    # Tam yüklemeden sonra lig lig yenileme yerine tek geçişte baştan kurulur
+    run_maintenance(
+        "TRUNCATE unique_matches",
+        f"""
+        INSERT INTO unique_matches ({UNIQUE_MATCHES_COLUMNS})
+        SELECT {UNIQUE_MATCHES_COLUMNS} FROM Matches
+        WHERE league IS NOT NULL AND home_score IS NOT NULL
+        """,
+        "ANALYZE unique_matches",
+    )
+    print("[init_db] unique_matches rebuilt")
+
+
+def build_index(name: str, create_sql: str):
+    run_maintenance(create_sql, ("DELETE FROM init_deferred WHERE name = %s", (name,)))
+    print(f"[init_db] Index {name} built")
+
+
+def add_foreign_keys(foreign_keys):
+    # NOT VALID: mevcut satırlar taranmaz, sadece katalog değişir (kısa kilit). Hepsi tek
+    # transaction'da ve sırayla eklenir: paralel ALTER'lar tabloları ters sırada kilitleyip
+    # deadlock'a girebilirdi (Teams <-> technic_roster)
+    statements = []
+    for table, name, definition, _ in foreign_keys:
+        statements.append(f"ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {name}")
+        statements.append(f"ALTER TABLE {table} ADD CONSTRAINT {name} {definition} NOT VALID")
+    statements.append(("DELETE FROM init_deferred WHERE kind = 'foreign_key' AND name = ANY(%s)",
+                       ([name for _, name, _, _ in foreign_keys],)))
+    run_maintenance(*statements)
+    print(f"[init_db] Added {len(foreign_keys)} foreign keys (NOT VALID)")
+
+
+def validate_foreign_key(table: str, name: str):
+    # VALIDATE tabloyu tarar ama sadece SHARE UPDATE EXCLUSIVE alır: okuma/yazmayı engellemez
+    run_maintenance(f"ALTER TABLE {table} VALIDATE CONSTRAINT {name}")
+    print(f"[init_db] Foreign key {name} validated")
+
+
+def analyze_table(table: str):
+    run_maintenance(f"ANALYZE {table}")
+    print(f"[init_db] Analyzed {table}")
+
+
+def post_load_stages(indexes, foreign_keys) -> list:
+    """
+    Stages after the table loads: fixups, the unique_matches rebuild, parallel index
+    builds, FKs (added NOT VALID together, then validated in parallel) and ANALYZE.
+    Each table is analyzed once its indexes and FKs are in place. indexes/foreign_keys come from deferred_objects().
+    """
+    stages = [
+        ("staff_ids", ["Teams", "technic_roster"], backfill_staff_ids),
+        ("standings_team_ids", ["Teams", "standings"], backfill_standings_team_ids),
+        ("unique_matches", ["Matches"], rebuild_unique_matches),
+    ]
+    per_table = {spec.name: [] for spec in TABLE_SPECS}
+
+    for name, table, create_sql in indexes:
+        stage = f"index {name}"
+        stages.append((stage, [table] + FIXUPS.get(table, []),
+                       lambda name=name, create_sql=create_sql: build_index(name, create_sql)))
+        per_table.setdefault(table, []).append(stage)
+
+    if foreign_keys:
+        fk_deps = []
+        for table, _, _, ref_table in foreign_keys:
+            fk_deps += [table, ref_table] + FIXUPS.get(table, [])
+        stages.append(("foreign_keys", sorted(set(fk_deps)), lambda: add_foreign_keys(foreign_keys)))
+    for table, name, _, _ in foreign_keys:
+        stage = f"validate {name}"
+        stages.append((stage, ["foreign_keys"], lambda table=table, name=name: validate_foreign_key(table, name)))
+        per_table.setdefault(table, []).append(stage)
+
+    for spec in TABLE_SPECS:
+        deps = [spec.name] + per_table[spec.name] + FIXUPS.get(spec.name, [])
+        stages.append((f"analyze {spec.name}", deps, lambda table=spec.name: analyze_table(table)))
+    return stages
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    try:
+        return fn(), None, start, time.perf_counter()
     except Exception as e:
-        print(f"[init_db] Warning: Could not create all indexes. Reason: {e}")
+        return None, e, start, time.perf_counter()
+
+
+def run_stages(stages, workers: int = None) -> dict:
+    """
+    stages: [(name, dependencies, fn)]. A stage starts as soon as all of its
+    dependencies have finished; independent stages run concurrently, each on its
+    own pooled connection. When a stage fails, every stage that depends on it
+    (transitively) is cancelled; independent stages still run to the end, then
+    RuntimeError is raised. Prints a timing breakdown at the end.
+    Returns {name: fn result} when every stage succeeded.
+    """
+    workers = workers or LOAD_WORKERS
+    names = {name for name, _, _ in stages}
+    pending = {name: ({d for d in deps if d in names}, fn) for name, deps, fn in stages}
+    done, results, timings = set(), {}, []
+    failed, cancelled = {}, []
+    t0 = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="init-db") as executor:
+        running = {}
+        while pending or running:
+            # Başarısız bir aşamaya (dolaylı da olsa) bağlı aşamalar hiç başlatılmaz
+            blocked = set(failed) | set(cancelled)
+            while True:
+                skip = [n for n, (deps, _) in pending.items() if deps & blocked]
+                if not skip:
+                    break
+                for name in skip:
+                    pending.pop(name)
+                    cancelled.append(name)
+                    blocked.add(name)
+            for name in [n for n, (deps, _) in pending.items() if deps <= done]:
+                _, fn = pending.pop(name)
+                running[executor.submit(_timed, fn)] = name
+            if not running:
+                if not pending:
+                    break
+                raise RuntimeError(f"[init_db] dependency cycle between stages: {sorted(pending)}")
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                value, error, start, end = future.result()
+                if error is not None:
+                    print(f"[init_db] ERROR initializing {name}: {error}")
+                    failed[name] = error
+                else:
+                    results[name] = value
+                timings.append((name, start - t0, end - start, error is None))
+                done.add(name)
+
+    wall = time.perf_counter() - t0
+    print(f"[init_db] Stage timings ({workers} workers):")
+    for name, offset, elapsed, ok in sorted(timings, key=lambda t: t[1]):
+        print(f"[init_db]   {name:36} start +{offset:6.2f} s  took {elapsed:6.2f} s{'' if ok else '  FAILED'}")
+    print(f"[init_db]   {'total':36} wall {wall:6.2f} s  (sum of stages {sum(t[2] for t in timings):.2f} s)")
+    if failed:
+        if cancelled:
+            print(f"[init_db] Cancelled (depend on a failed stage): {', '.join(sorted(cancelled))}")
+        raise RuntimeError(f"[init_db] {len(failed)} stage(s) failed: {', '.join(sorted(failed))}") \
+            from next(iter(failed.values()))
+    return results
+
+
+def init_db(force: bool = False):
+    start = time.perf_counter()
+    migrate.migrate()
+    recorded = read_manifest()
+    manifest, stats = expected_manifest(recorded)
+    if not force:
+        current = {name: entry[0] for name, entry in recorded.items()}
+        if current == manifest:
+            print(f"[init_db] CSVs and schema unchanged ({manifest['schema']}), "
+                  f"skipping reload ({(time.perf_counter() - start) * 1000:.0f} ms)")
+            return
+        changed = sorted(k for k in manifest if current.get(k) != manifest[k])
+        print(f"[init_db] Manifest changed ({', '.join(changed) or 'no manifest'}), full reload")
+    else:
+        print("[init_db] --force: full reload")
+    clear_manifest()
+
+    # Tablolar index/FK olmadan doldurulur; index'ler ve FK'ler yüklemeden sonra paralel kurulur
+    indexes, foreign_keys = deferred_objects()
+    stages = [("drop_deferred", [], lambda: drop_deferred(indexes, foreign_keys))]
+    stages += [(spec.name, spec.dependencies() + ["drop_deferred"], lambda spec=spec: ensure_table_and_load(spec))
+               for spec in TABLE_SPECS]
+    stages += post_load_stages(indexes, foreign_keys)
+    results = run_stages(stages)
+    counts = {spec.name: results[spec.name] for spec in TABLE_SPECS if spec.name in results}
+    print(f"[init_db] Initialization complete. Total rows inserted: {sum(counts.values())}")
+
+    # Bir aşama başarısız olursa run_stages hata fırlatır ve manifest yazılmaz: sonraki açılış yeniden dener
+    update_manifest(manifest, counts, stats)
+    print(f"[init_db] Full reload took {time.perf_counter() - start:.2f} s")
+
+def use_tables_dir(path: str):
+    """Points every CSV-backed spec at the same file names under another directory."""
+    for spec in TABLE_SPECS:
+        if spec.csv_path:
+            spec.csv_path = os.path.join(path, os.path.basename(spec.csv_path))
+
 
 if __name__ == "__main__":
-    init_db()
+    parser = argparse.ArgumentParser(description="Apply migrations and load tables/*.csv")
+    parser.add_argument("--tables", metavar="DIR",
+                        help="load the CSVs from DIR instead of tables/ (e.g. a generated dataset)")
+    parser.add_argument("--force", action="store_true",
+                        help="reload everything even if the CSVs and schema are unchanged")
+    parser.add_argument("--delta", nargs="*", metavar="TABLE",
+                        help="apply only inserted/updated/deleted rows (all tables with a primary key, or the given ones)")
+    parser.add_argument("--validate-matches", action="store_true",
+                        help="compare stored canonical matches with the old per-query dedup of matches.csv")
+    parser.add_argument("--check-team-stats", action="store_true",
+                        help="compare team_season_stats with the aggregates recomputed from Matches")
+    parser.add_argument("--rebuild-team-stats", action="store_true",
+                        help="recompute team_season_stats from Matches")
+    args = parser.parse_args()
+    if args.tables:
+        use_tables_dir(args.tables)
+    if args.validate_matches:
+        raise SystemExit(0 if validate_canonical_matches() else 1)
+    if args.check_team_stats:
+        raise SystemExit(0 if check_team_season_stats() else 1)
+    if args.rebuild_team_stats:
+        rebuild_team_season_stats()
+        raise SystemExit(0)
+    if args.delta is not None:
+        delta_ingest(args.delta or None)
+    else:
+        init_db(force=args.force)
     print("Database initialization finished.")
\ No newline at end of file
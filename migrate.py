@@ -0,0 +1,173 @@
+"""
+Versioned schema migrations.
+
+database/migrations/NNNN_<name>.sql files are applied in version order, each in
+its own transaction, and recorded in schema_version. When the database is
+already at the latest version, startup costs one SELECT: no DDL runs and no
+schema locks are taken, so web replicas can boot while the site is serving.
+
+    python migrate.py            # apply pending migrations
+    python migrate.py --status   # list applied / pending migrations
+"""
+import os
+import re
+import time
+import hashlib
+import argparse
+from typing import List, Tuple
+
+import database.db as db_api
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), "database", "migrations")
+
+_RE_MIGRATION = re.compile(r"^(\d+)_(\w+)\.sql$")
+
+# Aynı anda açılan birden fazla container migration'ı tek sefer uygulasın diye
+# (pg_advisory_lock anahtarı, uygulamaya özgü sabit bir sayı)
+MIGRATION_LOCK_ID = 7310017
+
+VERSION_DDL = """
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INT PRIMARY KEY,
+        name TEXT NOT NULL,
+        checksum TEXT NOT NULL,         -- sha256 of the migration file when applied
+        applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+    );
+"""
+
+
+def list_migrations() -> List[Tuple[int, str, str]]:
+    """[(version, name, path)] sorted by version."""
+    migrations = {}
+    for filename in os.listdir(MIGRATIONS_DIR):
+        m = _RE_MIGRATION.match(filename)
+        if not m:
+            continue
+        version = int(m.group(1))
+        if version in migrations:
+            raise RuntimeError(f"[migrate] duplicate migration version {version}: {filename}")
+        migrations[version] = (version, m.group(2), os.path.join(MIGRATIONS_DIR, filename))
+    return [migrations[v] for v in sorted(migrations)]
+
+
+def latest_version() -> int:
+    migrations = list_migrations()
+    return migrations[-1][0] if migrations else 0
+
+
+def checksum(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _current_version(cur) -> int:
+    cur.execute("SELECT to_regclass('schema_version') IS NOT NULL")
+    if not cur.fetchone()[0]:
+        return 0
+    cur.execute("SELECT COALESCE(max(version), 0) FROM schema_version")
+    return cur.fetchone()[0]
+
+
+def current_version() -> int:
+    conn = db_api.get_conn()
+    try:
+        with conn.cursor() as cur:
+            return _current_version(cur)
+    finally:
+        conn.rollback()
+        db_api.put_conn(conn)
+
+
+def _applied(cur) -> dict:
+    cur.execute("SELECT version, checksum FROM schema_version")
+    return dict(cur.fetchall())
+
+
+def _apply_pending(conn, migrations) -> int:
+    applied_count = 0
+    with conn.cursor() as cur:
+        cur.execute(VERSION_DDL)
+        conn.commit()
+        applied = _applied(cur)
+        for version, name, path in migrations:
+            if version in applied:
+                if applied[version] != checksum(path):
+                    print(f"[migrate] Warning: {version:04d}_{name} changed after it was applied "
+                          f"(add a new migration instead of editing it)")
+                continue
+            with open(path, encoding="utf-8") as f:
+                sql = f.read()
+            start = time.perf_counter()
+            cur.execute(sql)
+            cur.execute("INSERT INTO schema_version (version, name, checksum) VALUES (%s, %s, %s)",
+                        (version, name, checksum(path)))
+            conn.commit()
+            applied_count += 1
+            print(f"[migrate] Applied {version:04d}_{name} ({time.perf_counter() - start:.2f} s)")
+    return applied_count
+
+
+def migrate() -> int:
+    """
+    Brings the schema to the latest migration and returns the resulting version.
+    The up-to-date check is a single read; the advisory lock is only taken when
+    something is pending, and the check is repeated under it (another process
+    may have applied the migrations while we waited).
+    """
+    migrations = list_migrations()
+    target = migrations[-1][0] if migrations else 0
+    conn = db_api.get_conn()
+    try:
+        with conn.cursor() as cur:
+            version = _current_version(cur)
+            conn.rollback()
+            if version >= target:
+                print(f"[migrate] Schema up to date (version {version})")
+                return version
+
+            cur.execute("SELECT pg_advisory_lock(%s)", (MIGRATION_LOCK_ID,))
+            conn.commit()
+            try:
+                count = _apply_pending(conn, migrations)
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cur.execute("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK_ID,))
+                conn.commit()
+            version = _current_version(cur)
+            conn.rollback()
+        if count:
+            db_api.invalidate_prepared()
+        print(f"[migrate] Schema at version {version} ({count} applied)")
+        return version
+    finally:
+        db_api.put_conn(conn)
+
+
+def status():
+    conn = db_api.get_conn()
+    try:
+        with conn.cursor() as cur:
+            applied = _applied(cur) if _current_version(cur) else {}
+    finally:
+        conn.rollback()
+        db_api.put_conn(conn)
+    for version, name, path in list_migrations():
+        if version not in applied:
+            state = "pending"
+        elif applied[version] != checksum(path):
+            state = "applied (file changed since)"
+        else:
+            state = "applied"
+        print(f"{version:04d}_{name:40} {state}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply database/migrations/*.sql")
+    parser.add_argument("--status", action="store_true", help="list applied and pending migrations")
+    args = parser.parse_args()
+    if args.status:
+        status()
+    else:
+        migrate()
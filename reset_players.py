@@ -4,15 +4,14 @@ import database.db as db_api
 def reset_players_table():
     print("🧹 Oyuncular tablosu temizleniyor...")
     try:
-        # Önce tabloyu tamamen uçuralım (CASCADE: bağlı verileri de temizler)
-        db_api.execute("DROP TABLE IF EXISTS Players CASCADE;")
-        print("✅ Eski tablo silindi.")
+        # Tablo silinmez (şema migration'larda): sadece içi boşaltılır
+        db_api.execute("TRUNCATE TABLE Players;")
+        print("✅ Eski kayıtlar silindi.")
 
-        # Şimdi init_db.py dosyasını çağırıp yeniden oluşturtalım
-        # (Burada init_db modülünü import edip fonksiyonunu çağıracağız)
+        # Şimdi init_db.py dosyasını çağırıp verileri yeniden yükletelim
         import init_db
-        init_db.init_db()
-        print("🎉 Tablo sıfırdan oluşturuldu ve veriler yüklendi!")
+        init_db.init_db(force=True)  # manifest değişmedi diyip atlamasın
+        print("🎉 Tablo sıfırlandı ve veriler yüklendi!")
 
     except Exception as e:
         print(f"❌ Bir hata oluştu: {e}")
@@ -0,0 +1,79 @@
+"""
+/matches keyset cursor'ları: encode/decode gidiş-dönüş ve bozuk / başka sıralamaya ait
+cursor'ların reddedilmesi. Veritabanı gerekmez (app import edilir, havuz tembel açılır).
+
+    python -m unittest discover tests
+"""
+import base64
+import json
+import unittest
+
+import app
+
+
+def raw_token(payload):
+    # encode_cursor'dan bağımsız: istemcinin elle ürettiği (ya da değiştirdiği) cursor
+    raw = json.dumps(payload).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def valid_payload(**overrides):
+    payload = {'s': 'match_date', 'o': 'DESC', 'd': 'next', 'p': 2,
+               'k': ['false', '2024-05-01', 'false', '19:00:00', '1EA10001']}
+    payload.update(overrides)
+    return payload
+
+
+class DecodeCursorTests(unittest.TestCase):
+
+    def test_round_trip(self):
+        payload = valid_payload()
+        token = app.encode_cursor(payload)
+        self.assertNotIn('=', token)
+        self.assertEqual(app.decode_cursor(token, 'match_date', 'DESC'), payload)
+
+    def test_round_trip_prev_and_other_sort(self):
+        payload = valid_payload(s='league', o='ASC', d='prev', p=5,
+                                k=['false', 'bsl-2023-2024', 'true', '00:00:00', '1EA10002'])
+        token = app.encode_cursor(payload)
+        self.assertEqual(app.decode_cursor(token, 'league', 'ASC'), payload)
+
+    def test_key_length_follows_sort_keys(self):
+        self.assertEqual(len(valid_payload()['k']), len(app.match_seek_keys('match_date')))
+
+    def test_mismatched_sort_or_order(self):
+        token = app.encode_cursor(valid_payload())
+        self.assertIsNone(app.decode_cursor(token, 'league', 'DESC'))
+        self.assertIsNone(app.decode_cursor(token, 'match_date', 'ASC'))
+
+    def test_malformed_tokens(self):
+        for token in ('', 'not base64!', '%%%', base64.urlsafe_b64encode(b'not json').decode(),
+                      raw_token([1, 2, 3]), raw_token('string')):
+            with self.subTest(token=token):
+                self.assertIsNone(app.decode_cursor(token, 'match_date', 'DESC'))
+
+    def test_tampered_payloads(self):
+        cases = {
+            'direction': valid_payload(d='sideways'),
+            'page zero': valid_payload(p=0),
+            'page not a number': valid_payload(p='two'),
+            'key too short': valid_payload(k=['false', '2024-05-01']),
+            # doğru uzunlukta string: karakterleri seek parametresi olmamalı
+            'key is a string': valid_payload(k='abcde'),
+            'key is an object': valid_payload(k={'a': 1, 'b': 2, 'c': 3, 'd': 4, 'e': 5}),
+            'non-string key value': valid_payload(k=[False, '2024-05-01', False, '19:00:00', 10001]),
+        }
+        for name, payload in cases.items():
+            with self.subTest(name):
+                self.assertIsNone(app.decode_cursor(raw_token(payload), 'match_date', 'DESC'))
+
+    def test_missing_fields(self):
+        for field in ('s', 'o', 'd', 'p', 'k'):
+            payload = valid_payload()
+            del payload[field]
+            with self.subTest(field=field):
+                self.assertIsNone(app.decode_cursor(raw_token(payload), 'match_date', 'DESC'))
+
+
+if __name__ == '__main__':
+    unittest.main()
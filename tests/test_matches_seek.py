@@ -0,0 +1,153 @@
+"""
+/matches keyset sayfalama: matches_filter + match_seek ile sayfa sayfa ileri, sonra
+geri gidildiğinde her satır bir kez ve sırasında gelmeli - sıralama anahtarları
+eşit (aynı tarih / saat / skor) ve NULL olsa da, her sıralama (MATCH_SEEK_KEYS) ve
+yön için. PostgreSQL gerekir: satırlar bu bağlantıya özel TEMP matches/teams
+tablolarına yazılır (gerçek tablolara dokunulmaz, sonda geri alınır); DATABASE_URL
+yoksa atlanır.
+
+    python -m unittest discover tests
+"""
+import datetime
+import math
+import os
+import unittest
+
+from werkzeug.datastructures import MultiDict
+
+import app
+import database.db as db_api
+
+PER_PAGE = 4
+
+TEAMS = [(1, 'Anadolu Efes', 'L1'), (2, 'Fenerbahçe', 'L1'), (3, 'Galatasaray', 'L1')]
+
+# /matches query string'leri (veritabanından takım adı okuyan filtreler hariç)
+FILTERS = [
+    {},
+    {'league': 'L1'},
+    {'league': 'L1', 'match_status': 'played'},
+    {'weeks': ['NS 01', 'NS 02']},
+]
+
+
+def match_rows():
+    # 3 tarih (biri NULL) x 3 saat (biri NULL) x tekrar eden skor/şehir/hafta değerleri:
+    # her sıralamada çok sayıda eşit anahtar, eşitlik match_id ile çözülür
+    dates = [datetime.date(2024, 5, 1), None, datetime.date(2024, 5, 8)]
+    hours = [datetime.time(19, 0), datetime.time(20, 30), None]
+    rows = []
+    for i in range(27):
+        rows.append((
+            'M%03d' % i,
+            1 + i % 2, 3,
+            dates[i % 3], hours[(i // 3) % 3],
+            [80, None, 80, 75][i % 4], [70, 70, None][(i // 2) % 3],
+            'L2' if i % 9 == 8 else 'L1',
+            [None, 'NS 01', 'NS 02'][(i // 4) % 3],
+            ['Ankara', None, 'İstanbul'][(i // 5) % 3],
+            'Salon %d' % (i % 2),
+        ))
+    return rows
+
+
+@unittest.skipUnless(os.environ.get("DATABASE_URL"), "DATABASE_URL not set (needs PostgreSQL)")
+class MatchSeekTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.conn = db_api.get_conn()
+        cls.cur = cls.conn.cursor()
+        # TEMP tablolar aynı adlı kalıcı tabloları bu oturumda gölgeler (pg_temp önce aranır)
+        cls.cur.execute("""
+            CREATE TEMP TABLE teams (team_id INT PRIMARY KEY, team_name VARCHAR(100), league VARCHAR(64))
+        """)
+        cls.cur.execute("""
+            CREATE TEMP TABLE matches (
+                match_id VARCHAR(16) PRIMARY KEY, home_team_id INT NOT NULL, away_team_id INT NOT NULL,
+                match_date DATE, match_hour TIME, home_score SMALLINT, away_score SMALLINT,
+                league VARCHAR(64), match_week VARCHAR(16), match_city VARCHAR(64), match_saloon VARCHAR(128)
+            )
+        """)
+        cls.cur.executemany("INSERT INTO teams VALUES (%s, %s, %s)", TEAMS)
+        cls.cur.executemany("""
+            INSERT INTO matches (match_id, home_team_id, away_team_id, match_date, match_hour,
+                                 home_score, away_score, league, match_week, match_city, match_saloon)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """, match_rows())
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.cur.close()
+        cls.conn.rollback()  # TEMP tablolar da geri alınır
+        db_api.put_conn(cls.conn, close=True)
+
+    def select(self, where_sql, params, sort_by, order, cursor, limit, offset):
+        # /matches page_query'nin seek kısmı (sütunlar sadece match_id + seek_key)
+        seek_sql, seek_params, order_sql, seek_key_sql = app.match_seek(sort_by, order, cursor)
+        self.cur.execute(f"""
+            SELECT m.match_id, {seek_key_sql}
+            FROM matches m
+            JOIN teams t1 ON m.home_team_id = t1.team_id
+            JOIN teams t2 ON m.away_team_id = t2.team_id
+            WHERE {where_sql} {seek_sql}
+            ORDER BY {order_sql}
+            LIMIT %s OFFSET %s
+        """, tuple(params) + seek_params + (limit, offset))
+        names = [d[0] for d in self.cur.description]
+        return [dict(zip(names, row)) for row in self.cur.fetchall()]
+
+    def fetch_page(self, filtered, sort_by, order, token):
+        # token: sayfa linkindeki cursor; None ise ilk sayfa (cursor'suz, OFFSET 0)
+        cursor, page = None, 1
+        if token is not None:
+            cursor = app.decode_cursor(token, sort_by, order)
+            self.assertIsNotNone(cursor)
+            page = int(cursor['p'])
+        rows = self.select(*filtered, sort_by, order, cursor, PER_PAGE + 1, 0)
+        rows, has_prev, prev_cursor, has_next, next_cursor = app.match_page_cursors(
+            rows, PER_PAGE, page, cursor, sort_by, order)
+        return page, [row['match_id'] for row in rows], has_prev, prev_cursor, has_next, next_cursor
+
+    def test_walk_forward_and_back(self):
+        for args in FILTERS:
+            filtered = app.matches_filter(MultiDict(args))
+            for sort_by in app.MATCH_SEEK_KEYS:
+                for order in ('ASC', 'DESC'):
+                    with self.subTest(args=args, sort=sort_by, order=order):
+                        self.check_walk(filtered, sort_by, order)
+
+    def check_walk(self, filtered, sort_by, order):
+        expected = [row['match_id'] for row in self.select(*filtered, sort_by, order, None, None, 0)]
+        self.assertGreater(len(expected), 2 * PER_PAGE)
+
+        # İleri: her sayfa bir önceki sayfanın son anahtarından devam eder
+        pages = []
+        token = None
+        while True:
+            page, ids, has_prev, prev_cursor, has_next, next_cursor = self.fetch_page(filtered, sort_by, order, token)
+            self.assertEqual(page, len(pages) + 1)
+            self.assertEqual(has_prev, page > 1)
+            pages.append((ids, prev_cursor))
+            if not next_cursor:
+                break
+            # seek ilerlemezse sonsuz döngü yerine hata
+            self.assertLessEqual(len(pages), len(expected))
+            token = next_cursor
+        self.assertEqual([i for ids, _ in pages for i in ids], expected)
+        self.assertEqual(len(pages), math.ceil(len(expected) / PER_PAGE))
+
+        # Geri: son sayfadan önceki sayfa linkleriyle ilk sayfaya kadar, aynı sayfalar
+        back = [pages[-1][0]]
+        token, has_prev = pages[-1][1], len(pages) > 1
+        while has_prev:
+            page, ids, has_prev, token, has_next, _ = self.fetch_page(filtered, sort_by, order, token)
+            self.assertEqual(page, len(pages) - len(back))
+            self.assertTrue(has_next)
+            back.append(ids)
+            self.assertLessEqual(len(back), len(pages))
+        self.assertEqual(back[::-1], [ids for ids, _ in pages])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+"""
+/matches takım panelleri: team_season_stats'tan okunan sorgular, her ligde eski (maç
+maç gruplayan) sorgularla aynı satırları vermeli. Yüklenmiş veritabanı gerekir
+(init_db ile tables/ yüklenmiş); DATABASE_URL yoksa atlanır.
+
+    python -m unittest discover tests
+"""
+import os
+import unittest
+
+import app
+import database.db as db_api
+
+# team_season_stats'tan önceki panel sorguları (unique_matches üzerinden). Tek fark
+# ORDER BY'ın sonundaki team_name: eşit satırların sırası (ve LIMIT'te kalanlar)
+# iki tarafta da belirli olsun.
+LEGACY_TEAM_PERFORMANCE_SQL = """
+    WITH league_matches AS (
+        SELECT m.match_id, m.match_date, m.home_score, m.away_score, m.home_team_id, m.away_team_id
+        FROM unique_matches m
+        WHERE m.league = %s AND m.away_score IS NOT NULL
+    ),
+    match_results AS (
+        SELECT t.team_name, um.match_id, um.home_score AS scored, um.away_score AS conceded,
+               CASE WHEN um.home_score > um.away_score THEN 1 ELSE 0 END AS won,
+               CASE WHEN um.home_score < um.away_score THEN 1 ELSE 0 END AS lost
+        FROM league_matches um
+        JOIN Teams t ON um.home_team_id = t.team_id
+        UNION ALL
+        SELECT t.team_name, um.match_id, um.away_score AS scored, um.home_score AS conceded,
+               CASE WHEN um.away_score > um.home_score THEN 1 ELSE 0 END AS won,
+               CASE WHEN um.away_score < um.home_score THEN 1 ELSE 0 END AS lost
+        FROM league_matches um
+        JOIN Teams t ON um.away_team_id = t.team_id
+    ),
+    team_stats AS (
+        SELECT team_name, COUNT(*) as games_played, SUM(won) as wins, SUM(lost) as losses,
+               ROUND(AVG(scored)::numeric, 1) as avg_points_scored,
+               ROUND(AVG(conceded)::numeric, 1) as avg_points_conceded
+        FROM match_results
+        GROUP BY team_name
+        HAVING COUNT(*) >= 3
+    )
+    SELECT team_name, games_played, wins, losses,
+           ROUND((wins * 100.0 / games_played)::numeric, 1) as win_pct,
+           avg_points_scored, avg_points_conceded,
+           ROUND((avg_points_scored - avg_points_conceded)::numeric, 1) as point_diff
+    FROM team_stats
+    ORDER BY win_pct DESC, point_diff DESC, team_name
+"""
+
+LEGACY_HOME_AWAY_SQL = """
+    WITH league_matches AS (
+        SELECT m.* FROM unique_matches m
+        WHERE m.league = %s AND m.away_score IS NOT NULL
+    ),
+    home_stats AS (
+        SELECT t.team_name, COUNT(*) as home_games,
+               SUM(CASE WHEN m.home_score > m.away_score THEN 1 ELSE 0 END) as home_wins,
+               ROUND(AVG(m.home_score)::numeric, 1) as avg_home_scored
+        FROM league_matches m
+        JOIN Teams t ON m.home_team_id = t.team_id
+        GROUP BY t.team_name
+    ),
+    away_stats AS (
+        SELECT t.team_name, COUNT(*) as away_games,
+               SUM(CASE WHEN m.away_score > m.home_score THEN 1 ELSE 0 END) as away_wins,
+               ROUND(AVG(m.away_score)::numeric, 1) as avg_away_scored
+        FROM league_matches m
+        JOIN Teams t ON m.away_team_id = t.team_id
+        GROUP BY t.team_name
+    )
+    SELECT
+        COALESCE(h.team_name, a.team_name) as team_name,
+        COALESCE(h.home_games, 0) as home_games,
+        COALESCE(h.home_wins, 0) as home_wins,
+        COALESCE(h.avg_home_scored, 0) as avg_home_scored,
+        COALESCE(a.away_games, 0) as away_games,
+        COALESCE(a.away_wins, 0) as away_wins,
+        COALESCE(a.avg_away_scored, 0) as avg_away_scored,
+        CASE WHEN h.home_games > 0 THEN ROUND((h.home_wins * 100.0 / h.home_games)::numeric, 1) ELSE 0 END as home_win_pct,
+        CASE WHEN a.away_games > 0 THEN ROUND((a.away_wins * 100.0 / a.away_games)::numeric, 1) ELSE 0 END as away_win_pct
+    FROM home_stats h
+    FULL OUTER JOIN away_stats a ON h.team_name = a.team_name
+    WHERE COALESCE(h.home_games, 0) + COALESCE(a.away_games, 0) >= 5
+    ORDER BY (COALESCE(h.home_games, 0) + COALESCE(a.away_games, 0)) DESC, COALESCE(h.team_name, a.team_name)
+    LIMIT 12
+"""
+
+
+@unittest.skipUnless(os.environ.get("DATABASE_URL"), "DATABASE_URL not set (needs the loaded database)")
+class TeamStatsPanelTests(unittest.TestCase):
+
+    def setUp(self):
+        # iki sorgu da aynı snapshot'ı görsün
+        self.scope = db_api.read_scope(db_api.REPEATABLE_READ)
+        self.scope.__enter__()
+        self.addCleanup(self.scope.__exit__, None, None, None)
+        self.leagues = [row[0] for row in db_api.query("SELECT DISTINCT league FROM unique_matches ORDER BY league")]
+        if not self.leagues:
+            self.skipTest("no matches loaded (run init_db.py)")
+
+    def assertSameRows(self, panel_sql, legacy_sql):
+        for league in self.leagues:
+            with self.subTest(league=league):
+                self.assertEqual(db_api.query(panel_sql, (league,)), db_api.query(legacy_sql, (league,)))
+
+    def test_team_performance_panel(self):
+        self.assertSameRows(app.TEAM_PERFORMANCE_PANEL_SQL, LEGACY_TEAM_PERFORMANCE_SQL)
+
+    def test_home_away_panel(self):
+        self.assertSameRows(app.HOME_AWAY_PANEL_SQL, LEGACY_HOME_AWAY_SQL)
+
+
+if __name__ == '__main__':
+    unittest.main()